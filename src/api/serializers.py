@@ -1,6 +1,8 @@
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
 
+from src.kb.retrievers import normalize_retrieval_settings
+
 
 User = get_user_model()
 
@@ -83,6 +85,13 @@ class KnowledgeBaseSerializer(serializers.Serializer):
     id = serializers.IntegerField(read_only=True)
     name = serializers.CharField(max_length=128)
     description = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    retrieval_settings = serializers.JSONField(required=False)
+
+    def validate_retrieval_settings(self, value):
+        try:
+            return normalize_retrieval_settings(value)
+        except ValueError as exc:
+            raise serializers.ValidationError(str(exc)) from exc
 
 
 class LessonEventSerializer(serializers.Serializer):
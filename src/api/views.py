@@ -466,7 +466,7 @@ class KnowledgeDocumentListView(APIView):
 
     def delete(self, request, *args, **kwargs):
         """Delete all knowledge documents and their chunks."""
-        deleted_count, _ = KnowledgeDocument.objects.filter(user=request.user).delete()
+        deleted_count = kb_ingest.delete_documents(documents=KnowledgeDocument.objects.filter(user=request.user))
         return Response({"deleted": deleted_count}, status=status.HTTP_200_OK)
 
 
@@ -482,10 +482,19 @@ class KnowledgeDocumentDetailView(APIView):
         doc = qs.first()
         if not doc:
             return Response({"detail": "Document not found."}, status=status.HTTP_404_NOT_FOUND)
-        doc.delete()
+        kb_ingest.delete_documents(documents=KnowledgeDocument.objects.filter(pk=doc.pk))
         return Response({"deleted": 1}, status=status.HTTP_200_OK)
 
 
+def _base_payload(base: KnowledgeBase) -> Dict[str, Any]:
+    return {
+        "id": base.pk,
+        "name": base.name,
+        "description": base.description,
+        "retrieval_settings": base.retrieval_settings,
+    }
+
+
 class KnowledgeBaseListCreateView(APIView):
     authentication_classes = [SessionAuthentication]
     permission_classes = [IsAuthenticated]
@@ -494,10 +503,7 @@ class KnowledgeBaseListCreateView(APIView):
     def get(self, request, *args, **kwargs):
         bases = KnowledgeBase.objects.filter(user=request.user).order_by("-updated_at")
         serializer = KnowledgeBaseSerializer(
-            [
-                {"id": base.pk, "name": base.name, "description": base.description}
-                for base in bases
-            ],
+            [_base_payload(base) for base in bases],
             many=True,
         )
         return Response({"bases": serializer.data})
@@ -509,17 +515,36 @@ class KnowledgeBaseListCreateView(APIView):
             user=request.user,
             name=serializer.validated_data["name"].strip(),
             description=serializer.validated_data.get("description") or "",
+            retrieval_settings=serializer.validated_data.get("retrieval_settings") or {},
         )
-        return Response({"id": base.pk, "name": base.name, "description": base.description}, status=status.HTTP_201_CREATED)
+        return Response(_base_payload(base), status=status.HTTP_201_CREATED)
 
 
 class KnowledgeBaseDetailView(APIView):
     authentication_classes = [SessionAuthentication]
     permission_classes = [IsAuthenticated]
+    parser_classes = [JSONParser]
+
+    def patch(self, request, pk: int, *args, **kwargs):
+        base = get_object_or_404(KnowledgeBase, pk=pk, user=request.user)
+        serializer = KnowledgeBaseSerializer(data=request.data, partial=True)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        if "name" in data:
+            name = data["name"].strip()
+            if KnowledgeBase.objects.filter(user=request.user, name=name).exclude(pk=base.pk).exists():
+                return Response({"detail": f"A knowledge base named {name} already exists."}, status=status.HTTP_400_BAD_REQUEST)
+            base.name = name
+        if "description" in data:
+            base.description = data["description"] or ""
+        if "retrieval_settings" in data:
+            base.retrieval_settings = data["retrieval_settings"]
+        base.save(update_fields=["name", "description", "retrieval_settings", "updated_at"])
+        return Response(_base_payload(base))
 
     def delete(self, request, pk: int, *args, **kwargs):
         base = get_object_or_404(KnowledgeBase, pk=pk, user=request.user)
-        base.delete()
+        kb_ingest.delete_base(base=base)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -182,9 +182,52 @@ AGENT_SETTINGS: Dict[str, Any] = {
     "vector_backend": os.getenv("VECTOR_BACKEND", "pgvector"),
     "vstore_path": os.getenv("VSTORE_PATH", "data/faiss.index"),
     "vstore_meta": os.getenv("VSTORE_META", "data/chunks.jsonl"),
+    "vstore_dir": os.getenv("VSTORE_DIR", "data/faiss"),
+    "faiss_index_type": os.getenv("FAISS_INDEX_TYPE", "flat"),
+    "faiss_ann_threshold": int(os.getenv("FAISS_ANN_THRESHOLD", "20000")),
+    "faiss_hnsw_m": int(os.getenv("FAISS_HNSW_M", "32")),
+    "faiss_hnsw_ef_construction": int(os.getenv("FAISS_HNSW_EF_CONSTRUCTION", "80")),
+    "faiss_hnsw_ef_search": int(os.getenv("FAISS_HNSW_EF_SEARCH", "64")),
+    "faiss_ivf_nlist": int(os.getenv("FAISS_IVF_NLIST", "0")),
+    "faiss_ivf_nprobe": int(os.getenv("FAISS_IVF_NPROBE", "16")),
+    "faiss_compression": os.getenv("FAISS_COMPRESSION", "none"),
+    "faiss_pq_m": int(os.getenv("FAISS_PQ_M", "0")),
+    "faiss_pq_nbits": int(os.getenv("FAISS_PQ_NBITS", "8")),
+    "faiss_exact_rescore": os.getenv("FAISS_EXACT_RESCORE", "false").lower() in {"1", "true", "yes"},
+    "faiss_rescore_factor": int(os.getenv("FAISS_RESCORE_FACTOR", "4")),
+    "faiss_mmap": os.getenv("FAISS_MMAP", "false").lower() in {"1", "true", "yes"},
+    "faiss_compact_ratio": float(os.getenv("FAISS_COMPACT_RATIO", "0.2")),
+    "pgvector_hnsw_ef_search": int(os.getenv("PGVECTOR_HNSW_EF_SEARCH", "40")),
+    "pgvector_ivfflat_probes": int(os.getenv("PGVECTOR_IVFFLAT_PROBES", "10")),
+    "pgvector_iterative_scan": os.getenv("PGVECTOR_ITERATIVE_SCAN", "off"),
+    "pgvector_storage": os.getenv("PGVECTOR_STORAGE", "vector"),
+    "pgvector_hybrid_sql": os.getenv("PGVECTOR_HYBRID_SQL", "true").lower() in {"1", "true", "yes"},
+    "store_embedding_json": os.getenv("STORE_EMBEDDING_JSON", "false").lower() in {"1", "true", "yes"},
     "rag_enabled": os.getenv("RAG_ENABLED", "true").lower() in {"1", "true", "yes"},
+    "rag_segmented_retrieval": os.getenv("RAG_SEGMENTED_RETRIEVAL", "true").lower() in {"1", "true", "yes"},
+    "rag_segment_chars": int(os.getenv("RAG_SEGMENT_CHARS", "400")),
+    "rag_max_segments": int(os.getenv("RAG_MAX_SEGMENTS", "8")),
     "hybrid_retrieval": os.getenv("HYBRID_RETRIEVAL", "true").lower() in {"1", "true", "yes"},
     "rerank_enabled": os.getenv("RERANK_ENABLED", "true").lower() in {"1", "true", "yes"},
+    "retrieval_candidate_multiplier": int(os.getenv("RETRIEVAL_CANDIDATE_MULTIPLIER", "3")),
+    "retrieval_max_candidates": int(os.getenv("RETRIEVAL_MAX_CANDIDATES", "200")),
+    "retrieval_leg_workers": int(os.getenv("RETRIEVAL_LEG_WORKERS", "4")),
+    "retrieval_vector_timeout_ms": int(os.getenv("RETRIEVAL_VECTOR_TIMEOUT_MS", "3000")),
+    "retrieval_lexical_timeout_ms": int(os.getenv("RETRIEVAL_LEXICAL_TIMEOUT_MS", "1500")),
+    "retrieval_legs": os.getenv("RETRIEVAL_LEGS", "vector,lexical"),
+    "retrieval_leg_timeout_ms": int(os.getenv("RETRIEVAL_LEG_TIMEOUT_MS", "800")),
+    "retrieval_rrf_k": int(os.getenv("RETRIEVAL_RRF_K", "60")),
+    "retrieval_mmr_enabled": os.getenv("RETRIEVAL_MMR_ENABLED", "true").lower() in {"1", "true", "yes"},
+    "retrieval_mmr_diversity": float(os.getenv("RETRIEVAL_MMR_DIVERSITY", "0.3")),
+    "retrieval_merge_adjacent": os.getenv("RETRIEVAL_MERGE_ADJACENT", "true").lower() in {"1", "true", "yes"},
+    "embedding_cache_enabled": os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() in {"1", "true", "yes"},
+    "embedding_cache_size": int(os.getenv("EMBEDDING_CACHE_SIZE", "2048")),
+    "embedding_cache_ttl": int(os.getenv("EMBEDDING_CACHE_TTL", "86400")),
+    "embedding_cache_redis_url": os.getenv("EMBEDDING_CACHE_REDIS_URL", ""),
+    "result_cache_enabled": os.getenv("RESULT_CACHE_ENABLED", "true").lower() in {"1", "true", "yes"},
+    "result_cache_size": int(os.getenv("RESULT_CACHE_SIZE", "512")),
+    "result_cache_ttl": int(os.getenv("RESULT_CACHE_TTL", "600")),
+    "result_cache_redis_url": os.getenv("RESULT_CACHE_REDIS_URL", os.getenv("EMBEDDING_CACHE_REDIS_URL", "")),
     "review_enabled": os.getenv("REVIEW_ENABLED", "true").lower() in {"1", "true", "yes"},
     "review_max_rounds": int(os.getenv("REVIEW_MAX_ROUNDS", "1")),
     "review_top_k_multiplier": int(os.getenv("REVIEW_TOP_K_MULTIPLIER", "2")),
@@ -0,0 +1,52 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from src.core.models import EMBEDDING_DIMENSIONS, KnowledgeChunk
+from src.kb.store import PGVECTOR_STORAGES, get_store
+
+
+class Command(BaseCommand):
+    help = "在 vector 与 halfvec 存储列之间回填向量（按 PGVECTOR_STORAGE 的目标列），可选清空源列以回收空间。"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000, help="每批更新的行数，默认 5000")
+        parser.add_argument("--clear-source", action="store_true", help="回填后清空另一列，回收存储空间")
+
+    def handle(self, *args, **options):
+        store = get_store("pgvector")
+        if store.vendor != "postgresql":
+            raise CommandError("backfill_vector_storage requires a PostgreSQL database with the vector extension.")
+
+        table = KnowledgeChunk._meta.db_table
+        target = store.column
+        target_type = "halfvec" if store.options["storage"] == "halfvec" else "vector"
+        sources = [column for column, _opclass in PGVECTOR_STORAGES.values() if column != target]
+        copied = cleared = 0
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT COALESCE(MIN(id), 0), COALESCE(MAX(id), 0) FROM {table}")
+            low, high = cursor.fetchone()
+            # Id-range batches keep each UPDATE short so concurrent ingest is never blocked for long.
+            for start in range(low, high + 1, options["batch_size"]):
+                stop = start + options["batch_size"]
+                for source in sources:
+                    cursor.execute(
+                        f"UPDATE {table} SET {target} = {source}::{target_type}({EMBEDDING_DIMENSIONS}) "
+                        f"WHERE id >= %s AND id < %s AND {target} IS NULL AND {source} IS NOT NULL",
+                        [start, stop],
+                    )
+                    copied += cursor.rowcount
+                    if options["clear_source"]:
+                        cursor.execute(
+                            f"UPDATE {table} SET {source} = NULL "
+                            f"WHERE id >= %s AND id < %s AND {target} IS NOT NULL AND {source} IS NOT NULL",
+                            [start, stop],
+                        )
+                        cleared += cursor.rowcount
+            cursor.execute(f"ANALYZE {table}")
+
+        self.stdout.write(
+            json.dumps({"storage": store.options["storage"], "column": target, "copied": copied, "cleared": cleared}, indent=2)
+        )
+        self.stdout.write(self.style.SUCCESS("向量回填完成；如切换了存储列，请重新运行 build_vector_index。"))
@@ -0,0 +1,115 @@
+import json
+import random
+import statistics
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from django.core.management.base import BaseCommand
+
+from src.kb.rerank import rerank_results
+from src.kb.tokens import chunk_term_ids, overlap_ratio, query_term_ids, term_ids
+from src.services.evaluation import build_report_metadata
+
+_VOCABULARY = (
+    "光合作用 叶绿体 细胞呼吸 线粒体 能量 转化 酶 催化 反应 速率 温度 浓度 实验 变量 对照 结论 "
+    "photosynthesis chlorophyll respiration enzyme energy rate experiment variable"
+).split()
+
+
+def _rerank_scalar(
+    *,
+    query: str,
+    results: List[Tuple[float, Dict[str, Any]]],
+    top_k: int,
+) -> List[Tuple[float, Dict[str, Any]]]:
+    """Reference rerank: one candidate at a time, full sort (the baseline ``rerank_results`` is measured against)."""
+    rescored: List[Tuple[float, Dict[str, Any]]] = []
+    query_ids = query_term_ids(query)
+    for base_score, metadata in results:
+        overlap = overlap_ratio(query_ids, chunk_term_ids(metadata))
+        source_count = len(metadata.get("retrieval_sources", ["vector"]))
+        rerank_score = float(base_score) + (0.2 * overlap) + (0.03 * min(source_count, 2))
+        rescored.append(
+            (
+                rerank_score,
+                {
+                    **metadata,
+                    "rerank_score": round(rerank_score, 6),
+                    "overlap_score": round(overlap, 6),
+                },
+            )
+        )
+    rescored.sort(key=lambda item: item[0], reverse=True)
+    return rescored[:top_k]
+
+
+def _synthetic_candidates(count: int, *, seed: int, with_features: bool):
+    rng = random.Random(seed)
+    candidates = []
+    for index in range(count):
+        text = "".join(rng.choice(_VOCABULARY) for _ in range(160))[:800]
+        metadata = {"position": index}
+        if with_features:
+            metadata["term_ids"] = term_ids(text)
+        candidates.append(
+            (
+                rng.random(),
+                {"doc_id": f"doc-{index % 50}", "chunk_id": f"chunk-{index}", "text": text, "metadata": metadata},
+            )
+        )
+    return candidates
+
+
+class Command(BaseCommand):
+    help = "微基准：对比逐条重新分词、逐条使用预计算词项特征与向量化打分 + 部分选择三种重排方式的耗时。"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--candidates", type=str, default="1000,10000", help="候选数量，逗号分隔，默认 1000,10000")
+        parser.add_argument("--top-k", type=int, default=10, help="重排保留的 top-k，默认 10")
+        parser.add_argument("--repeat", type=int, default=5, help="每组重复次数，默认 5")
+        parser.add_argument("--output", type=str, help="可选，评测报告输出路径")
+
+    def handle(self, *args, **options):
+        query = "光合作用中叶绿体如何转化能量 enzyme rate"
+        sizes = [int(value) for value in options["candidates"].split(",") if value.strip()]
+        runs = []
+        for size in sizes:
+            row = {"candidates": size}
+            variants = (
+                ("retokenize", False, _rerank_scalar),
+                ("precomputed", True, _rerank_scalar),
+                ("vectorized", True, rerank_results),
+            )
+            for name, with_features, rerank in variants:
+                candidates = _synthetic_candidates(size, seed=size, with_features=with_features)
+                timings = []
+                for _ in range(max(options["repeat"], 1)):
+                    started = time.perf_counter()
+                    rerank(query=query, results=candidates, top_k=options["top_k"])
+                    timings.append((time.perf_counter() - started) * 1000)
+                row[f"{name}_ms"] = round(statistics.median(timings), 3)
+            row["speedup"] = round(row["retokenize_ms"] / max(row["precomputed_ms"], 1e-6), 2)
+            row["vectorized_speedup"] = round(row["precomputed_ms"] / max(row["vectorized_ms"], 1e-6), 2)
+            runs.append(row)
+
+        report = {
+            "summary": {
+                **{f"speedup@{row['candidates']}": row["speedup"] for row in runs},
+                **{f"vectorized_speedup@{row['candidates']}": row["vectorized_speedup"] for row in runs},
+            },
+            "runs": runs,
+            "meta": build_report_metadata(
+                report_type="rerank_microbenchmark",
+                dataset="synthetic",
+                top_k=options["top_k"],
+                extra={"repeat": options["repeat"], "query": query},
+            ),
+        }
+        rendered = json.dumps(report, ensure_ascii=False, indent=2)
+        output = options.get("output")
+        if output:
+            Path(output).write_text(rendered + "\n", encoding="utf-8")
+            self.stdout.write(self.style.SUCCESS(f"评测完成，报告已写入 {output}"))
+        else:
+            self.stdout.write(rendered)
@@ -0,0 +1,145 @@
+import json
+import statistics
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from src.core.models import EMBEDDING_DIMENSIONS, KnowledgeBase, KnowledgeChunk, KnowledgeDocument
+from src.kb.store import chunk_vector_fields, get_store
+from src.services.evaluation import build_report_metadata
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "对比 pgvector 检索在整行模型加载与精简字段投影两种路径下的传输字节数和延迟。"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-id", type=int, help="在已有知识库上测试")
+        parser.add_argument("--synthetic", type=int, default=0, help="临时生成 N 个分块的知识库（结束后回滚），例如 100000")
+        parser.add_argument("--queries", type=int, default=20, help="查询次数，默认 20")
+        parser.add_argument("--top-k", type=int, default=10, help="每次检索的 top-k，默认 10")
+        parser.add_argument("--output", type=str, help="可选，评测报告输出路径")
+
+    def handle(self, *args, **options):
+        store = get_store("pgvector")
+        if store.vendor != "postgresql":
+            raise CommandError("benchmark_vector_search requires a PostgreSQL database with the vector extension.")
+        if not options.get("base_id") and not options["synthetic"]:
+            raise CommandError("Pass --base-id or --synthetic N.")
+
+        report = {}
+        try:
+            with transaction.atomic():
+                base_id = options.get("base_id") or self._seed_synthetic_base(options["synthetic"])
+                report = self._run(store, base_id=base_id, queries=options["queries"], top_k=options["top_k"])
+                if options["synthetic"]:
+                    raise _Rollback
+        except _Rollback:
+            pass
+
+        report["meta"] = build_report_metadata(
+            report_type="vector_search_projection",
+            dataset=f"synthetic:{options['synthetic']}" if options["synthetic"] else f"base:{options['base_id']}",
+            top_k=options["top_k"],
+        )
+        rendered = json.dumps(report, ensure_ascii=False, indent=2)
+        output = options.get("output")
+        if output:
+            Path(output).write_text(rendered + "\n", encoding="utf-8")
+            self.stdout.write(self.style.SUCCESS(f"评测完成，报告已写入 {output}"))
+        else:
+            self.stdout.write(rendered)
+
+    def _seed_synthetic_base(self, chunks: int) -> int:
+        user = get_user_model().objects.create(username=f"bench-{uuid.uuid4().hex[:12]}")
+        base = KnowledgeBase.objects.create(user=user, name="benchmark")
+        rng = np.random.default_rng(0)
+        text = "光合作用是绿色植物利用光能把二氧化碳和水合成有机物的过程。" * 20
+        documents = KnowledgeDocument.objects.bulk_create(
+            KnowledgeDocument(user=user, base=base, doc_id=f"bench-{index}", title=f"Doc {index}")
+            for index in range(max(chunks // 100, 1))
+        )
+        batch = 2000
+        for start in range(0, chunks, batch):
+            vectors = rng.normal(size=(min(batch, chunks - start), EMBEDDING_DIMENSIONS)).astype("float32")
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+            KnowledgeChunk.objects.bulk_create(
+                KnowledgeChunk(
+                    document=documents[(start + offset) % len(documents)],
+                    chunk_id=f"bench-{start + offset}",
+                    text=text,
+                    # Written to whichever column PGVECTOR_STORAGE selects, like ingest does.
+                    **chunk_vector_fields(vector.tolist()),
+                    metadata={"position": start + offset},
+                )
+                for offset, vector in enumerate(vectors)
+            )
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {KnowledgeChunk._meta.db_table}")
+        return base.pk
+
+    def _run(self, store, *, base_id: int, queries: int, top_k: int) -> dict:
+        samples = list(
+            KnowledgeChunk.objects.filter(document__base_id=base_id)
+            .exclude(**{f"{store.column}__isnull": True})
+            .order_by("?")
+            .values_list(store.column, flat=True)[:queries]
+        )
+        if not samples:
+            raise CommandError(f"No vectors in {store.column} for base {base_id}.")
+        vectors = [vector.to_list() if hasattr(vector, "to_list") else list(vector) for vector in samples]
+
+        def full_models(vector):
+            # The pre-projection path: whole KnowledgeChunk + KnowledgeDocument rows per hit.
+            with store._search_session():
+                return list(store._search_queryset(vector, top_k, base_id=base_id, fields=None))
+
+        def projected(vector):
+            return store.search(vector, top_k, base_id=base_id)
+
+        paths = {
+            "full_models": (full_models, lambda vector: store._search_queryset(vector, top_k, base_id=base_id, fields=None)),
+            "values_projection": (projected, lambda vector: store._search_queryset(vector, top_k, base_id=base_id)),
+        }
+        results = {}
+        for name, (search, queryset) in paths.items():
+            search(vectors[0])  # warm caches so both paths see the same buffer state
+            latencies = []
+            for vector in vectors:
+                started = time.perf_counter()
+                search(vector)
+                latencies.append((time.perf_counter() - started) * 1000)
+            results[name] = {
+                "avg_ms": round(statistics.fmean(latencies), 2),
+                "p50_ms": round(statistics.median(latencies), 2),
+                "max_ms": round(max(latencies), 2),
+                "bytes_per_query": self._result_bytes(queryset(vectors[0])),
+            }
+
+        baseline, candidate = results["full_models"], results["values_projection"]
+        return {
+            "summary": {
+                "chunks": KnowledgeChunk.objects.filter(document__base_id=base_id).count(),
+                "column": store.column,
+                "queries": len(vectors),
+                "bytes_reduction": round(1 - candidate["bytes_per_query"] / max(baseline["bytes_per_query"], 1), 4),
+                "latency_speedup": round(baseline["avg_ms"] / max(candidate["avg_ms"], 1e-6), 2),
+            },
+            "paths": results,
+        }
+
+    @staticmethod
+    def _result_bytes(queryset) -> int:
+        """Server-side size of the rows a query returns (what crosses the wire, before protocol overhead)."""
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT COALESCE(SUM(pg_column_size(t.*)), 0) FROM ({sql}) t", params)
+            return int(cursor.fetchone()[0])
@@ -0,0 +1,90 @@
+import json
+import math
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from src.core.models import KnowledgeChunk
+from src.kb.store import PGVECTOR_INDEX_METHODS, PgVectorStore, VectorStoreError, get_store
+
+
+class Command(BaseCommand):
+    help = "为 pgvector 当前存储列（PGVECTOR_STORAGE：embedding_vector 或 embedding_half）在线（CONCURRENTLY）构建 HNSW / IVFFlat 索引，并用 EXPLAIN 验证检索会走索引。"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--method", choices=sorted(PGVECTOR_INDEX_METHODS), default="hnsw", help="索引类型，默认 hnsw")
+        parser.add_argument("--m", type=int, default=16, help="HNSW 每层邻居数，默认 16")
+        parser.add_argument("--ef-construction", type=int, default=64, help="HNSW 构建候选数，默认 64")
+        parser.add_argument("--lists", type=int, default=0, help="IVFFlat 聚类数，默认按行数自动选择")
+        parser.add_argument("--no-concurrently", action="store_true", help="不使用 CONCURRENTLY（会锁写入，但构建更快）")
+        parser.add_argument("--replace", action="store_true", help="同时删除另一种类型的 ANN 索引")
+        parser.add_argument("--top-k", type=int, default=10, help="EXPLAIN 验证使用的 top-k，默认 10")
+
+    def handle(self, *args, **options):
+        store = get_store("pgvector")
+        if store.vendor != "postgresql":
+            raise CommandError("build_vector_index requires a PostgreSQL database with the vector extension.")
+
+        method = options["method"]
+        concurrently = not options["no_concurrently"]
+        # The active storage column: embedding_half in halfvec mode, embedding_vector otherwise.
+        rows = KnowledgeChunk.objects.exclude(**{f"{store.column}__isnull": True}).count()
+        if not rows:
+            self.stderr.write(
+                self.style.WARNING(
+                    f"{store.column} holds no vectors; run backfill_vector_storage first if PGVECTOR_STORAGE changed."
+                )
+            )
+        if method == "ivfflat" and not rows and not options["lists"]:
+            # IVFFlat trains its centroids at build time; an empty column would leave a single list.
+            raise CommandError(f"Cannot size an IVFFlat index without vectors in {store.column}; pass --lists explicitly.")
+        lists = options["lists"] or self._default_lists(rows)
+        params = {"m": options["m"], "ef_construction": options["ef_construction"]} if method == "hnsw" else {"lists": lists}
+
+        try:
+            if options["replace"]:
+                for other in PGVECTOR_INDEX_METHODS - {method}:
+                    store.drop_ann_index(other, concurrently=concurrently)
+            index_name = store.create_ann_index(method, concurrently=concurrently, **params)
+        except VectorStoreError as exc:
+            raise CommandError(str(exc)) from exc
+
+        report = {
+            "index": index_name,
+            "method": method,
+            "params": params,
+            "column": store.column,
+            "rows": rows,
+            "query_settings": {
+                key: value for key, value in settings.AGENT_SETTINGS.items() if key.startswith("pgvector_")
+            },
+            "explain": self._verify(store, index_name, top_k=options["top_k"]),
+        }
+        self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+        if not report["explain"]["checked"]:
+            self.stderr.write(self.style.WARNING(f"EXPLAIN check skipped: no rows with {store.column} to sample."))
+        elif not report["explain"]["index_used"]:
+            raise CommandError(
+                f"EXPLAIN did not use {index_name}; run ANALYZE or check that the query orders by cosine distance."
+            )
+
+    @staticmethod
+    def _default_lists(rows: int) -> int:
+        # pgvector guidance: rows / 1000 up to 1M rows, sqrt(rows) beyond.
+        if rows > 1_000_000:
+            return int(math.sqrt(rows))
+        return max(rows // 1000, 1)
+
+    @staticmethod
+    def _verify(store: PgVectorStore, index_name: str, *, top_k: int) -> dict:
+        sample = (
+            KnowledgeChunk.objects.exclude(**{f"{store.column}__isnull": True})
+            .values_list(store.column, "document__base_id")
+            .first()
+        )
+        if sample is None:
+            return {"checked": False, "index_used": False, "plan": ""}
+        vector, base_id = sample
+        values = vector.to_list() if hasattr(vector, "to_list") else list(vector)
+        plan = store.explain_search(values, top_k, base_id=base_id)
+        return {"checked": True, "index_used": index_name in plan, "plan": plan}
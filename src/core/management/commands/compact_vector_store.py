@@ -0,0 +1,28 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from src.kb.store import VectorStoreError, compact_base, get_store
+
+
+class Command(BaseCommand):
+    help = "压缩 FAISS 知识库分区：按存活分块重建索引，清除已删除文档留下的墓碑行。"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-id", type=int, help="可选，仅压缩指定知识库分区")
+        parser.add_argument("--force", action="store_true", help="忽略删除比例阈值，强制重建")
+
+    def handle(self, *args, **options):
+        if settings.AGENT_SETTINGS["vector_backend"] != "faiss":
+            raise CommandError("compact_vector_store only applies to the FAISS backend.")
+
+        store = get_store("faiss")
+        partition_ids = [str(options["base_id"])] if options.get("base_id") else store.partition_ids()
+        results = {}
+        for partition_id in partition_ids:
+            try:
+                results[partition_id] = compact_base(base_id=partition_id, force=options["force"])
+            except VectorStoreError as exc:
+                raise CommandError(str(exc)) from exc
+        self.stdout.write(json.dumps({"partitions": results}, ensure_ascii=False, indent=2))
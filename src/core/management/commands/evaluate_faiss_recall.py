@@ -0,0 +1,62 @@
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from src.kb.store import VectorStoreError, get_store
+from src.services.evaluation import build_report_metadata
+
+
+class Command(BaseCommand):
+    help = "评估 FAISS 近似/压缩索引相对精确检索的召回率（recall@k）及索引体积。"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-id", type=int, help="可选，仅评估指定知识库分区")
+        parser.add_argument("--sample-size", type=int, default=200, help="抽样查询数，默认 200")
+        parser.add_argument("--top-k", type=int, default=10, help="召回 top-k，默认 10")
+        parser.add_argument("--output", type=str, help="可选，评测报告输出路径")
+
+    def handle(self, *args, **options):
+        if settings.AGENT_SETTINGS["vector_backend"] != "faiss":
+            raise CommandError("evaluate_faiss_recall only applies to the FAISS backend.")
+
+        store = get_store("faiss")
+        partition_ids = [str(options["base_id"])] if options.get("base_id") else store.partition_ids()
+        partitions = []
+        for partition_id in partition_ids:
+            partition = store.partition(partition_id)
+            if partition is None:
+                raise CommandError(f"FAISS partition not found for base: {partition_id}")
+            try:
+                stats = partition.measure_recall(sample_size=options["sample_size"], top_k=options["top_k"])
+            except VectorStoreError as exc:
+                raise CommandError(str(exc)) from exc
+            partitions.append({"base_id": partition_id, **stats})
+
+        measured = [item for item in partitions if item["sample_size"]]
+        report = {
+            "summary": {
+                "partitions": len(partitions),
+                "min_recall_at_k": min((item["recall_at_k"] for item in measured), default=0.0),
+                "avg_recall_at_k": round(sum(item["recall_at_k"] for item in measured) / len(measured), 4) if measured else 0.0,
+                "index_bytes": sum(item.get("index_bytes", 0) for item in partitions),
+            },
+            "partitions": partitions,
+            "config": {
+                key: value for key, value in settings.AGENT_SETTINGS.items() if key.startswith("faiss_")
+            },
+            "meta": build_report_metadata(
+                report_type="faiss_recall",
+                dataset=str(Path(settings.AGENT_SETTINGS["vstore_dir"])),
+                top_k=options["top_k"],
+            ),
+        }
+
+        rendered = json.dumps(report, ensure_ascii=False, indent=2)
+        output = options.get("output")
+        if output:
+            Path(output).write_text(rendered + "\n", encoding="utf-8")
+            self.stdout.write(self.style.SUCCESS(f"评测完成，报告已写入 {output}"))
+        else:
+            self.stdout.write(rendered)
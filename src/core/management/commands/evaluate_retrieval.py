@@ -5,7 +5,7 @@ from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
 
 from src.core.models import KnowledgeBase
-from src.kb.retrieve import retrieve_context
+from src.kb.retrieve import retrieve_many
 from src.services.evaluation import build_report_metadata, evaluate_retrieval_cases
 
 
@@ -40,7 +40,7 @@ class Command(BaseCommand):
         report = evaluate_retrieval_cases(
             cases=cases,
             top_k=options["top_k"],
-            retrieve_fn=lambda query, top_k: retrieve_context(query=query, top_k=top_k, base=base),
+            retrieve_many_fn=lambda queries, top_k: retrieve_many(queries=queries, top_k=top_k, base=base),
         )
         report["config"] = {
             "base_id": base.pk,
@@ -0,0 +1,55 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from src.agents.utils import build_client
+from src.core.models import EMBEDDING_DIMENSIONS, KnowledgeChunk
+from src.kb.store import _vector_literal
+
+
+class Command(BaseCommand):
+    help = "用当前 EMBEDDING_MODEL 重新嵌入 embedding_vector 维度不是 1024 的切片（迁移 0009 之前运行）。"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=64, help="每次调用 embedding 接口的切片数，默认 64")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("reembed_chunks requires a PostgreSQL database with the vector extension.")
+
+        agent_settings = settings.AGENT_SETTINGS
+        client = build_client(agent_settings)
+        table = KnowledgeChunk._meta.db_table
+        batch_size = max(options["batch_size"], 1)
+        reembedded = 0
+        last_id = 0
+        # Raw SQL on purpose: this runs before migration 0009, when later columns may not exist yet.
+        with connection.cursor() as cursor:
+            while True:
+                cursor.execute(
+                    f"SELECT id, text FROM {table} "
+                    "WHERE id > %s AND embedding_vector IS NOT NULL AND vector_dims(embedding_vector) <> %s "
+                    "ORDER BY id LIMIT %s",
+                    [last_id, EMBEDDING_DIMENSIONS, batch_size],
+                )
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                vectors = client.embed(model=agent_settings["embedding_model"], texts=[text for _id, text in rows])
+                for (chunk_id, _text), vector in zip(rows, vectors, strict=False):
+                    if len(vector) != EMBEDDING_DIMENSIONS:
+                        raise CommandError(
+                            f"{agent_settings['embedding_model']} returned {len(vector)}-d vectors; "
+                            f"configure a {EMBEDDING_DIMENSIONS}-d EMBEDDING_MODEL first."
+                        )
+                    cursor.execute(
+                        f"UPDATE {table} SET embedding_vector = %s::vector WHERE id = %s",
+                        [_vector_literal(vector), chunk_id],
+                    )
+                reembedded += len(rows)
+                last_id = rows[-1][0]
+
+        self.stdout.write(json.dumps({"reembedded": reembedded, "dimensions": EMBEDDING_DIMENSIONS}, indent=2))
+        self.stdout.write(self.style.SUCCESS("重新嵌入完成，可以继续执行 migrate。"))
@@ -0,0 +1,16 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from src.kb.ingest import repair_chunk_counts
+
+
+class Command(BaseCommand):
+    help = "按切片记录重新计算知识库与文档的 chunk_count 计数器，修复漂移。"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-id", type=int, help="可选，仅修复指定知识库")
+
+    def handle(self, *args, **options):
+        repaired = repair_chunk_counts(base_id=options.get("base_id"))
+        self.stdout.write(json.dumps({"repaired": repaired}, ensure_ascii=False, indent=2))
@@ -1,10 +1,9 @@
-from pathlib import Path
-
 from django.conf import settings
 from django.core.management.base import BaseCommand
 from django.db import transaction
+from django.db.models import F
 
-from src.core.models import KnowledgeChunk, KnowledgeDocument
+from src.core.models import KnowledgeBase, KnowledgeChunk, KnowledgeDocument
 from src.kb import store as kb_store
 
 
@@ -29,18 +28,12 @@ class Command(BaseCommand):
         with transaction.atomic():
             chunk_deleted, _ = KnowledgeChunk.objects.all().delete()
             doc_deleted, _ = KnowledgeDocument.objects.all().delete()
+            KnowledgeBase.objects.update(chunk_count=0, corpus_generation=F("corpus_generation") + 1)
 
-        agent_settings = settings.AGENT_SETTINGS
-        if agent_settings["vector_backend"] == "faiss":
-            paths = [
-                Path(agent_settings["vstore_path"]),
-                Path(agent_settings["vstore_meta"]),
-            ]
-            for path in paths:
-                if path.exists():
-                    path.unlink()
-
-        kb_store.clear_store_cache()
+        if settings.AGENT_SETTINGS["vector_backend"] == "faiss":
+            kb_store.clear_store_files()
+        else:
+            kb_store.clear_store_cache()
 
         self.stdout.write(
             self.style.SUCCESS(
@@ -0,0 +1,34 @@
+import pgvector.django.vector
+from django.db import migrations
+
+
+def check_vector_dimensions(apps, schema_editor):
+    # vector(n) cannot hold rows of another width; refuse to migrate rather than drop them.
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT COUNT(*) FROM core_knowledgechunk "
+            "WHERE embedding_vector IS NOT NULL AND vector_dims(embedding_vector) <> 1024"
+        )
+        mismatched = cursor.fetchone()[0]
+    if mismatched:
+        raise RuntimeError(
+            f"{mismatched} knowledge chunks hold embeddings that are not 1024-dimensional. "
+            "Configure a 1024-d EMBEDDING_MODEL and run `python manage.py reembed_chunks` before migrating."
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0008_remove_fallback_completion_status"),
+    ]
+
+    operations = [
+        migrations.RunPython(check_vector_dimensions, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="knowledgechunk",
+            name="embedding_vector",
+            field=pgvector.django.vector.VectorField(blank=True, dimensions=1024, null=True),
+        ),
+    ]
@@ -0,0 +1,65 @@
+import pgvector.django.halfvec
+from django.conf import settings
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def move_json_embeddings(apps, schema_editor):
+    """Backfill embedding_vector from the JSON copy where needed, then drop JSON copies that are now redundant.
+
+    Rows whose JSON could not be backfilled (other widths, FAISS-only deployments) keep it, and
+    nothing is dropped while STORE_EMBEDDING_JSON asks for the JSON copy.
+    """
+    keep_json = settings.AGENT_SETTINGS.get("store_embedding_json", False)
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(
+            "UPDATE core_knowledgechunk SET embedding_vector = embedding::text::vector "
+            "WHERE embedding_vector IS NULL AND jsonb_typeof(embedding) = 'array' "
+            "AND jsonb_array_length(embedding) = 1024"
+        )
+        if not keep_json:
+            schema_editor.execute(
+                "UPDATE core_knowledgechunk SET embedding = '[]'::jsonb "
+                "WHERE embedding <> '[]'::jsonb AND embedding_vector IS NOT NULL"
+            )
+        return
+
+    KnowledgeChunk = apps.get_model("core", "KnowledgeChunk")
+    pending = []
+    for chunk in KnowledgeChunk.objects.exclude(embedding=[]).only("pk", "embedding", "embedding_vector").iterator():
+        if chunk.embedding_vector is None and isinstance(chunk.embedding, list) and len(chunk.embedding) == 1024:
+            chunk.embedding_vector = chunk.embedding
+        elif chunk.embedding_vector is None:
+            continue
+        if not keep_json:
+            chunk.embedding = []
+        pending.append(chunk)
+        if len(pending) >= BATCH_SIZE:
+            KnowledgeChunk.objects.bulk_update(pending, ["embedding", "embedding_vector"])
+            pending = []
+    if pending:
+        KnowledgeChunk.objects.bulk_update(pending, ["embedding", "embedding_vector"])
+
+
+def restore_json_embeddings(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(
+            "UPDATE core_knowledgechunk SET embedding = embedding_vector::text::jsonb "
+            "WHERE embedding_vector IS NOT NULL AND embedding = '[]'::jsonb"
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0009_knowledgechunk_embedding_vector_dimensions"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="knowledgechunk",
+            name="embedding_half",
+            field=pgvector.django.halfvec.HalfVectorField(blank=True, dimensions=1024, null=True),
+        ),
+        migrations.RunPython(move_json_embeddings, restore_json_embeddings),
+    ]
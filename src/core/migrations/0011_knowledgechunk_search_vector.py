@@ -0,0 +1,48 @@
+import django.contrib.postgres.search
+from django.db import migrations
+
+from src.kb.tokens import search_document
+
+BATCH_SIZE = 1000
+
+
+def index_search_vectors(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    KnowledgeChunk = apps.get_model("core", "KnowledgeChunk")
+    rows = []
+    with schema_editor.connection.cursor() as cursor:
+        for pk, text in KnowledgeChunk.objects.values_list("pk", "text").iterator(chunk_size=BATCH_SIZE):
+            rows.append((search_document(text), pk))
+            if len(rows) >= BATCH_SIZE:
+                cursor.executemany(
+                    "UPDATE core_knowledgechunk SET search_vector = to_tsvector('simple', %s) WHERE id = %s", rows
+                )
+                rows = []
+        if rows:
+            cursor.executemany(
+                "UPDATE core_knowledgechunk SET search_vector = to_tsvector('simple', %s) WHERE id = %s", rows
+            )
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS core_knowledgechunk_search_gin ON core_knowledgechunk USING gin (search_vector)"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS core_knowledgechunk_search_gin")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0010_knowledgechunk_embedding_half"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="knowledgechunk",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, null=True),
+        ),
+        migrations.RunPython(index_search_vectors, drop_search_index),
+    ]
@@ -0,0 +1,37 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_chunk_counts(apps, schema_editor):
+    KnowledgeBase = apps.get_model("core", "KnowledgeBase")
+    KnowledgeDocument = apps.get_model("core", "KnowledgeDocument")
+    KnowledgeChunk = apps.get_model("core", "KnowledgeChunk")
+    per_document = (
+        KnowledgeChunk.objects.filter(document=OuterRef("pk")).values("document").annotate(total=Count("pk")).values("total")
+    )
+    KnowledgeDocument.objects.update(chunk_count=Coalesce(Subquery(per_document), Value(0)))
+    per_base = (
+        KnowledgeDocument.objects.filter(base=OuterRef("pk")).values("base").annotate(total=Sum("chunk_count")).values("total")
+    )
+    KnowledgeBase.objects.update(chunk_count=Coalesce(Subquery(per_base), Value(0)))
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0011_knowledgechunk_search_vector"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="knowledgebase",
+            name="chunk_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="knowledgedocument",
+            name="chunk_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_chunk_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0012_chunk_counters"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="knowledgebase",
+            name="corpus_generation",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
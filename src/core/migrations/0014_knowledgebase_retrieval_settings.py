@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0013_knowledgebase_corpus_generation"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="knowledgebase",
+            name="retrieval_settings",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
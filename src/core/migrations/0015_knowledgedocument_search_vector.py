@@ -0,0 +1,49 @@
+import django.contrib.postgres.search
+from django.db import migrations
+
+from src.kb.tokens import search_document
+
+BATCH_SIZE = 1000
+
+
+def index_title_vectors(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    KnowledgeDocument = apps.get_model("core", "KnowledgeDocument")
+    rows = []
+    with schema_editor.connection.cursor() as cursor:
+        for pk, title in KnowledgeDocument.objects.values_list("pk", "title").iterator(chunk_size=BATCH_SIZE):
+            rows.append((search_document(title), pk))
+            if len(rows) >= BATCH_SIZE:
+                cursor.executemany(
+                    "UPDATE core_knowledgedocument SET search_vector = to_tsvector('simple', %s) WHERE id = %s", rows
+                )
+                rows = []
+        if rows:
+            cursor.executemany(
+                "UPDATE core_knowledgedocument SET search_vector = to_tsvector('simple', %s) WHERE id = %s", rows
+            )
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS core_knowledgedocument_search_gin "
+        "ON core_knowledgedocument USING gin (search_vector)"
+    )
+
+
+def drop_title_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS core_knowledgedocument_search_gin")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0014_knowledgebase_retrieval_settings"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="knowledgedocument",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, null=True),
+        ),
+        migrations.RunPython(index_title_vectors, drop_title_index),
+    ]
@@ -1,7 +1,11 @@
 from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.utils import timezone
-from pgvector.django import VectorField
+from pgvector.django import HalfVectorField, VectorField
+
+# Output width of the default embedding model (BAAI/bge-m3). pgvector ANN indexes need a fixed dimension.
+EMBEDDING_DIMENSIONS = 1024
 
 
 class TimestampedModel(models.Model):
@@ -107,6 +111,12 @@ class KnowledgeBase(TimestampedModel):
     )
     name = models.CharField(max_length=128)
     description = models.TextField(blank=True)
+    # Maintained by kb.ingest on ingest/delete so retrieval never has to COUNT(*) chunks.
+    chunk_count = models.PositiveIntegerField(default=0)
+    # Bumped whenever the base's documents change; part of every retrieval result cache key.
+    corpus_generation = models.PositiveIntegerField(default=0)
+    # Per-base retriever legs, fusion weights, budgets and timeouts (see kb.retrievers).
+    retrieval_settings = models.JSONField(default=dict, blank=True)
 
     class Meta:
         unique_together = ("user", "name")
@@ -129,6 +139,9 @@ class KnowledgeDocument(TimestampedModel):
     title = models.CharField(max_length=255)
     source_path = models.CharField(max_length=512, blank=True)
     metadata = models.JSONField(default=dict, blank=True)
+    chunk_count = models.PositiveIntegerField(default=0)
+    # Title terms in the same form as KnowledgeChunk.search_vector; GIN-indexed for the title leg.
+    search_vector = SearchVectorField(null=True, blank=True)
 
     def __str__(self) -> str:
         return self.title
@@ -141,8 +154,13 @@ class KnowledgeChunk(TimestampedModel):
     document = models.ForeignKey(KnowledgeDocument, related_name="chunks", on_delete=models.CASCADE)
     chunk_id = models.CharField(max_length=64)
     text = models.TextField()
+    # Legacy JSON copy of the vector; only written when STORE_EMBEDDING_JSON is enabled.
     embedding = models.JSONField(default=list, blank=True)
-    embedding_vector = VectorField(dimensions=None, null=True, blank=True)
+    embedding_vector = VectorField(dimensions=EMBEDDING_DIMENSIONS, null=True, blank=True)
+    # Half-precision storage used when PGVECTOR_STORAGE=halfvec (pgvector >= 0.7).
+    embedding_half = HalfVectorField(dimensions=EMBEDDING_DIMENSIONS, null=True, blank=True)
+    # to_tsvector('simple', ...) over latin words plus CJK unigrams/bigrams; GIN-indexed on PostgreSQL.
+    search_vector = SearchVectorField(null=True, blank=True)
     metadata = models.JSONField(default=dict, blank=True)
 
     class Meta:
@@ -0,0 +1,144 @@
+"""Incremental BM25 inverted index used by the FAISS backend's lexical search."""
+
+from __future__ import annotations
+
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Set, Tuple
+
+import numpy as np
+
+from .tokens import search_terms
+
+
+class BM25Index:
+    """Postings keyed by row id (the FAISS metadata position).
+
+    Persisted postings are kept in CSR form (``offsets`` into ``rows``/``tfs``); rows added
+    since the last load live in a small ``tail`` dict and are merged on ``write``.
+    """
+
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self) -> None:
+        self.term_slots: Dict[str, int] = {}
+        self.offsets = np.zeros(1, dtype="int64")
+        self.rows = np.empty(0, dtype="int64")
+        self.tfs = np.empty(0, dtype="int32")
+        self.lengths = np.empty(0, dtype="int32")
+        self.tail: Dict[str, Tuple[List[int], List[int]]] = {}
+        self.tail_lengths: List[int] = []
+        self._all_lengths: np.ndarray | None = None
+
+    def __len__(self) -> int:
+        return len(self.lengths) + len(self.tail_lengths)
+
+    @classmethod
+    def read(cls, path: Path) -> "BM25Index | None":
+        if not path.exists():
+            return None
+        index = cls()
+        with np.load(path, allow_pickle=False) as data:
+            index.term_slots = {term: slot for slot, term in enumerate(data["terms"].tolist())}
+            index.offsets = data["offsets"]
+            index.rows = data["rows"]
+            index.tfs = data["tfs"]
+            index.lengths = data["lengths"]
+        return index
+
+    def add(self, texts: Iterable[str]) -> None:
+        """Index the next rows in order (row ids continue from ``len(self)``)."""
+        row = len(self)
+        for text in texts:
+            counts = Counter(search_terms(text))
+            for term, tf in counts.items():
+                rows, tfs = self.tail.setdefault(term, ([], []))
+                rows.append(row)
+                tfs.append(tf)
+            self.tail_lengths.append(sum(counts.values()))
+            row += 1
+        self._all_lengths = None
+
+    def _postings(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        parts_rows: List[np.ndarray] = []
+        parts_tfs: List[np.ndarray] = []
+        slot = self.term_slots.get(term)
+        if slot is not None:
+            start, stop = self.offsets[slot], self.offsets[slot + 1]
+            parts_rows.append(self.rows[start:stop])
+            parts_tfs.append(self.tfs[start:stop])
+        if term in self.tail:
+            rows, tfs = self.tail[term]
+            parts_rows.append(np.asarray(rows, dtype="int64"))
+            parts_tfs.append(np.asarray(tfs, dtype="int32"))
+        if not parts_rows:
+            return np.empty(0, dtype="int64"), np.empty(0, dtype="int32")
+        return np.concatenate(parts_rows), np.concatenate(parts_tfs)
+
+    def search(self, query: str, *, exclude: Set[int] | None = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Return ``(rows, scores)`` of every matching row, best first."""
+        total = len(self)
+        terms = list(dict.fromkeys(search_terms(query)))
+        if not total or not terms:
+            return np.empty(0, dtype="int64"), np.empty(0, dtype="float32")
+        if self._all_lengths is None:
+            self._all_lengths = np.concatenate([self.lengths, np.asarray(self.tail_lengths, dtype="int32")]).astype(
+                "float32"
+            )
+        lengths = self._all_lengths
+        avgdl = max(float(lengths.mean()), 1.0)
+
+        hit_rows: List[np.ndarray] = []
+        hit_scores: List[np.ndarray] = []
+        for term in terms:
+            rows, tfs = self._postings(term)
+            if not len(rows):
+                continue
+            idf = np.log1p((total - len(rows) + 0.5) / (len(rows) + 0.5))
+            tf = tfs.astype("float32")
+            norm = self.k1 * (1 - self.b + self.b * lengths[rows] / avgdl)
+            hit_rows.append(rows)
+            hit_scores.append(idf * tf * (self.k1 + 1) / (tf + norm))
+        if not hit_rows:
+            return np.empty(0, dtype="int64"), np.empty(0, dtype="float32")
+
+        candidates, inverse = np.unique(np.concatenate(hit_rows), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(hit_scores)).astype("float32")
+        if exclude:
+            keep = ~np.isin(candidates, np.fromiter(exclude, dtype="int64", count=len(exclude)))
+            candidates, scores = candidates[keep], scores[keep]
+        order = np.argsort(-scores, kind="stable")
+        return candidates[order], scores[order]
+
+    def write(self, temp_name: str) -> None:
+        """Merge the tail into CSR postings and write them as ``.npz`` to ``temp_name``."""
+        terms = list(self.term_slots)
+        for term in self.tail:
+            if term not in self.term_slots:
+                terms.append(term)
+        rows_parts: List[np.ndarray] = []
+        tfs_parts: List[np.ndarray] = []
+        offsets = np.zeros(len(terms) + 1, dtype="int64")
+        for slot, term in enumerate(terms):
+            rows, tfs = self._postings(term)
+            rows_parts.append(rows)
+            tfs_parts.append(tfs)
+            offsets[slot + 1] = offsets[slot] + len(rows)
+
+        self.term_slots = {term: slot for slot, term in enumerate(terms)}
+        self.offsets = offsets
+        self.rows = np.concatenate(rows_parts) if rows_parts else np.empty(0, dtype="int64")
+        self.tfs = np.concatenate(tfs_parts) if tfs_parts else np.empty(0, dtype="int32")
+        self.lengths = np.concatenate([self.lengths, np.asarray(self.tail_lengths, dtype="int32")])
+        self.tail = {}
+        self.tail_lengths = []
+        with open(temp_name, "wb") as handle:
+            np.savez(
+                handle,
+                terms=np.asarray(terms, dtype=str),
+                offsets=self.offsets,
+                rows=self.rows,
+                tfs=self.tfs,
+                lengths=self.lengths,
+            )
@@ -0,0 +1,206 @@
+"""Retrieval caches: an in-process LRU in front of an optional shared Redis tier."""
+
+from __future__ import annotations
+
+import abc
+import hashlib
+import json
+import logging
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+from django.conf import settings
+
+try:  # pragma: no cover - optional dependency (installed with celery[redis])
+    import redis
+except ImportError:  # pragma: no cover
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+class LRUCache:
+    """Size-bounded, TTL-aware LRU; safe to share between request threads."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float) -> None:
+        self.max_entries = max(int(max_entries), 1)
+        self.ttl_seconds = float(ttl_seconds)
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class TieredCache(abc.ABC):
+    """In-process LRU of encoded values in front of an optional Redis tier with the same TTL."""
+
+    prefix = "kb:"
+
+    def __init__(self, *, max_entries: int, ttl_seconds: int, redis_url: str = "") -> None:
+        self.local = LRUCache(max_entries, ttl_seconds)
+        self.ttl_seconds = int(ttl_seconds)
+        self.redis = None
+        if redis_url and redis is not None:
+            # Short timeouts: a slow or absent Redis must never cost more than the work it caches.
+            self.redis = redis.Redis.from_url(redis_url, socket_timeout=0.2, socket_connect_timeout=0.2)
+        self.counters = {"local_hits": 0, "redis_hits": 0, "misses": 0}
+        self._counter_lock = threading.Lock()
+
+    @abc.abstractmethod
+    def _encode(self, value: Any) -> bytes:
+        """Serialize a value for both tiers."""
+
+    @abc.abstractmethod
+    def _decode(self, raw: bytes) -> Any:
+        """Inverse of :meth:`_encode`."""
+
+    def _count(self, counter: str) -> None:
+        with self._counter_lock:
+            self.counters[counter] += 1
+
+    def _key(self, *parts: Any) -> str:
+        digest = hashlib.sha256("\x00".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+        return f"{self.prefix}{digest}"
+
+    def lookup(self, key: str) -> Tuple[Any, str]:
+        """Return ``(value, tier)`` where tier is ``local``, ``redis`` or ``miss``."""
+        raw = self.local.get(key)
+        if raw is not None:
+            self._count("local_hits")
+            return self._decode(raw), "local"
+        if self.redis is not None:
+            try:
+                raw = self.redis.get(key)
+            except redis.RedisError as exc:
+                logger.warning("Cache read from Redis failed: %s", exc)
+                raw = None
+            if raw:
+                self.local.set(key, raw)
+                self._count("redis_hits")
+                return self._decode(raw), "redis"
+        self._count("misses")
+        return None, "miss"
+
+    def store(self, key: str, value: Any) -> None:
+        raw = self._encode(value)
+        self.local.set(key, raw)
+        if self.redis is not None:
+            try:
+                self.redis.set(key, raw, ex=self.ttl_seconds)
+            except redis.RedisError as exc:
+                logger.warning("Cache write to Redis failed: %s", exc)
+
+    def stats(self) -> Dict[str, int]:
+        with self._counter_lock:
+            counters = dict(self.counters)
+        return {**counters, "local_entries": len(self.local)}
+
+
+class EmbeddingCache(TieredCache):
+    """Query vectors keyed on ``(model, normalized text)``, stored as float32 bytes."""
+
+    prefix = "kb:embed:"
+
+    def _encode(self, value: List[float]) -> bytes:
+        return np.asarray(value, dtype="float32").tobytes()
+
+    def _decode(self, raw: bytes) -> List[float]:
+        return np.frombuffer(raw, dtype="float32").tolist()
+
+    def key(self, model: str, text: str) -> str:
+        return self._key(model, normalize_query(text))
+
+    def get(self, model: str, text: str) -> Tuple[List[float] | None, str]:
+        return self.lookup(self.key(model, text))
+
+    def set(self, model: str, text: str, vector: List[float]) -> None:
+        self.store(self.key(model, text), vector)
+
+
+class ResultCache(TieredCache):
+    """Formatted retrieval payloads keyed on base, corpus generation, query and retrieval settings."""
+
+    prefix = "kb:result:"
+
+    def _encode(self, value: Dict[str, Any]) -> bytes:
+        return json.dumps(value, ensure_ascii=False, default=float).encode("utf-8")
+
+    def _decode(self, raw: bytes) -> Dict[str, Any]:
+        return json.loads(raw)
+
+    def key(self, *, base_id: Any, generation: int, query: str, top_k: int, config: Tuple[Any, ...]) -> str:
+        return self._key(base_id, generation, normalize_query(query), top_k, *config)
+
+
+_EMBEDDING_CACHE: Dict[Tuple[Any, ...], EmbeddingCache] = {}
+
+
+def get_embedding_cache() -> EmbeddingCache | None:
+    agent_settings = settings.AGENT_SETTINGS
+    if not agent_settings.get("embedding_cache_enabled", True):
+        return None
+    config = (
+        agent_settings.get("embedding_cache_size", 2048),
+        agent_settings.get("embedding_cache_ttl", 86400),
+        agent_settings.get("embedding_cache_redis_url", ""),
+    )
+    if config not in _EMBEDDING_CACHE:
+        _EMBEDDING_CACHE[config] = EmbeddingCache(max_entries=config[0], ttl_seconds=config[1], redis_url=config[2])
+    return _EMBEDDING_CACHE[config]
+
+
+def clear_embedding_cache() -> None:
+    _EMBEDDING_CACHE.clear()
+
+
+_RESULT_CACHE: Dict[Tuple[Any, ...], ResultCache] = {}
+
+
+def get_result_cache() -> ResultCache | None:
+    agent_settings = settings.AGENT_SETTINGS
+    if not agent_settings.get("result_cache_enabled", True):
+        return None
+    config = (
+        agent_settings.get("result_cache_size", 512),
+        agent_settings.get("result_cache_ttl", 600),
+        agent_settings.get("result_cache_redis_url", ""),
+    )
+    if config not in _RESULT_CACHE:
+        _RESULT_CACHE[config] = ResultCache(max_entries=config[0], ttl_seconds=config[1], redis_url=config[2])
+    return _RESULT_CACHE[config]
+
+
+def clear_result_cache() -> None:
+    _RESULT_CACHE.clear()
@@ -5,15 +5,20 @@ from typing import Any, Dict, Iterable, List, Optional
 
 from django.conf import settings
 from django.db import transaction
+from django.db.models import Count, F, Value
+from django.db.models.functions import Greatest
 
 from docx import Document as DocxDocument
 from PyPDF2 import PdfReader
 
 from src.agents.utils import build_client
-from src.core.models import KnowledgeChunk, KnowledgeDocument
+from src.core.models import EMBEDDING_DIMENSIONS, KnowledgeBase, KnowledgeChunk, KnowledgeDocument
+from src.services.jobs import enqueue_vector_compaction
 from src.services.ppt import extract_text as extract_ppt_text
 
+from . import store as kb_store
 from .store import get_store
+from .tokens import term_ids
 
 ALLOWED_EXTENSIONS = {".txt", ".pdf", ".docx", ".pptx"}
 
@@ -132,6 +137,8 @@ def ingest_documents(*, files: Iterable[Any], base) -> Dict[str, Any]:
             title=title,
             source_path=name,
             metadata={k: v for k, v in metadata.items() if v is not None},
+            chunk_count=len(chunks),
+            **kb_store.search_fields(title),
         )
         documents_summary.append(
             {
@@ -154,6 +161,8 @@ def ingest_documents(*, files: Iterable[Any], base) -> Dict[str, Any]:
                     "metadata": {
                         "position": index,
                         "source": name,
+                        # Precomputed once so lexical scoring and rerank never re-tokenize the chunk.
+                        "term_ids": term_ids(chunk),
                     },
                     "document": document,
                 }
@@ -163,6 +172,11 @@ def ingest_documents(*, files: Iterable[Any], base) -> Dict[str, Any]:
         return {"docs_created": 0, "chunks": 0, "backend": backend, "dim": 0}
 
     embedding_vectors = client.embed(model=agent_settings["embedding_model"], texts=chunk_texts)
+    if backend == "pgvector" and embedding_vectors and len(embedding_vectors[0]) != EMBEDDING_DIMENSIONS:
+        raise ValueError(
+            f"Embedding model returned {len(embedding_vectors[0])}-d vectors, "
+            f"but the pgvector column is vector({EMBEDDING_DIMENSIONS})."
+        )
 
     for record, embedding in zip(chunk_records, embedding_vectors, strict=False):
         KnowledgeChunk.objects.update_or_create(
@@ -170,11 +184,15 @@ def ingest_documents(*, files: Iterable[Any], base) -> Dict[str, Any]:
             chunk_id=record["chunk_id"],
             defaults={
                 "text": record["text"],
-                "embedding": list(embedding),
-                "embedding_vector": list(embedding),
                 "metadata": record["metadata"],
+                **kb_store.chunk_vector_fields(embedding),
+                **kb_store.search_fields(record["text"]),
             },
         )
+    KnowledgeBase.objects.filter(pk=base.pk).update(
+        chunk_count=F("chunk_count") + len(chunk_records),
+        corpus_generation=F("corpus_generation") + 1,
+    )
 
     metadata_payload = [
         {
@@ -187,7 +205,9 @@ def ingest_documents(*, files: Iterable[Any], base) -> Dict[str, Any]:
         }
         for record in chunk_records
     ]
-    store.upsert_embeddings(embeddings=embedding_vectors, metadata=metadata_payload)
+    if backend != "pgvector":
+        # pgvector rows already carry their vector from the insert above.
+        store.upsert_embeddings(embeddings=embedding_vectors, metadata=metadata_payload)
 
     dimension = len(embedding_vectors[0]) if embedding_vectors else 0
     document_payload = [
@@ -207,3 +227,75 @@ def ingest_documents(*, files: Iterable[Any], base) -> Dict[str, Any]:
         "dim": dimension,
         "documents": document_payload,
     }
+
+
+def _remove_vectors(grouped: Dict[Any, List[str]]) -> None:
+    for base_id, doc_ids in grouped.items():
+        if base_id is None:
+            continue
+        if kb_store.remove_documents(base_id=base_id, doc_ids=doc_ids):
+            # Results cached between the commit and this removal may still hold the deleted chunks.
+            KnowledgeBase.objects.filter(pk=base_id).update(corpus_generation=F("corpus_generation") + 1)
+            enqueue_vector_compaction(base_id=base_id)
+
+
+@transaction.atomic
+def delete_documents(*, documents) -> int:
+    """Delete documents (and their chunks) and drop their vectors once the transaction commits."""
+    grouped: Dict[Any, List[str]] = {}
+    removed_chunks: Dict[Any, int] = {}
+    for base_id, doc_id, chunk_count in documents.values_list("base_id", "doc_id", "chunk_count"):
+        grouped.setdefault(base_id, []).append(doc_id)
+        removed_chunks[base_id] = removed_chunks.get(base_id, 0) + chunk_count
+    deleted_count, _ = documents.delete()
+    for base_id, chunk_count in removed_chunks.items():
+        if base_id is not None:
+            KnowledgeBase.objects.filter(pk=base_id).update(
+                chunk_count=Greatest(F("chunk_count") - chunk_count, Value(0)),
+                corpus_generation=F("corpus_generation") + 1,
+            )
+    transaction.on_commit(lambda: _remove_vectors(grouped))
+    return deleted_count
+
+
+@transaction.atomic
+def delete_base(*, base) -> None:
+    """Delete a knowledge base and its whole vector partition once the transaction commits."""
+    base_id = base.pk
+    base.delete()
+    transaction.on_commit(lambda: kb_store.drop_base(base_id=base_id))
+
+
+@transaction.atomic
+def repair_chunk_counts(*, base_id: Any = None) -> List[Dict[str, Any]]:
+    """Recompute the maintained ``chunk_count`` counters from the chunk rows; returns the bases that drifted."""
+    bases = KnowledgeBase.objects.select_for_update()
+    documents = KnowledgeDocument.objects.select_for_update()
+    if base_id is not None:
+        bases = bases.filter(pk=base_id)
+        documents = documents.filter(base_id=base_id)
+
+    actual_by_document = dict(
+        KnowledgeChunk.objects.filter(document__in=documents.values("pk"))
+        .values("document")
+        .annotate(total=Count("pk"))
+        .values_list("document", "total")
+    )
+    stale_documents = []
+    actual_by_base: Dict[Any, int] = {}
+    for document in documents.only("pk", "base_id", "chunk_count"):
+        actual = actual_by_document.get(document.pk, 0)
+        actual_by_base[document.base_id] = actual_by_base.get(document.base_id, 0) + actual
+        if document.chunk_count != actual:
+            document.chunk_count = actual
+            stale_documents.append(document)
+    KnowledgeDocument.objects.bulk_update(stale_documents, ["chunk_count"], batch_size=1000)
+
+    repaired: List[Dict[str, Any]] = []
+    for base in bases.only("pk", "chunk_count"):
+        actual = actual_by_base.get(base.pk, 0)
+        if base.chunk_count != actual:
+            repaired.append({"base_id": base.pk, "before": base.chunk_count, "after": actual})
+            base.chunk_count = actual
+            base.save(update_fields=["chunk_count"])
+    return repaired
@@ -1,23 +1,44 @@
 from __future__ import annotations
 
-import re
+from itertools import chain
 from typing import Any, Dict, List, Tuple
 
+import numpy as np
 
-def _tokenize(text: str) -> List[str]:
-    raw = (text or "").lower()
-    words = re.findall(r"[a-z0-9_]+", raw)
-    cjk_chars = re.findall(r"[\u4e00-\u9fff]", raw)
-    return words + cjk_chars
+from .tokens import chunk_term_ids, query_term_ids
 
 
-def _overlap_ratio(query: str, text: str) -> float:
-    query_tokens = _tokenize(query)
-    text_tokens = set(_tokenize(text))
-    if not query_tokens or not text_tokens:
-        return 0.0
-    matched = sum(1 for token in query_tokens if token in text_tokens)
-    return matched / len(query_tokens)
+def _overlap_ratios(query_ids: List[int], id_lists: List[List[int]]) -> np.ndarray:
+    """``overlap_ratio`` for every candidate at once.
+
+    Each candidate's sorted ids are offset by ``row << 32`` (term ids are crc32 values), so the
+    flattened array stays sorted and one ``searchsorted`` probes every (candidate, query term) pair.
+    """
+    ratios = np.zeros(len(id_lists), dtype="float64")
+    lengths = np.fromiter(map(len, id_lists), dtype="int64", count=len(id_lists))
+    total = int(lengths.sum())
+    if not query_ids or not total:
+        return ratios
+    rows = np.arange(len(id_lists), dtype="int64") << 32
+    flat = np.fromiter(chain.from_iterable(id_lists), dtype="int64", count=total)
+    flat += np.repeat(rows, lengths)
+    probes = rows[:, None] + np.asarray(query_ids, dtype="int64")[None, :]
+    positions = np.minimum(np.searchsorted(flat, probes), total - 1)
+    return (flat[positions] == probes).sum(axis=1) / len(query_ids)
+
+
+def _top_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """Indices of the ``top_k`` best scores, best first, ties in input order (same as a stable sort)."""
+    if top_k <= 0:
+        return np.empty(0, dtype="int64")
+    if top_k < len(scores):
+        kth = np.partition(scores, len(scores) - top_k)[len(scores) - top_k]
+        above = np.flatnonzero(scores > kth)
+        ties = np.flatnonzero(scores == kth)[: top_k - len(above)]
+        chosen = np.concatenate([above, ties])
+    else:
+        chosen = np.arange(len(scores))
+    return chosen[np.lexsort((chosen, -scores[chosen]))]
 
 
 def rerank_results(
@@ -26,20 +47,146 @@ def rerank_results(
     results: List[Tuple[float, Dict[str, Any]]],
     top_k: int,
 ) -> List[Tuple[float, Dict[str, Any]]]:
-    rescored: List[Tuple[float, Dict[str, Any]]] = []
-    for base_score, metadata in results:
-        overlap = _overlap_ratio(query, str(metadata.get("text", "")))
-        source_count = len(metadata.get("retrieval_sources", ["vector"]))
-        rerank_score = float(base_score) + (0.2 * overlap) + (0.03 * min(source_count, 2))
-        rescored.append(
+    """Rescore candidates as arrays, select ``top_k`` without a full sort, copy metadata for survivors only."""
+    if not results:
+        return []
+    count = len(results)
+    base_scores = np.fromiter((score for score, _metadata in results), dtype="float64", count=count)
+    source_counts = np.fromiter(
+        (len(metadata.get("retrieval_sources", ["vector"])) for _score, metadata in results), dtype="float64", count=count
+    )
+    overlaps = _overlap_ratios(query_term_ids(query), [chunk_term_ids(metadata) for _score, metadata in results])
+    scores = base_scores + 0.2 * overlaps + 0.03 * np.minimum(source_counts, 2)
+
+    reranked: List[Tuple[float, Dict[str, Any]]] = []
+    for index in _top_indices(scores, top_k).tolist():
+        score = float(scores[index])
+        reranked.append(
             (
-                rerank_score,
+                score,
                 {
-                    **metadata,
-                    "rerank_score": round(rerank_score, 6),
-                    "overlap_score": round(overlap, 6),
+                    **results[index][1],
+                    "rerank_score": round(score, 6),
+                    "overlap_score": round(float(overlaps[index]), 6),
                 },
             )
         )
-    rescored.sort(key=lambda item: item[0], reverse=True)
-    return rescored[:top_k]
+    return reranked
+
+
+def _term_vectors(results: List[Tuple[float, Dict[str, Any]]], dims: int) -> np.ndarray:
+    """L2-normalised hashed bags of each candidate's precomputed term ids."""
+    vectors = np.zeros((len(results), dims), dtype="float32")
+    for row, (_score, metadata) in enumerate(results):
+        ids = np.asarray(chunk_term_ids(metadata), dtype="int64")
+        if len(ids):
+            vectors[row, ids % dims] = 1.0
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def mmr_select(
+    results: List[Tuple[float, Dict[str, Any]]],
+    top_k: int,
+    *,
+    diversity: float = 0.3,
+    dims: int = 4096,
+) -> List[Tuple[float, Dict[str, Any]]]:
+    """Maximal-marginal-relevance pick of ``top_k`` candidates (input must be best-first).
+
+    Relevance is the candidate score scaled to [0, 1] by the best score; redundancy is the cosine
+    similarity of the candidates' hashed term vectors to anything already picked.
+    """
+    if len(results) <= 1 or top_k <= 1 or diversity <= 0:
+        return results[:top_k]
+    scores = np.asarray([score for score, _metadata in results], dtype="float32")
+    if scores.min() >= 0 and scores.max() > 0:
+        relevance = scores / scores.max()
+    else:
+        spread = float(scores.max() - scores.min())
+        relevance = (scores - scores.min()) / spread if spread > 0 else np.ones_like(scores)
+    vectors = _term_vectors(results, dims)
+    similarity = vectors @ vectors.T
+
+    picked = [0]
+    redundancy = similarity[0].copy()
+    available = np.ones(len(results), dtype=bool)
+    available[0] = False
+    for _ in range(min(top_k, len(results)) - 1):
+        marginal = (1.0 - diversity) * relevance - diversity * redundancy
+        marginal[~available] = -np.inf
+        choice = int(np.argmax(marginal))
+        picked.append(choice)
+        available[choice] = False
+        np.maximum(redundancy, similarity[choice], out=redundancy)
+    return [results[index] for index in picked]
+
+
+def _overlap_length(left: str, right: str, limit: int = 400) -> int:
+    for size in range(min(len(left), len(right), limit), 0, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def _absorb(block: Dict[str, Any], other: Dict[str, Any], positions: List[int]) -> None:
+    """Join a run of positions directly before or after ``block`` into it."""
+    if positions[-1] < block["metadata"]["positions"][0]:
+        block["text"] = other["text"] + block["text"][_overlap_length(other["text"], block["text"]) :]
+        block["refs"] = list(other["refs"]) + block["refs"]
+        block["metadata"]["positions"] = positions + block["metadata"]["positions"]
+        block["metadata"]["position"] = positions[0]
+    else:
+        block["text"] = block["text"] + other["text"][_overlap_length(block["text"], other["text"]) :]
+        block["refs"] = block["refs"] + list(other["refs"])
+        block["metadata"]["positions"] = block["metadata"]["positions"] + positions
+    sources = block["metadata"].get("retrieval_sources", [])
+    for source in other["metadata"].get("retrieval_sources", []):
+        if source not in sources:
+            sources = [*sources, source]
+    block["metadata"]["retrieval_sources"] = sources
+
+
+def _touching(blocks: List[Dict[str, Any]], block: Dict[str, Any] | None, position: int) -> Dict[str, Any] | None:
+    """The block other than ``block`` that ``position`` extends at either end, if any."""
+    for candidate in blocks:
+        if candidate is block:
+            continue
+        first, last = candidate["metadata"]["positions"][0], candidate["metadata"]["positions"][-1]
+        if position in (first - 1, last + 1):
+            return candidate
+    return None
+
+
+def merge_adjacent(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Coalesce formatted hits from consecutive positions of one document into a single block.
+
+    The block keeps the rank of its best member, drops the text the chunks share and lists
+    every member in ``refs``. A hit that bridges two blocks of a document joins all three.
+    """
+    blocks: List[Dict[str, Any]] = []
+    by_doc: Dict[Any, List[Dict[str, Any]]] = {}
+    for item in results:
+        position = (item.get("metadata") or {}).get("position")
+        doc_id = item["refs"][0].get("doc_id") if item.get("refs") else None
+        block = None
+        if isinstance(position, int) and doc_id is not None:
+            block = _touching(by_doc.get(doc_id, []), None, position)
+        if block is None:
+            block = {**item, "refs": list(item.get("refs", [])), "metadata": {**(item.get("metadata") or {})}}
+            if isinstance(position, int) and doc_id is not None:
+                block["metadata"]["positions"] = [position]
+                by_doc.setdefault(doc_id, []).append(block)
+            blocks.append(block)
+            continue
+        _absorb(block, item, [position])
+        bridged = _touching(by_doc[doc_id], block, position)
+        if bridged is None:
+            continue
+        # The better-ranked block survives and takes over the other one.
+        ranked_first = next(candidate for candidate in blocks if candidate is block or candidate is bridged)
+        keep, absorbed = (block, bridged) if ranked_first is block else (bridged, block)
+        _absorb(keep, absorbed, absorbed["metadata"]["positions"])
+        blocks = [candidate for candidate in blocks if candidate is not absorbed]
+        by_doc[doc_id] = [candidate for candidate in by_doc[doc_id] if candidate is not absorbed]
+    return blocks
@@ -1,39 +1,56 @@
-from typing import Any, Dict, List
+import json
+import logging
+import math
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeout
+from dataclasses import replace
+from typing import Any, Callable, Dict, List
 
 from django.conf import settings
+from django.db import close_old_connections
 
 from src.agents.utils import build_client
-from src.core.models import KnowledgeBase, KnowledgeDocument
+from src.core.models import KnowledgeBase
 
-from .rerank import rerank_results
+from .cache import get_embedding_cache, get_result_cache
+from .rerank import merge_adjacent, mmr_select, rerank_results
+from .retrievers import LegPlan, LegRequest, plan_legs
 from .store import get_store
 
+logger = logging.getLogger(__name__)
+
 
 def _fuse_ranked_results(
-    vector_results: List[tuple[float, Dict[str, Any]]],
-    lexical_results: List[tuple[float, Dict[str, Any]]],
+    leg_results: Dict[str, List[tuple[float, Dict[str, Any]]]],
     *,
     top_k: int,
     rrf_k: int = 60,
+    weights: Dict[str, float] | None = None,
 ) -> List[tuple[float, Dict[str, Any]]]:
+    """Weighted reciprocal-rank fusion over any number of named legs (weights default to 1)."""
     fused: Dict[tuple[str, str], Dict[str, Any]] = {}
+    weights = weights or {}
 
-    def ingest(results: List[tuple[float, Dict[str, Any]]], source: str) -> None:
+    for source, results in leg_results.items():
+        weight = float(weights.get(source, 1.0))
+        if weight <= 0:
+            continue
         for rank, (_score, metadata) in enumerate(results, start=1):
             key = (str(metadata.get("doc_id", "")), str(metadata.get("chunk_id", "")))
             if key not in fused:
-                fused[key] = {"score": 0.0, "metadata": metadata.copy(), "sources": []}
-            fused[key]["score"] += 1.0 / (rrf_k + rank)
+                fused[key] = {"score": 0.0, "metadata": metadata.copy(), "sources": [], "ranks": {}}
+            fused[key]["score"] += weight / (rrf_k + rank)
             fused[key]["sources"].append(source)
-
-    ingest(vector_results, "vector")
-    ingest(lexical_results, "lexical")
+            fused[key]["ranks"][source] = rank
 
     ranked = sorted(fused.values(), key=lambda item: item["score"], reverse=True)
     return [
         (
             float(item["score"]),
-            {**item["metadata"], "retrieval_sources": item["sources"]},
+            {**item["metadata"], "retrieval_sources": item["sources"], "source_ranks": item["ranks"]},
         )
         for item in ranked[:top_k]
     ]
@@ -50,6 +67,9 @@ def _summarize_retrieval_diagnostics(
     vector_results: List[tuple[float, Dict[str, Any]]],
     lexical_results: List[tuple[float, Dict[str, Any]]],
     final_results: List[tuple[float, Dict[str, Any]]],
+    embedding_cache: Dict[str, Any] | None = None,
+    degraded_legs: List[str] | None = None,
+    timings: Dict[str, float] | None = None,
 ) -> Dict[str, Any]:
     source_counts = {"vector": 0, "lexical": 0}
     for _score, metadata in final_results:
@@ -67,9 +87,198 @@ def _summarize_retrieval_diagnostics(
         "lexical_hits": len(lexical_results),
         "final_hits": len(final_results),
         "source_counts": source_counts,
+        "embedding_cache": embedding_cache or {},
+        "degraded_legs": degraded_legs or [],
+        "timings_ms": {**dict.fromkeys(RETRIEVAL_STAGES, 0.0), **(timings or {})},
+        "cache_hits": {
+            "embedding": (embedding_cache or {}).get("tier") in {"local", "redis"},
+            "result": False,
+        },
     }
 
 
+RETRIEVAL_STAGES = ("embed_ms", "count_ms", "vector_ms", "lexical_ms", "fuse_ms", "rerank_ms")
+
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000.0, 3)
+
+
+def _timed(timings: Dict[str, float], stage: str, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Call ``func`` and add its wall time to ``timings[stage]``."""
+    started = time.perf_counter()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        timings[stage] = timings.get(stage, 0.0) + _elapsed_ms(started)
+
+
+_LEG_POOL: ThreadPoolExecutor | None = None
+_LEG_POOL_LOCK = threading.Lock()
+
+
+def _leg_pool() -> ThreadPoolExecutor:
+    global _LEG_POOL
+    with _LEG_POOL_LOCK:
+        if _LEG_POOL is None:
+            _LEG_POOL = ThreadPoolExecutor(
+                max_workers=max(int(settings.AGENT_SETTINGS.get("retrieval_leg_workers", 4)), 1),
+                thread_name_prefix="kb-retrieval",
+            )
+        return _LEG_POOL
+
+
+def _run_leg(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    # Pool threads hold their own DB connections; recycle them like a request would.
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+def _submit_leg(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+    return _leg_pool().submit(_run_leg, func, *args, **kwargs)
+
+
+def _leg_result(future: Future, started: float, timeout_ms: float, name: str, degraded_legs: List[str]) -> List[Any]:
+    """Wait for a leg until ``timeout_ms`` after ``started``; a late leg is dropped and recorded as degraded."""
+    remaining = max(float(timeout_ms) / 1000.0 - (time.monotonic() - started), 0.0)
+    try:
+        return future.result(timeout=remaining)
+    except FuturesTimeout:
+        future.cancel()
+        logger.warning("Retrieval %s leg exceeded %sms; continuing without it.", name, timeout_ms)
+        degraded_legs.append(name)
+        return []
+
+
+def _candidate_budget(top_k: int, total_entries: int, agent_settings: Dict[str, Any]) -> int:
+    """Candidates per leg: ``top_k * multiplier`` widened logarithmically with base size, then capped."""
+    multiplier = max(int(agent_settings.get("retrieval_candidate_multiplier", 3)), 1)
+    ceiling = max(int(agent_settings.get("retrieval_max_candidates", 200)), top_k)
+    budget = top_k * multiplier + int(top_k * math.log10(max(total_entries, 1)))
+    return min(total_entries, ceiling, budget)
+
+
+def _embed_queries(queries: List[str], agent_settings: Dict[str, Any]) -> tuple[List[List[float]], List[str], Dict[str, int]]:
+    """Embed through the LRU/Redis cache with at most one ``client.embed`` call for all misses.
+
+    Returns the vectors, the cache tier that served each query, and the cache counters.
+    """
+    model = agent_settings["embedding_model"]
+    cache = get_embedding_cache()
+    vectors: List[List[float] | None] = []
+    tiers: List[str] = []
+    for query in queries:
+        vector, tier = cache.get(model, query) if cache is not None else (None, "disabled")
+        vectors.append(vector)
+        tiers.append(tier)
+    missing = [index for index, vector in enumerate(vectors) if vector is None]
+    if missing:
+        client = build_client(agent_settings)
+        embedded = client.embed(model=model, texts=[queries[index] for index in missing])
+        for index, vector in zip(missing, embedded, strict=False):
+            vectors[index] = vector
+            if cache is not None:
+                cache.set(model, queries[index], vector)
+    return vectors, tiers, cache.stats() if cache is not None else {}
+
+
+def _embed_query(query: str, agent_settings: Dict[str, Any]) -> tuple[List[float], Dict[str, Any]]:
+    vectors, tiers, stats = _embed_queries([query], agent_settings)
+    return vectors[0], {"tier": tiers[0], **stats}
+
+
+def _result_cache_config(agent_settings: Dict[str, Any]) -> tuple[Any, ...]:
+    """Settings that change what a retrieval returns; any change keys a fresh result cache entry."""
+    return tuple(
+        agent_settings.get(key)
+        for key in (
+            "vector_backend",
+            "embedding_model",
+            "hybrid_retrieval",
+            "rerank_enabled",
+            "retrieval_candidate_multiplier",
+            "retrieval_max_candidates",
+            "retrieval_legs",
+            "retrieval_rrf_k",
+            "retrieval_mmr_enabled",
+            "retrieval_mmr_diversity",
+            "retrieval_merge_adjacent",
+            # Index type, compression and search parameters change which approximate neighbours come back.
+            "faiss_index_type",
+            "faiss_ann_threshold",
+            "faiss_hnsw_m",
+            "faiss_hnsw_ef_construction",
+            "faiss_hnsw_ef_search",
+            "faiss_ivf_nlist",
+            "faiss_ivf_nprobe",
+            "faiss_compression",
+            "faiss_pq_m",
+            "faiss_pq_nbits",
+            "faiss_exact_rescore",
+            "faiss_rescore_factor",
+            "pgvector_storage",
+            "pgvector_hnsw_ef_search",
+            "pgvector_ivfflat_probes",
+            "pgvector_iterative_scan",
+        )
+    )
+
+
+def _empty_payload(query: str, agent_settings: Dict[str, Any], timings: Dict[str, float]) -> Dict[str, Any]:
+    return {
+        "results": [],
+        "diagnostics": _summarize_retrieval_diagnostics(
+            query=query,
+            backend=agent_settings["vector_backend"],
+            hybrid_enabled=agent_settings.get("hybrid_retrieval", False),
+            rerank_enabled=agent_settings.get("rerank_enabled", False),
+            total_entries=0,
+            search_k=0,
+            vector_results=[],
+            lexical_results=[],
+            final_results=[],
+            timings=timings,
+        ),
+    }
+
+
+def _cached_payload(cached: Dict[str, Any], tier: str, timings: Dict[str, float]) -> Dict[str, Any]:
+    """A result-cache hit, with timings and cache flags describing this request rather than the one that filled it."""
+    diagnostics = {
+        **cached["diagnostics"],
+        "result_cache": tier,
+        "timings_ms": {**dict.fromkeys(RETRIEVAL_STAGES, 0.0), **timings},
+        "cache_hits": {**cached["diagnostics"].get("cache_hits", {}), "result": True},
+    }
+    return {"results": cached["results"], "diagnostics": diagnostics}
+
+
+def _result_cache_key(result_cache: Any, *, base: KnowledgeBase, query: str, top_k: int, merge: bool = True) -> str | None:
+    if result_cache is None:
+        return None
+    return result_cache.key(
+        base_id=base.pk,
+        generation=base.corpus_generation,
+        query=query,
+        top_k=top_k,
+        config=(
+            *_result_cache_config(settings.AGENT_SETTINGS),
+            json.dumps(base.retrieval_settings or {}, sort_keys=True),
+            merge,
+        ),
+    )
+
+
+def _remember_result(result_cache: Any, cache_key: str | None, payload: Dict[str, Any]) -> Dict[str, Any]:
+    if cache_key is not None and not payload["diagnostics"]["degraded_legs"]:
+        result_cache.store(cache_key, payload)
+    payload["diagnostics"]["result_cache"] = "miss" if cache_key is not None else "disabled"
+    return payload
+
+
 def retrieve_context(
     *,
     query: str,
@@ -90,63 +299,402 @@ def retrieve_context_with_diagnostics(
     if not query.strip():
         return {"results": [], "diagnostics": {"query_length": 0, "backend": "", "hybrid_enabled": False}}
 
-    doc_ids = list(
-        KnowledgeDocument.objects.filter(base=base, user=base.user).values_list("doc_id", flat=True)
-    )
-    if not doc_ids:
-        return {"results": [], "diagnostics": {"query_length": len(query), "backend": settings.AGENT_SETTINGS["vector_backend"], "hybrid_enabled": settings.AGENT_SETTINGS.get("hybrid_retrieval", False), "rerank_enabled": settings.AGENT_SETTINGS.get("rerank_enabled", False)}}
+    agent_settings = settings.AGENT_SETTINGS
+    timings: Dict[str, float] = {}
+    # Maintained on ingest/delete (see kb.ingest.repair_chunk_counts); no COUNT(*) on the hot path.
+    _timed(timings, "count_ms", base.refresh_from_db, fields=["chunk_count", "corpus_generation"])
+    total_entries = base.chunk_count
+    if total_entries <= 0:
+        return _empty_payload(query, agent_settings, timings)
+
+    result_cache = get_result_cache()
+    cache_key = _result_cache_key(result_cache, base=base, query=query, top_k=top_k)
+    if cache_key is not None:
+        cached, tier = result_cache.lookup(cache_key)
+        if cached is not None:
+            # Hit: no embedding, no store search, no rerank.
+            return _cached_payload(cached, tier, timings)
+
+    payload = _search_and_rank(query=query, top_k=top_k, base=base, total_entries=total_entries, timings=timings)
+    return _remember_result(result_cache, cache_key, payload)
+
+
+def retrieve_many(
+    *,
+    queries: List[str],
+    top_k: int = 5,
+    base: KnowledgeBase,
+) -> List[List[Dict[str, Any]]]:
+    return [payload["results"] for payload in retrieve_many_with_diagnostics(queries=queries, top_k=top_k, base=base)]
+
+
+def retrieve_many_with_diagnostics(
+    *,
+    queries: List[str],
+    top_k: int = 5,
+    base: KnowledgeBase,
+    merge: bool = True,
+) -> List[Dict[str, Any]]:
+    """Retrieve for several queries at once: one embedding call and one batched vector search.
 
+    Payloads come back in query order and match ``retrieve_context_with_diagnostics``. With
+    ``merge=False`` adjacent chunks stay separate hits, for callers that fuse the payloads.
+    """
     agent_settings = settings.AGENT_SETTINGS
-    client = build_client(agent_settings)
-    embeddings = client.embed(model=agent_settings["embedding_model"], texts=[query])
-    vector = embeddings[0]
+    payloads: List[Dict[str, Any] | None] = [None] * len(queries)
+    for index, query in enumerate(queries):
+        if not query.strip():
+            payloads[index] = {"results": [], "diagnostics": {"query_length": 0, "backend": "", "hybrid_enabled": False}}
+    if all(payload is not None for payload in payloads):
+        return payloads
 
-    store = get_store(agent_settings["vector_backend"])
-    allowed_set = [doc_id for doc_id in doc_ids if doc_id]
-    if not allowed_set:
-        return {"results": [], "diagnostics": {"query_length": len(query), "backend": agent_settings["vector_backend"], "hybrid_enabled": agent_settings.get("hybrid_retrieval", False), "rerank_enabled": agent_settings.get("rerank_enabled", False)}}
-    total_entries = store.count(base_id=base.pk, doc_ids=allowed_set)
+    timings: Dict[str, float] = {}
+    _timed(timings, "count_ms", base.refresh_from_db, fields=["chunk_count", "corpus_generation"])
+    total_entries = base.chunk_count
     if total_entries <= 0:
-        return {
-            "results": [],
-            "diagnostics": _summarize_retrieval_diagnostics(
-                query=query,
-                backend=agent_settings["vector_backend"],
-                hybrid_enabled=agent_settings.get("hybrid_retrieval", False),
-                rerank_enabled=agent_settings.get("rerank_enabled", False),
-                total_entries=0,
-                search_k=0,
-                vector_results=[],
-                lexical_results=[],
-                final_results=[],
-            ),
+        return [
+            payload or _empty_payload(query, agent_settings, timings) for query, payload in zip(queries, payloads, strict=False)
+        ]
+
+    result_cache = get_result_cache()
+    cache_keys: Dict[int, str | None] = {}
+    for index, query in enumerate(queries):
+        if payloads[index] is not None:
+            continue
+        cache_keys[index] = _result_cache_key(result_cache, base=base, query=query, top_k=top_k, merge=merge)
+        if cache_keys[index] is not None:
+            cached, tier = result_cache.lookup(cache_keys[index])
+            if cached is not None:
+                payloads[index] = _cached_payload(cached, tier, timings)
+
+    pending = [index for index, payload in enumerate(payloads) if payload is None]
+    if not pending:
+        return payloads
+    store = get_store(agent_settings["vector_backend"])
+    search_k = _candidate_budget(top_k, total_entries, agent_settings)
+    legs, rrf_k = plan_legs(base.retrieval_settings, agent_settings, search_k=search_k)
+    first_pass = [leg for leg in legs if not leg.retriever.expands]
+    vector_leg = next(leg for leg in first_pass if leg.name == "vector")
+    side_legs = [leg for leg in first_pass if leg.name != "vector"]
+    requests = {index: LegRequest(store=store, query=queries[index], base_id=base.pk, budget=search_k) for index in pending}
+    leg_timings: Dict[int, Dict[str, float]] = {index: {} for index in pending}
+
+    started = time.monotonic()
+    # Per-query side legs that do not need a vector run while the batch is embedded and searched.
+    futures = {
+        index: _start_legs([leg for leg in side_legs if not leg.retriever.needs_vector], requests[index], leg_timings[index])
+        for index in pending
+    }
+    vectors, tiers, cache_stats = _timed(
+        timings, "embed_ms", _embed_queries, [queries[index] for index in pending], agent_settings
+    )
+    if hasattr(store, "search_many"):
+        vector_hits = _timed(timings, "vector_ms", store.search_many, vectors, vector_leg.budget, base_id=base.pk)
+    else:
+        vector_hits = [
+            _timed(timings, "vector_ms", store.search, vector, vector_leg.budget, base_id=base.pk) for vector in vectors
+        ]
+
+    for index, vector, tier, vector_results in zip(pending, vectors, tiers, vector_hits, strict=False):
+        query = queries[index]
+        request = replace(requests[index], vector=vector)
+        # Count, embed and vector timings cover the whole batch; the rest are per query.
+        query_timings = dict(timings)
+        degraded_legs: List[str] = []
+        futures[index].update(
+            _start_legs([leg for leg in side_legs if leg.retriever.needs_vector], request, leg_timings[index])
+        )
+        leg_results = {
+            "vector": vector_results,
+            **_finish_legs(futures[index], first_pass, started, query_timings, leg_timings[index], degraded_legs),
         }
-    search_k = min(total_entries, max(top_k * 3, top_k + len(allowed_set)))
-    vector_results = store.search(vector, search_k, base_id=base.pk, doc_ids=allowed_set)
-    lexical_results: List[tuple[float, Dict[str, Any]]] = []
-    if agent_settings.get("hybrid_retrieval", False):
-        lexical_results = store.lexical_search(query, search_k, base_id=base.pk, doc_ids=allowed_set)
-        results = _fuse_ranked_results(vector_results, lexical_results, top_k=search_k)
+        results = _fuse_legs(leg_results, legs, search_k=search_k, rrf_k=rrf_k, timings=query_timings)
+        results = _expand_and_fuse(
+            results,
+            leg_results,
+            legs,
+            request,
+            top_k=top_k,
+            search_k=search_k,
+            rrf_k=rrf_k,
+            timings=query_timings,
+            degraded_legs=degraded_legs,
+        )
+        payload = _rank_and_format(
+            query=query,
+            top_k=top_k,
+            search_k=search_k,
+            total_entries=total_entries,
+            results=results,
+            leg_results=leg_results,
+            embedding_cache={"tier": tier, **cache_stats},
+            degraded_legs=degraded_legs,
+            timings=query_timings,
+            merge=merge,
+        )
+        payloads[index] = _remember_result(result_cache, cache_keys.get(index), payload)
+    return payloads
+
+
+_SENTENCE_BREAK = re.compile(r"(?<=[。！？!?；;.\n])\s*")
+
+
+def split_query_segments(text: str, *, max_chars: int = 400, max_segments: int = 8) -> List[str]:
+    """Pack sentences into segments of at most ``max_chars``; keep at most ``max_segments``, evenly spread."""
+    max_chars = max(int(max_chars), 1)
+    segments: List[str] = []
+    current = ""
+    for sentence in _SENTENCE_BREAK.split(text.strip()):
+        sentence = " ".join(sentence.split())
+        while len(sentence) > max_chars:
+            if current:
+                segments.append(current)
+                current = ""
+            segments.append(sentence[:max_chars])
+            sentence = sentence[max_chars:]
+        if not sentence:
+            continue
+        candidate = f"{current} {sentence}" if current else sentence
+        if len(candidate) > max_chars:
+            segments.append(current)
+            current = sentence
+        else:
+            current = candidate
+    if current:
+        segments.append(current)
+    if len(segments) > max_segments > 0:
+        step = len(segments) / max_segments
+        segments = [segments[int(index * step)] for index in range(max_segments)]
+    return segments
+
+
+def retrieve_segmented_with_diagnostics(
+    *,
+    text: str,
+    top_k: int = 5,
+    base: KnowledgeBase,
+) -> Dict[str, Any]:
+    """Retrieve for a long input by segment: one batched embed + search, merged with reciprocal-rank fusion."""
+    agent_settings = settings.AGENT_SETTINGS
+    segments = split_query_segments(
+        text,
+        max_chars=agent_settings.get("rag_segment_chars", 400),
+        max_segments=agent_settings.get("rag_max_segments", 8),
+    )
+    if len(segments) <= 1:
+        return retrieve_context_with_diagnostics(query=text, top_k=top_k, base=base)
+
+    # Adjacent chunks are merged once after fusion: a chunk merged into a block by one segment
+    # and returned alone by another would otherwise be emitted twice.
+    payloads = retrieve_many_with_diagnostics(queries=segments, top_k=top_k, base=base, merge=False)
+    # Segments fuse with the same RRF constant as the base's retriever legs.
+    _legs, rrf_k = plan_legs(base.retrieval_settings, agent_settings, search_k=top_k)
+    fuse_started = time.perf_counter()
+    fused: Dict[tuple[str, str], Dict[str, Any]] = {}
+    for payload in payloads:
+        for rank, item in enumerate(payload["results"], start=1):
+            ref = item["refs"][0]
+            key = (str(ref.get("doc_id", "")), str(ref.get("chunk_id", "")))
+            entry = fused.setdefault(key, {"score": 0.0, "item": item, "segments": 0})
+            entry["score"] += 1.0 / (rrf_k + rank)
+            entry["segments"] += 1
+    ranked = sorted(fused.values(), key=lambda entry: entry["score"], reverse=True)[:top_k]
+    results = [
+        {**entry["item"], "score": entry["score"], "metadata": {**entry["item"]["metadata"], "segment_hits": entry["segments"]}}
+        for entry in ranked
+    ]
+    hit_count = len(results)
+    if agent_settings.get("retrieval_merge_adjacent", True):
+        results = merge_adjacent(results)
+
+    fuse_ms = _elapsed_ms(fuse_started)
+
+    diagnostics = dict(payloads[0]["diagnostics"])
+    # Count, embed and vector stages were shared by the batch; per-segment stages add up.
+    timings = dict(diagnostics.get("timings_ms", {}))
+    for stage in ("lexical_ms", "fuse_ms", "rerank_ms"):
+        timings[stage] = round(sum(payload["diagnostics"].get("timings_ms", {}).get(stage, 0.0) for payload in payloads), 3)
+    timings["fuse_ms"] = round(timings["fuse_ms"] + fuse_ms, 3)
+    source_counts: Dict[str, int] = {"vector": 0, "lexical": 0}
+    for item in results:
+        for source in item["metadata"].get("retrieval_sources", ["vector"]):
+            source_counts[source] = source_counts.get(source, 0) + 1
+    diagnostics.update(
+        {
+            "query_length": len(text),
+            "segments": len(segments),
+            "vector_hits": sum(payload["diagnostics"].get("vector_hits", 0) for payload in payloads),
+            "lexical_hits": sum(payload["diagnostics"].get("lexical_hits", 0) for payload in payloads),
+            "final_hits": len(results),
+            "merged_chunks": hit_count - len(results),
+            "source_counts": source_counts,
+            "degraded_legs": sorted({leg for payload in payloads for leg in payload["diagnostics"].get("degraded_legs", [])}),
+            "timings_ms": timings,
+            "cache_hits": {
+                kind: all(payload["diagnostics"].get("cache_hits", {}).get(kind, False) for payload in payloads)
+                for kind in ("embedding", "result")
+            },
+        }
+    )
+    return {"results": results, "diagnostics": diagnostics}
+
+
+def _start_legs(legs: List[LegPlan], request: LegRequest, leg_timings: Dict[str, float]) -> Dict[str, Future]:
+    # Legs time themselves into a private dict; a leg that times out must not touch the payload's timings late.
+    return {
+        leg.name: _submit_leg(_timed, leg_timings, f"{leg.name}_ms", leg.retriever.search, replace(request, budget=leg.budget))
+        for leg in legs
+    }
+
+
+def _finish_legs(
+    futures: Dict[str, Future],
+    legs: List[LegPlan],
+    started: float,
+    timings: Dict[str, float],
+    leg_timings: Dict[str, float],
+    degraded_legs: List[str],
+) -> Dict[str, List[tuple[float, Dict[str, Any]]]]:
+    timeouts = {leg.name: leg.timeout_ms for leg in legs}
+    results = {name: _leg_result(future, started, timeouts[name], name, degraded_legs) for name, future in futures.items()}
+    for name in futures:
+        if name in degraded_legs:
+            # A dropped leg cost what we waited for it.
+            timings[f"{name}_ms"] = round((time.monotonic() - started) * 1000.0, 3)
+        else:
+            timings[f"{name}_ms"] = leg_timings.get(f"{name}_ms", 0.0)
+    return results
+
+
+def _fuse_legs(
+    leg_results: Dict[str, List[tuple[float, Dict[str, Any]]]],
+    legs: List[LegPlan],
+    *,
+    search_k: int,
+    rrf_k: int,
+    timings: Dict[str, float],
+) -> List[tuple[float, Dict[str, Any]]]:
+    if set(leg_results) == {"vector"}:
+        # A lone vector leg keeps its similarity scores; there is nothing to fuse.
+        return leg_results["vector"]
+    weights = {leg.name: leg.weight for leg in legs}
+    return _timed(timings, "fuse_ms", _fuse_ranked_results, leg_results, top_k=search_k, rrf_k=rrf_k, weights=weights)
+
+
+def _expand_and_fuse(
+    results: List[tuple[float, Dict[str, Any]]],
+    leg_results: Dict[str, List[tuple[float, Dict[str, Any]]]],
+    legs: List[LegPlan],
+    request: LegRequest,
+    *,
+    top_k: int,
+    search_k: int,
+    rrf_k: int,
+    timings: Dict[str, float],
+    degraded_legs: List[str],
+) -> List[tuple[float, Dict[str, Any]]]:
+    """Run the expanding legs seeded with the first-pass top-k, then fuse every leg again."""
+    expanding = [leg for leg in legs if leg.retriever.expands]
+    if not expanding:
+        return results
+    started = time.monotonic()
+    leg_timings: Dict[str, float] = {}
+    futures = _start_legs(expanding, replace(request, seeds=results[:top_k]), leg_timings)
+    leg_results.update(_finish_legs(futures, expanding, started, timings, leg_timings, degraded_legs))
+    return _fuse_legs(leg_results, legs, search_k=search_k, rrf_k=rrf_k, timings=timings)
+
+
+def _search_and_rank(
+    *,
+    query: str,
+    top_k: int,
+    base: KnowledgeBase,
+    total_entries: int,
+    timings: Dict[str, float],
+) -> Dict[str, Any]:
+    agent_settings = settings.AGENT_SETTINGS
+    store = get_store(agent_settings["vector_backend"])
+    search_k = _candidate_budget(top_k, total_entries, agent_settings)
+    legs, rrf_k = plan_legs(base.retrieval_settings, agent_settings, search_k=search_k)
+    first_pass = [leg for leg in legs if not leg.retriever.expands]
+    weights = {leg.name: leg.weight for leg in legs}
+    # pgvector answers the vector and lexical legs, and their fusion, in one SQL statement (one budget for both).
+    hybrid_sql = {"vector", "lexical"} <= set(weights) and getattr(store, "supports_hybrid_sql", False)
+    request = LegRequest(store=store, query=query, base_id=base.pk, budget=search_k)
+    leg_results: Dict[str, List[tuple[float, Dict[str, Any]]]] = {}
+    degraded_legs: List[str] = []
+    leg_timings: Dict[str, float] = {}
+
+    started = time.monotonic()
+    # Legs that do not need the query vector start before the embedding call.
+    early = [leg for leg in first_pass if not leg.retriever.needs_vector and not (hybrid_sql and leg.name == "lexical")]
+    futures = _start_legs(early, request, leg_timings)
+    vector, embedding_cache = _timed(timings, "embed_ms", _embed_query, query, agent_settings)
+    request = replace(request, vector=vector)
+
+    sql_results = None
+    if hybrid_sql:
+        hybrid = _timed(timings, "hybrid_sql_ms", store.hybrid_search, vector, query, search_k, base_id=base.pk, rrf_k=rrf_k)
+        leg_results.update(vector=hybrid["vector_results"], lexical=hybrid["lexical_results"])
+        sql_results = hybrid["results"][:search_k]
+    late = [leg for leg in first_pass if leg.retriever.needs_vector and leg.name not in leg_results]
+    if not futures and [leg.name for leg in late] == ["vector"]:
+        # Vector only: query inline, no pool hop.
+        leg_results["vector"] = _timed(timings, "vector_ms", late[0].retriever.search, replace(request, budget=late[0].budget))
+        late = []
+    futures.update(_start_legs(late, request, leg_timings))
+    leg_results.update(_finish_legs(futures, first_pass, started, timings, leg_timings, degraded_legs))
+
+    if sql_results is not None and set(leg_results) == {"vector", "lexical"} and weights["vector"] == weights["lexical"] == 1.0:
+        results = sql_results
     else:
-        results = vector_results
+        results = _fuse_legs(leg_results, legs, search_k=search_k, rrf_k=rrf_k, timings=timings)
+    results = _expand_and_fuse(
+        results,
+        leg_results,
+        legs,
+        request,
+        top_k=top_k,
+        search_k=search_k,
+        rrf_k=rrf_k,
+        timings=timings,
+        degraded_legs=degraded_legs,
+    )
+    return _rank_and_format(
+        query=query,
+        top_k=top_k,
+        search_k=search_k,
+        total_entries=total_entries,
+        results=results,
+        leg_results=leg_results,
+        embedding_cache=embedding_cache,
+        degraded_legs=degraded_legs,
+        timings=timings,
+    )
+
+
+def _rank_and_format(
+    *,
+    query: str,
+    top_k: int,
+    search_k: int,
+    total_entries: int,
+    results: List[tuple[float, Dict[str, Any]]],
+    leg_results: Dict[str, List[tuple[float, Dict[str, Any]]]],
+    embedding_cache: Dict[str, Any],
+    degraded_legs: List[str],
+    timings: Dict[str, float],
+    merge: bool = True,
+) -> Dict[str, Any]:
+    agent_settings = settings.AGENT_SETTINGS
+    rerank_started = time.perf_counter()
     if results and agent_settings.get("rerank_enabled", True):
         results = rerank_results(query=query, results=results, top_k=search_k)
-    if not results:
-        return {
-            "results": [],
-            "diagnostics": _summarize_retrieval_diagnostics(
-                query=query,
-                backend=agent_settings["vector_backend"],
-                hybrid_enabled=agent_settings.get("hybrid_retrieval", False),
-                rerank_enabled=agent_settings.get("rerank_enabled", True),
-                total_entries=total_entries,
-                search_k=search_k,
-                vector_results=vector_results,
-                lexical_results=lexical_results,
-                final_results=[],
-            ),
-        }
+    if agent_settings.get("retrieval_mmr_enabled", True):
+        # Overlapping neighbour chunks are near-duplicates; trade a little relevance for coverage.
+        results = mmr_select(results, top_k, diversity=float(agent_settings.get("retrieval_mmr_diversity", 0.3)))
     results = results[:top_k]
+    timings["rerank_ms"] = _elapsed_ms(rerank_started)
     formatted: List[Dict[str, Any]] = []
 
     for score, metadata in results:
@@ -162,24 +710,31 @@ def retrieve_context_with_diagnostics(
                 ],
                 "title": metadata.get("title"),
                 "metadata": {
-                    **(metadata.get("metadata", {}) or {}),
+                    **{key: value for key, value in (metadata.get("metadata", {}) or {}).items() if key != "term_ids"},
                     "retrieval_sources": metadata.get("retrieval_sources", ["vector"]),
+                    "source_ranks": metadata.get("source_ranks", {}),
                     "rerank_score": metadata.get("rerank_score"),
                     "overlap_score": metadata.get("overlap_score"),
                 },
             }
         )
-    return {
-        "results": formatted,
-        "diagnostics": _summarize_retrieval_diagnostics(
-            query=query,
-            backend=agent_settings["vector_backend"],
-            hybrid_enabled=agent_settings.get("hybrid_retrieval", False),
-            rerank_enabled=agent_settings.get("rerank_enabled", True),
-            total_entries=total_entries,
-            search_k=search_k,
-            vector_results=vector_results,
-            lexical_results=lexical_results,
-            final_results=results,
-        ),
-    }
+    hit_count = len(formatted)
+    if merge and agent_settings.get("retrieval_merge_adjacent", True):
+        formatted = merge_adjacent(formatted)
+    diagnostics = _summarize_retrieval_diagnostics(
+        query=query,
+        backend=agent_settings["vector_backend"],
+        hybrid_enabled=agent_settings.get("hybrid_retrieval", False),
+        rerank_enabled=agent_settings.get("rerank_enabled", True),
+        total_entries=total_entries,
+        search_k=search_k,
+        vector_results=leg_results.get("vector", []),
+        lexical_results=leg_results.get("lexical", []),
+        final_results=results,
+        embedding_cache=embedding_cache,
+        degraded_legs=degraded_legs,
+        timings=timings,
+    )
+    diagnostics["leg_hits"] = {name: len(leg) for name, leg in leg_results.items()}
+    diagnostics["merged_chunks"] = hit_count - len(formatted)
+    return {"results": formatted, "diagnostics": diagnostics}
@@ -0,0 +1,235 @@
+"""Retriever legs fused by ``kb.retrieve``: a registry of named candidate generators.
+
+A leg turns a :class:`LegRequest` into best-first ``(score, payload)`` hits shaped like the
+vector store's. First-pass legs run concurrently; *expanding* legs run after the first fusion
+and are seeded with its best hits. Each knowledge base can tune the legs through
+``KnowledgeBase.retrieval_settings``::
+
+    {"rrf_k": 60, "legs": {"title": {"enabled": true, "weight": 0.5, "budget": 20, "timeout_ms": 300}}}
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Tuple
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import F, Q
+
+from src.core.models import KnowledgeChunk, KnowledgeDocument
+
+from .store import PGVECTOR_RESULT_FIELDS, _chunk_payload
+from .tokens import chunk_term_ids, overlap_ratio, query_term_ids, search_query, tokenize
+
+Hit = Tuple[float, Dict[str, Any]]
+
+
+@dataclass(frozen=True)
+class LegRequest:
+    store: Any
+    query: str
+    base_id: Any
+    budget: int
+    vector: List[float] | None = None
+    seeds: List[Hit] = field(default_factory=list)
+
+
+@dataclass(frozen=True)
+class Retriever:
+    name: str
+    search: Callable[[LegRequest], List[Hit]]
+    needs_vector: bool = False
+    expands: bool = False
+    weight: float = 1.0
+
+
+@dataclass(frozen=True)
+class LegPlan:
+    retriever: Retriever
+    budget: int
+    timeout_ms: float
+    weight: float
+
+    @property
+    def name(self) -> str:
+        return self.retriever.name
+
+
+_RETRIEVERS: Dict[str, Retriever] = {}
+
+
+def register_retriever(retriever: Retriever) -> Retriever:
+    _RETRIEVERS[retriever.name] = retriever
+    return retriever
+
+
+def get_retriever(name: str) -> Retriever:
+    try:
+        return _RETRIEVERS[name]
+    except KeyError:
+        raise ValueError(f"Unknown retriever leg: {name}") from None
+
+
+def registered_retrievers() -> List[str]:
+    return list(_RETRIEVERS)
+
+
+def normalize_retrieval_settings(raw: Any) -> Dict[str, Any]:
+    """Validate a base's ``retrieval_settings``; raises ``ValueError`` with a readable message."""
+    if raw in (None, ""):
+        return {}
+    if not isinstance(raw, dict):
+        raise ValueError("retrieval_settings must be an object.")
+    unknown = set(raw) - {"rrf_k", "legs"}
+    if unknown:
+        raise ValueError(f"Unknown retrieval_settings keys: {', '.join(sorted(unknown))}")
+    normalized: Dict[str, Any] = {}
+    if "rrf_k" in raw:
+        if not isinstance(raw["rrf_k"], int) or isinstance(raw["rrf_k"], bool) or raw["rrf_k"] < 1:
+            raise ValueError("rrf_k must be a positive integer.")
+        normalized["rrf_k"] = raw["rrf_k"]
+    legs = raw.get("legs") or {}
+    if not isinstance(legs, dict):
+        raise ValueError("legs must be an object keyed by leg name.")
+    normalized_legs: Dict[str, Dict[str, Any]] = {}
+    for name, options in legs.items():
+        get_retriever(name)
+        if not isinstance(options, dict):
+            raise ValueError(f"Options for leg {name} must be an object.")
+        extra = set(options) - {"enabled", "weight", "budget", "timeout_ms"}
+        if extra:
+            raise ValueError(f"Unknown options for leg {name}: {', '.join(sorted(extra))}")
+        if "enabled" in options and not isinstance(options["enabled"], bool):
+            raise ValueError(f"enabled for leg {name} must be true or false.")
+        if name == "vector" and options.get("enabled") is False:
+            raise ValueError("The vector leg cannot be disabled.")
+        for key in ("weight", "budget", "timeout_ms"):
+            value = options.get(key)
+            if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0):
+                raise ValueError(f"{key} for leg {name} must be a non-negative number.")
+        normalized_legs[name] = dict(options)
+    if normalized_legs:
+        normalized["legs"] = normalized_legs
+    return normalized
+
+
+def plan_legs(base_settings: Dict[str, Any] | None, agent_settings: Dict[str, Any], *, search_k: int) -> Tuple[List[LegPlan], int]:
+    """Legs to run for one base, in registry order, and the RRF constant to fuse them with.
+
+    ``RETRIEVAL_LEGS`` picks the default legs (lexical additionally needs ``HYBRID_RETRIEVAL``);
+    the base's ``retrieval_settings`` can enable, disable and tune any registered leg.
+    """
+    base_settings = base_settings or {}
+    overrides = base_settings.get("legs") or {}
+    defaults = {name.strip() for name in str(agent_settings.get("retrieval_legs", "vector,lexical")).split(",") if name.strip()}
+    if not agent_settings.get("hybrid_retrieval", False):
+        defaults.discard("lexical")
+    ceiling = max(int(agent_settings.get("retrieval_max_candidates", 200)), 1)
+
+    plans: List[LegPlan] = []
+    for name, retriever in _RETRIEVERS.items():
+        options = overrides.get(name) or {}
+        # Every other leg fuses against the vector leg, so it always runs.
+        if name != "vector" and not options.get("enabled", name in defaults):
+            continue
+        budget = options.get("budget")
+        timeout_ms = options.get("timeout_ms")
+        if timeout_ms is None:
+            timeout_ms = agent_settings.get(f"retrieval_{name}_timeout_ms", agent_settings.get("retrieval_leg_timeout_ms", 800))
+        plans.append(
+            LegPlan(
+                retriever=retriever,
+                budget=min(int(budget), ceiling) if budget is not None else search_k,
+                timeout_ms=float(timeout_ms),
+                weight=float(options.get("weight", retriever.weight)),
+            )
+        )
+    rrf_k = int(base_settings.get("rrf_k") or agent_settings.get("retrieval_rrf_k", 60))
+    return plans, rrf_k
+
+
+def _vector_leg(request: LegRequest) -> List[Hit]:
+    return request.store.search(request.vector, request.budget, base_id=request.base_id)
+
+
+def _lexical_leg(request: LegRequest) -> List[Hit]:
+    return request.store.lexical_search(request.query, request.budget, base_id=request.base_id)
+
+
+def _title_candidates(base_id: Any, query: str, limit: int) -> List[Tuple[str, str]]:
+    """``(doc_id, title)`` of at most ``limit`` documents whose titles share a term with the query."""
+    documents = KnowledgeDocument.objects.filter(base_id=base_id)
+    if connection.vendor == "postgresql":
+        expression = search_query(query)
+        if not expression:
+            return []
+        # Matched and ranked through the GIN index on the title tsvector.
+        ts_query = SearchQuery(expression, search_type="raw", config="simple")
+        documents = documents.filter(search_vector=ts_query).order_by(-SearchRank(F("search_vector"), ts_query))
+    else:
+        condition = Q()
+        for token in dict.fromkeys(tokenize(query)):
+            condition |= Q(title__icontains=token)
+        if not condition:
+            return []
+        documents = documents.filter(condition)
+    return list(documents.values_list("doc_id", "title")[:limit])
+
+
+def _title_leg(request: LegRequest, max_documents: int = 3, max_candidates: int = 50) -> List[Hit]:
+    """Chunks of the documents whose titles the query mentions, best lexical overlap first."""
+    question_ids = query_term_ids(request.query)
+    query_ids = sorted(set(question_ids))
+    if not query_ids or request.budget <= 0:
+        return []
+    titles: List[Tuple[float, str]] = []
+    for doc_id, title in _title_candidates(request.base_id, request.query, max_candidates):
+        # Share of the title's tokens that appear in the query.
+        score = overlap_ratio(query_term_ids(title), query_ids)
+        if score > 0:
+            titles.append((score, doc_id))
+    titles.sort(key=lambda item: item[0], reverse=True)
+    matched = {doc_id: score for score, doc_id in titles[:max_documents]}
+    if not matched:
+        return []
+
+    rows = KnowledgeChunk.objects.filter(document__base_id=request.base_id, document__doc_id__in=list(matched))
+    hits: List[Hit] = []
+    for row in rows.values(*PGVECTOR_RESULT_FIELDS).iterator(chunk_size=2000):
+        payload = _chunk_payload(row)
+        score = matched[payload["doc_id"]] + overlap_ratio(question_ids, chunk_term_ids(payload))
+        hits.append((score, payload))
+    hits.sort(key=lambda item: item[0], reverse=True)
+    return hits[: request.budget]
+
+
+def _neighbor_leg(request: LegRequest) -> List[Hit]:
+    """Chunks just before and after each seed, ranked with the seed that found them."""
+    wanted: Dict[Tuple[str, str], float] = {}
+    seen = {(str(meta.get("doc_id")), str(meta.get("chunk_id"))) for _score, meta in request.seeds}
+    for score, meta in request.seeds[: request.budget]:
+        position = (meta.get("metadata") or {}).get("position")
+        doc_id = meta.get("doc_id")
+        if not isinstance(position, int) or doc_id is None:
+            continue
+        for neighbor in (position - 1, position + 1):
+            # Chunk ids are ``<doc_id>-<position>`` (see kb.ingest).
+            key = (str(doc_id), f"{doc_id}-{neighbor}")
+            if neighbor >= 0 and key not in seen and key not in wanted:
+                wanted[key] = float(score)
+    if not wanted:
+        return []
+    condition = Q()
+    for doc_id, chunk_id in wanted:
+        condition |= Q(document__doc_id=doc_id, chunk_id=chunk_id)
+    rows = KnowledgeChunk.objects.filter(condition, document__base_id=request.base_id).values(*PGVECTOR_RESULT_FIELDS)
+    hits = [(wanted[(row["document__doc_id"], row["chunk_id"])], _chunk_payload(row)) for row in rows]
+    hits.sort(key=lambda item: item[0], reverse=True)
+    return hits[: request.budget]
+
+
+register_retriever(Retriever(name="vector", search=_vector_leg, needs_vector=True))
+register_retriever(Retriever(name="lexical", search=_lexical_leg))
+register_retriever(Retriever(name="title", search=_title_leg, weight=0.5))
+register_retriever(Retriever(name="neighbors", search=_neighbor_leg, expands=True, weight=0.5))
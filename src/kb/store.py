@@ -1,69 +1,581 @@
 import json
 import logging
-import re
+import math
+import os
+import shutil
+import tempfile
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Set, Tuple
 
 import numpy as np
 from django.conf import settings
-from django.db import connection
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection, transaction
+from django.db.models import F, Value
+from pgvector import HalfVector
 from pgvector.django import CosineDistance
 
-from src.core.models import KnowledgeChunk
+from src.core.models import EMBEDDING_DIMENSIONS, KnowledgeChunk, KnowledgeDocument
+
+from .bm25 import BM25Index
+from .tokens import chunk_term_ids, overlap_ratio, query_term_ids, search_document, search_query
 
 try:
     import faiss  # type: ignore
 except ImportError:  # pragma: no cover - handled via runtime checks
     faiss = None
 
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms run without the writer lock
+    fcntl = None
+
 logger = logging.getLogger(__name__)
 
 
-def _tokenize(text: str) -> List[str]:
-    raw = (text or "").lower()
-    words = re.findall(r"[a-z0-9_]+", raw)
-    cjk_chars = re.findall(r"[\u4e00-\u9fff]", raw)
-    return words + cjk_chars
+class VectorStoreError(RuntimeError):
+    """Raised when vector store operations fail."""
 
 
-def _keyword_overlap_score(query: str, text: str) -> float:
-    query_tokens = _tokenize(query)
-    text_tokens = set(_tokenize(text))
-    if not query_tokens or not text_tokens:
-        return 0.0
-    matched = sum(1 for token in query_tokens if token in text_tokens)
-    return matched / len(query_tokens)
+FAISS_INDEX_TYPES = {"flat", "hnsw", "ivf_flat"}
+FAISS_COMPRESSIONS = {"none", "sq8", "pq"}
 
+DEFAULT_FAISS_OPTIONS: Dict[str, Any] = {
+    "index_type": "flat",
+    "ann_threshold": 20000,
+    "hnsw_m": 32,
+    "hnsw_ef_construction": 80,
+    "hnsw_ef_search": 64,
+    "ivf_nlist": 0,
+    "ivf_nprobe": 16,
+    "compression": "none",
+    "pq_m": 0,
+    "pq_nbits": 8,
+    "exact_rescore": False,
+    "rescore_factor": 4,
+    "mmap": False,
+    "compact_ratio": 0.2,
+}
 
-class VectorStoreError(RuntimeError):
-    """Raised when vector store operations fail."""
+
+PGVECTOR_INDEX_METHODS = {"hnsw", "ivfflat"}
+PGVECTOR_ITERATIVE_SCANS = {"off", "relaxed_order", "strict_order"}
+# storage mode -> (KnowledgeChunk field, cosine operator class)
+PGVECTOR_STORAGES = {
+    "vector": ("embedding_vector", "vector_cosine_ops"),
+    "halfvec": ("embedding_half", "halfvec_cosine_ops"),
+}
+
+DEFAULT_PGVECTOR_OPTIONS: Dict[str, Any] = {
+    "hnsw_ef_search": 40,
+    "ivfflat_probes": 10,
+    "iterative_scan": "off",
+    "storage": "vector",
+    "hybrid_sql": True,
+}
+
+
+def _pgvector_options(agent_settings: Dict[str, Any]) -> Dict[str, Any]:
+    options = {key: agent_settings.get(f"pgvector_{key}", default) for key, default in DEFAULT_PGVECTOR_OPTIONS.items()}
+    options["iterative_scan"] = str(options["iterative_scan"] or "off").lower()
+    if options["iterative_scan"] not in PGVECTOR_ITERATIVE_SCANS:
+        raise VectorStoreError(f"Unsupported pgvector iterative scan mode: {options['iterative_scan']}")
+    options["storage"] = str(options["storage"] or "vector").lower()
+    if options["storage"] not in PGVECTOR_STORAGES:
+        raise VectorStoreError(f"Unsupported pgvector storage: {options['storage']}")
+    return options
+
+
+def chunk_vector_fields(vector: List[float], agent_settings: Dict[str, Any] | None = None) -> Dict[str, Any]:
+    """KnowledgeChunk field values for one embedding: written once, to the configured vector column."""
+    agent_settings = settings.AGENT_SETTINGS if agent_settings is None else agent_settings
+    storage = str(agent_settings.get("pgvector_storage") or "vector").lower()
+    if storage not in PGVECTOR_STORAGES:
+        raise VectorStoreError(f"Unsupported pgvector storage: {storage}")
+    values = list(vector)
+    fields: Dict[str, Any] = {
+        "embedding": values if agent_settings.get("store_embedding_json") else [],
+        "embedding_vector": None,
+        "embedding_half": None,
+    }
+    if len(values) == EMBEDDING_DIMENSIONS:
+        fields[PGVECTOR_STORAGES[storage][0]] = values
+    return fields
+
+
+def _faiss_options(agent_settings: Dict[str, Any]) -> Dict[str, Any]:
+    options = {key: agent_settings.get(f"faiss_{key}", default) for key, default in DEFAULT_FAISS_OPTIONS.items()}
+    options["index_type"] = str(options["index_type"] or "flat").lower()
+    if options["index_type"] not in FAISS_INDEX_TYPES:
+        raise VectorStoreError(f"Unsupported FAISS index type: {options['index_type']}")
+    options["compression"] = str(options["compression"] or "none").lower()
+    if options["compression"] not in FAISS_COMPRESSIONS:
+        raise VectorStoreError(f"Unsupported FAISS compression: {options['compression']}")
+    return options
+
+
+def _atomic_write(path: Path, write: Any) -> None:
+    """Write ``path`` through a temp file in the same directory and rename it into place."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_name = tempfile.mkstemp(prefix=f".{path.name}.", dir=path.parent)
+    os.close(fd)
+    try:
+        write(temp_name)
+        os.replace(temp_name, path)
+    except BaseException:
+        if os.path.exists(temp_name):
+            os.unlink(temp_name)
+        raise
+
+
+@contextmanager
+def _locked(path: Path):
+    """Hold an exclusive ``flock`` on ``path`` (re-acquired if the file was replaced while waiting)."""
+    if fcntl is None:
+        yield
+        return
+    while True:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        handle = path.open("a")
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            current = os.stat(path).st_ino
+        except FileNotFoundError:
+            current = None
+        if current == os.fstat(handle.fileno()).st_ino:
+            break
+        # The partition directory was swapped (compaction) while we waited; lock the new one.
+        handle.close()
+    try:
+        yield
+    finally:
+        fcntl.flock(handle, fcntl.LOCK_UN)
+        handle.close()
+
+
+def _first_byte(path: Path) -> bytes:
+    with path.open("rb") as handle:
+        return handle.read(1)
+
+
+def _encode_row(row: Dict[str, Any]) -> bytes:
+    return (json.dumps(row, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+class _LazyMetadata:
+    """Metadata rows read on demand from the JSONL log through a byte-offset index."""
+
+    def __init__(self, path: Path, offsets: np.ndarray, cache_size: int = 2048):
+        self.path = path
+        self.offsets = offsets
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._handle: Any = None
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def _read(self, index: int) -> Dict[str, Any]:
+        if self._handle is None:
+            self._handle = self.path.open("rb")
+        self._handle.seek(int(self.offsets[index]))
+        return json.loads(self._handle.readline())
+
+    def __getitem__(self, index: Any) -> Any:
+        if isinstance(index, slice):
+            return [self[position] for position in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        row = self._cache.get(index)
+        if row is None:
+            row = self._read(index)
+            self._cache[index] = row
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(index)
+        return row
+
+    def __iter__(self) -> Any:
+        for index in range(len(self)):
+            yield self._cache.get(index) or self._read(index)
+
+    def __delitem__(self, index: slice) -> None:
+        keep = np.ones(len(self.offsets), dtype=bool)
+        keep[index] = False
+        self.offsets = self.offsets[keep]
+        self._cache.clear()
+
+    def append_rows(self, rows: List[Dict[str, Any]], offsets: List[int]) -> None:
+        start = len(self.offsets)
+        self.offsets = np.concatenate([self.offsets, np.asarray(offsets, dtype="<i8")])
+        for position, row in enumerate(rows[-self.cache_size :], start=start + max(len(rows) - self.cache_size, 0)):
+            self._cache[position] = row
+
+    def close(self) -> None:
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+
+def _unwrap(index: Any) -> Any:
+    if isinstance(index, faiss.IndexIDMap2):
+        return faiss.downcast_index(index.index)
+    return index
+
+
+def _index_kind(index: Any) -> str:
+    inner = _unwrap(index)
+    if isinstance(inner, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(inner, faiss.IndexIVF):
+        return "ivf"
+    if isinstance(inner, faiss.IndexFlat):
+        return "flat"
+    return "quantized"
 
 
 class FaissStore:
-    def __init__(self, index_path: Path, meta_path: Path):
+    """One FAISS index plus its metadata log.
+
+    Every row gets a stable int64 id equal to its position in the metadata log (and in the
+    float16 sidecar). Deleted ids are tombstoned in ``*.deleted`` and physically removed from
+    the index when the index type supports ``remove_ids``; a compaction rebuild drops them
+    from the log.
+
+    ``*.state.json`` is the commit marker: it records the committed row count plus a
+    ``generation`` bumped on every commit and an ``epoch`` changed whenever the log is
+    rewritten, so other processes can detect and pick up changes with one ``stat`` call.
+    """
+
+    def __init__(self, index_path: Path, meta_path: Path, options: Dict[str, Any] | None = None):
         if faiss is None:
             raise VectorStoreError("faiss-cpu is required for FAISS backend but is not installed.")
 
         self.index_path = index_path
         self.meta_path = meta_path
+        self.offsets_path = meta_path.with_name(f"{meta_path.name}.offsets")
+        self.vector_path = index_path.with_name(f"{index_path.stem}.f16")
+        self.deleted_path = index_path.with_name(f"{index_path.stem}.deleted")
+        self.state_path = index_path.with_name(f"{index_path.stem}.state.json")
+        self.lexical_path = index_path.with_name(f"{index_path.stem}.bm25.npz")
+        self.lock_path = index_path.with_name(f"{index_path.stem}.lock")
+        self.options = {**DEFAULT_FAISS_OPTIONS, **(options or {})}
         self.index = None
-        self.metadata: List[Dict[str, Any]] = []
+        self.metadata: Any = []
+        self.deleted: set[int] = set()
         self.dimension: int | None = None
-        self._load()
+        self._vectors: np.ndarray | None = None
+        self._lexical: BM25Index | None = None
+        self._log_records = 0
+        self._read_only = False
+        self.generation = 0
+        self.epoch: str | None = None
+        self._state_signature: Tuple[int, int] | None = None
+        if not self._load(repair=False):
+            # Recovery rewrites files, so it only runs while holding the writer lock.
+            with self._file_lock():
+                self._reload(repair=True)
 
-    def _load(self) -> None:
-        if self.index_path.exists():
+    def _read_index(self) -> None:
+        if self.options["mmap"]:
+            # Pages are shared through the OS page cache instead of being copied per process.
+            self.index = faiss.read_index(str(self.index_path), faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+            self._read_only = True
+        else:
             self.index = faiss.read_index(str(self.index_path))
-            self.dimension = self.index.d
-        if self.meta_path.exists():
-            with self.meta_path.open("r", encoding="utf-8") as handle:
-                self.metadata = json.load(handle)
+            self._read_only = False
+        self.dimension = self.index.d
+        self._apply_search_params()
+
+    def _load(self, *, repair: bool) -> bool:
+        """Load index, metadata and tombstones; returns False when files need a repair pass.
+
+        Without ``repair`` an uncommitted tail is only dropped in memory, so readers never
+        touch files that a concurrent writer may be appending to.
+        """
+        self._remember_state()
+        state = self._read_state()
+        if repair and "log_bytes" in state:
+            self._truncate_to_state(state)
+        if self.index_path.exists():
+            self._read_index()
+        if self.options["mmap"] and self._open_lazy_metadata():
+            needs_compaction = False
+        else:
+            needs_compaction = self._read_metadata_log()
+        self._read_deleted()
+
+        committed = self._committed_rows()
+        if self.index is not None and not self._removable() and self.index.ntotal > committed:
+            # The index rename landed but the state file did not; HNSW ids are never reused.
+            committed = min(len(self.metadata), self.index.ntotal)
+        index_ahead = (
+            self.index is not None and self._removable() and self.index.ntotal + len(self.deleted) > committed
+        )
+        if len(self.metadata) > committed or index_ahead:
+            # The metadata append (or index rename) landed but the commit did not: drop the uncommitted tail.
+            if len(self.metadata) > committed:
+                needs_compaction = True
+            del self.metadata[committed:]
+            self.deleted = {item for item in self.deleted if item < committed}
+            if repair:
+                logger.warning("Dropping uncommitted rows beyond %s from %s.", committed, self.meta_path)
+                if index_ahead:
+                    self._ensure_writable()
+                    self.index.remove_ids(faiss.IDSelectorRange(committed, 2**62))
+                    self._save()
+        if not repair:
+            return not (needs_compaction or index_ahead)
+        self._truncate_sidecar(committed)
+        if needs_compaction:
+            self.compact_metadata()
+        return True
+
+    def _truncate_to_state(self, state: Dict[str, Any]) -> None:
+        rows = int(state.get("rows", 0))
+        limits = (
+            (self.meta_path, int(state["log_bytes"])),
+            (self.offsets_path, rows * 8),
+            (self.deleted_path, int(state.get("tombstones", 0)) * 8),
+        )
+        for path, size in limits:
+            if path.exists() and path.stat().st_size > size:
+                if path == self.meta_path and _first_byte(path) == b"[":
+                    # A legacy JSON array replaced the log; it is converted below, not truncated.
+                    continue
+                os.truncate(path, size)
+
+    def _orphaned(self) -> bool:
+        """Whether a crashed writer left bytes past the last commit."""
+        state = self._read_state()
+        if "log_bytes" not in state:
+            return self._log_records != len(self.metadata)
+        log_bytes = self.meta_path.stat().st_size if self.meta_path.exists() else 0
+        tombstone_bytes = self.deleted_path.stat().st_size if self.deleted_path.exists() else 0
+        return log_bytes != int(state["log_bytes"]) or tombstone_bytes != int(state.get("tombstones", 0)) * 8
+
+    def _read_deleted(self) -> None:
+        self.deleted = set()
+        if self.deleted_path.exists():
+            self.deleted = set(np.fromfile(self.deleted_path, dtype="<i8").tolist())
+
+    def _state_stat(self) -> Tuple[int, int] | None:
+        try:
+            stat = os.stat(self.state_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _read_state(self) -> Dict[str, Any]:
+        try:
+            return json.loads(self.state_path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _remember_state(self) -> None:
+        self._state_signature = self._state_stat()
+        state = self._read_state()
+        self.generation = int(state.get("generation", 0))
+        self.epoch = state.get("epoch")
+
+    def _committed_rows(self) -> int:
+        state = self._read_state()
+        if "rows" in state:
+            return int(state["rows"])
+        # Stores written before the state file existed never deleted rows.
+        return self.index.ntotal if self.index is not None else 0
+
+    def refresh(self) -> bool:
+        """Pick up commits made by other processes; returns True when anything was reloaded.
+
+        The common case costs a single ``stat``. Appends within the same epoch only re-read the
+        index plus the new metadata tail; a rewritten log (new epoch) triggers a full reload.
+        """
+        signature = self._state_stat()
+        if signature == self._state_signature:
+            return False
+        state = self._read_state()
+        if state and int(state.get("generation", 0)) == self.generation and state.get("epoch") == self.epoch:
+            self._state_signature = signature
+            return False
+        if not (state and self.index is not None and self._load_tail(state)):
+            self._reload(repair=False)
+        self._state_signature = signature
+        logger.info("Reloaded FAISS store %s at generation %s.", self.index_path, self.generation)
+        return True
+
+    def _load_tail(self, state: Dict[str, Any]) -> bool:
+        rows = int(state.get("rows", 0))
+        start = len(self.metadata)
+        if state.get("epoch") != self.epoch or rows < start or not self.index_path.exists():
+            return False
+        offsets = np.fromfile(self.offsets_path, dtype="<i8") if self.offsets_path.exists() else np.empty(0, dtype="<i8")
+        if len(offsets) < rows:
+            return False
+        new_offsets = offsets[start:rows]
+        new_rows: List[Dict[str, Any]] = []
+        with self.meta_path.open("rb") as handle:
+            for offset in new_offsets:
+                handle.seek(int(offset))
+                new_rows.append(json.loads(handle.readline()))
+        self._read_index()
+        if isinstance(self.metadata, _LazyMetadata):
+            self.metadata.append_rows(new_rows, new_offsets.tolist())
         else:
-            self.metadata = []
+            self.metadata.extend(new_rows)
+        self._log_records = rows
+        self._read_deleted()
+        self._vectors = None
+        self.generation = int(state.get("generation", 0))
+        return True
+
+    def _reload(self, *, repair: bool) -> bool:
+        if isinstance(self.metadata, _LazyMetadata):
+            self.metadata.close()
+        self.index = None
+        self.metadata = []
+        self.deleted = set()
+        self.dimension = None
+        self._vectors = None
+        self._lexical = None
+        self._log_records = 0
+        self._read_only = False
+        return self._load(repair=repair)
+
+    def _file_lock(self):
+        return _locked(self.lock_path)
+
+    @contextmanager
+    def _write_lock(self):
+        """Serialize writers across processes and bring this instance up to date first."""
+        with self._file_lock():
+            self.refresh()
+            if self._orphaned():
+                # A writer died between its log append and its commit: drop the orphaned tail.
+                self._reload(repair=True)
+            yield
+
+    def _read_metadata_log(self) -> bool:
+        """Load the JSONL metadata log; return True when the file should be rewritten."""
+        self.metadata = []
+        self._log_records = 0
+        if not self.meta_path.exists():
+            return False
+        with self.meta_path.open("r", encoding="utf-8") as handle:
+            head = handle.read(1)
+            handle.seek(0)
+            if head == "[":
+                # Pre-JSONL stores kept a single pretty-printed JSON array.
+                self.metadata = json.load(handle)
+                return True
+            for line in handle:
+                if not line.strip():
+                    continue
+                try:
+                    self.metadata.append(json.loads(line))
+                except json.JSONDecodeError:
+                    logger.warning("Ignoring torn metadata record at the end of %s.", self.meta_path)
+                    return True
+                self._log_records += 1
+        return False
+
+    def _open_lazy_metadata(self) -> bool:
+        """Attach the offset index instead of parsing the log; False when it cannot be trusted."""
+        if not self.meta_path.exists():
+            self.metadata = _LazyMetadata(self.meta_path, np.empty(0, dtype="<i8"))
+            return True
+        if not self.offsets_path.exists():
+            return False
+        offsets = np.fromfile(self.offsets_path, dtype="<i8")
+        size = self.meta_path.stat().st_size
+        if len(offsets):
+            with self.meta_path.open("rb") as handle:
+                handle.seek(int(offsets[-1]))
+                last = handle.readline()
+                if handle.tell() != size or not last.endswith(b"\n"):
+                    return False
+        elif size:
+            return False
+        self.metadata = _LazyMetadata(self.meta_path, offsets)
+        self._log_records = len(offsets)
+        return True
+
+    def _offset_records(self) -> int:
+        return self.offsets_path.stat().st_size // 8 if self.offsets_path.exists() else 0
+
+    def _rebuild_offsets(self) -> None:
+        offsets: List[int] = []
+        if self.meta_path.exists():
+            with self.meta_path.open("rb") as handle:
+                position = 0
+                for line in handle:
+                    if line.strip():
+                        offsets.append(position)
+                    position += len(line)
+        _atomic_write(self.offsets_path, lambda temp_name: np.asarray(offsets, dtype="<i8").tofile(temp_name))
+
+    def _append_metadata(self, rows: List[Dict[str, Any]]) -> List[int]:
+        self.meta_path.parent.mkdir(parents=True, exist_ok=True)
+        if self._offset_records() != self._log_records:
+            self._rebuild_offsets()
+        encoded = [_encode_row(row) for row in rows]
+        with self.meta_path.open("ab") as handle:
+            position = handle.tell()
+            offsets = []
+            for line in encoded:
+                offsets.append(position)
+                position += len(line)
+            handle.write(b"".join(encoded))
+            handle.flush()
+            os.fsync(handle.fileno())
+        with self.offsets_path.open("ab") as handle:
+            handle.write(np.asarray(offsets, dtype="<i8").tobytes())
+        self._log_records += len(rows)
+        return offsets
+
+    def compact_metadata(self) -> None:
+        """Atomically rewrite the metadata log (and its offset index) so it holds exactly the committed rows."""
+        offsets: List[int] = []
+
+        def write(temp_name: str) -> None:
+            position = 0
+            with open(temp_name, "wb") as handle:
+                for row in self.metadata:
+                    line = _encode_row(row)
+                    offsets.append(position)
+                    position += len(line)
+                    handle.write(line)
+                handle.flush()
+                os.fsync(handle.fileno())
+
+        _atomic_write(self.meta_path, write)
+        _atomic_write(self.offsets_path, lambda temp_name: np.asarray(offsets, dtype="<i8").tofile(temp_name))
+        self._log_records = len(offsets)
+        if isinstance(self.metadata, _LazyMetadata):
+            self.metadata.close()
+            self.metadata = _LazyMetadata(self.meta_path, np.asarray(offsets, dtype="<i8"))
+        self._write_state(new_epoch=True)
+
+    def _truncate_sidecar(self, rows: int) -> None:
+        if not self.dimension or not self.vector_path.exists():
+            return
+        expected = rows * self.dimension * 2
+        if self.vector_path.stat().st_size > expected:
+            os.truncate(self.vector_path, expected)
+            self._vectors = None
+
+    def _new_flat_index(self, dimension: int) -> Any:
+        return faiss.index_factory(dimension, "IDMap2,Flat", faiss.METRIC_INNER_PRODUCT)
 
     def _ensure_index(self, dimension: int) -> None:
         if self.index is None:
-            self.index = faiss.IndexFlatIP(dimension)
+            self.index = self._new_flat_index(dimension)
             self.dimension = dimension
         elif self.dimension != dimension:
             logger.warning(
@@ -74,38 +586,229 @@ class FaissStore:
             )
             self._reset_index(dimension)
 
+    def _ensure_writable(self) -> None:
+        if self._read_only:
+            self.index = faiss.read_index(str(self.index_path))
+            self._read_only = False
+            self._apply_search_params()
+
+    def _removable(self) -> bool:
+        """Whether deleted ids can be physically removed without shifting the others."""
+        kind = _index_kind(self.index)
+        if kind == "ivf":
+            return True
+        return isinstance(self.index, faiss.IndexIDMap2) and kind != "hnsw"
+
+    def _add(self, array: np.ndarray, ids: np.ndarray) -> None:
+        if isinstance(self.index, faiss.IndexIDMap2) or _index_kind(self.index) == "ivf":
+            self.index.add_with_ids(array, ids)
+        else:
+            # Pre-id stores use implicit sequential ids, which match log positions.
+            self.index.add(array)
+
     def upsert(self, embeddings: List[List[float]], metadata: List[Dict[str, Any]]) -> None:
-        if not embeddings:
+        if not len(embeddings):
             return
         array = np.array(embeddings, dtype="float32")
         if array.ndim != 2:
             raise VectorStoreError("Embeddings must be a 2D array.")
         dimension = array.shape[1]
-        self._ensure_index(dimension)
         faiss.normalize_L2(array)
-        self.index.add(array)
-        self.metadata.extend(metadata)
-        self._save()
+        with self._write_lock():
+            self._ensure_writable()
+            self._ensure_index(dimension)
+            start = len(self.metadata)
+            # Metadata and vectors are appended first; the index + state rename is the commit point.
+            offsets = self._append_metadata(metadata)
+            if self._uses_sidecar():
+                self._append_vectors(array)
+            self._add(array, np.arange(start, start + len(array), dtype="int64"))
+            if isinstance(self.metadata, _LazyMetadata):
+                self.metadata.append_rows(metadata, offsets)
+            else:
+                self.metadata.extend(metadata)
+            self._lexical_index()
+            self._maybe_build_ann()
+            self._save()
+
+    def delete_documents(self, doc_ids: List[str]) -> int:
+        """Tombstone every live row of ``doc_ids`` and remove their vectors where supported."""
+        doc_id_set = set(doc_ids or [])
+        if not doc_id_set:
+            return 0
+        with self._write_lock():
+            if self.index is None:
+                return 0
+            ids = [
+                position
+                for position, row in enumerate(self.metadata)
+                if position not in self.deleted and row.get("doc_id") in doc_id_set
+            ]
+            if not ids:
+                return 0
+            self._ensure_writable()
+            array = np.asarray(ids, dtype="<i8")
+            with self.deleted_path.open("ab") as handle:
+                handle.write(array.tobytes())
+                handle.flush()
+                os.fsync(handle.fileno())
+            self.deleted.update(ids)
+            if self._removable():
+                self.index.remove_ids(array)
+            self._save()
+        return len(ids)
+
+    def live_count(self) -> int:
+        return len(self.metadata) - len(self.deleted)
+
+    def needs_compaction(self) -> bool:
+        if not self.deleted:
+            return False
+        return len(self.deleted) >= max(float(self.options["compact_ratio"]) * len(self.metadata), 1)
+
+    def live_vectors(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Return ``(ids, normalized vectors)`` for every live row."""
+        total = len(self.metadata)
+        deleted = np.fromiter(self.deleted, dtype="int64", count=len(self.deleted))
+        if self.index is None or total == 0:
+            return np.empty(0, dtype="int64"), np.empty((0, self.dimension or 0), dtype="float32")
+        sidecar = self._sidecar_vectors()
+        if sidecar is not None and len(sidecar) >= total:
+            ids = np.setdiff1d(np.arange(total, dtype="int64"), deleted)
+            return ids, np.asarray(sidecar[ids], dtype="float32")
+        self._ensure_writable()
+        if isinstance(self.index, faiss.IndexIDMap2):
+            ids = faiss.vector_to_array(self.index.id_map).astype("int64")
+            inner = _unwrap(self.index)
+            vectors = inner.reconstruct_n(0, inner.ntotal)
+        elif _index_kind(self.index) == "ivf":
+            ids = np.setdiff1d(np.arange(total, dtype="int64"), deleted)
+            # An array direct map needs sequential ids, which ``remove_ids`` breaks; a hashtable does not.
+            self.index.set_direct_map_type(faiss.DirectMap.Hashtable)
+            vectors = self.index.reconstruct_batch(ids)
+        else:
+            ids = np.arange(self.index.ntotal, dtype="int64")
+            vectors = self.index.reconstruct_n(0, self.index.ntotal)
+        keep = ~np.isin(ids, deleted)
+        return ids[keep], vectors[keep]
+
+    def _uses_sidecar(self) -> bool:
+        return self.options["compression"] != "none" or bool(self.options["exact_rescore"])
+
+    def _append_vectors(self, array: np.ndarray) -> None:
+        """Append normalized vectors to the float16 sidecar used for exact re-scoring."""
+        self.vector_path.parent.mkdir(parents=True, exist_ok=True)
+        with self.vector_path.open("ab") as handle:
+            handle.write(array.astype("float16").tobytes())
+        self._vectors = None
+
+    def _sidecar_vectors(self) -> np.ndarray | None:
+        if self._vectors is None and self.dimension and self.vector_path.exists():
+            self._vectors = np.memmap(self.vector_path, dtype="float16", mode="r").reshape(-1, self.dimension)
+        return self._vectors
+
+    def _pq_subquantizers(self) -> int:
+        configured = int(self.options["pq_m"] or 0)
+        if configured > 0:
+            return configured
+        target = max(self.dimension // 16, 1)
+        return max(m for m in range(1, target + 1) if self.dimension % m == 0)
+
+    def _ann_factory_spec(self, total: int) -> str:
+        compression = self.options["compression"]
+        if compression == "sq8":
+            storage = "SQ8"
+        elif compression == "pq":
+            storage = f"PQ{self._pq_subquantizers()}x{int(self.options['pq_nbits'])}"
+        else:
+            storage = "Flat"
+        index_type = self.options["index_type"]
+        if index_type == "hnsw":
+            prefix = f"HNSW{int(self.options['hnsw_m'])}"
+            return f"IDMap2,{prefix}" if storage == "Flat" else f"IDMap2,{prefix},{storage}"
+        if index_type == "flat":
+            return f"IDMap2,{storage}"
+        nlist = int(self.options["ivf_nlist"] or 0)
+        if nlist <= 0:
+            # faiss wants roughly 39 training points per centroid.
+            nlist = min(int(4 * math.sqrt(total)), total // 39)
+        return f"IVF{max(nlist, 1)},{storage}"
+
+    def _maybe_build_ann(self) -> None:
+        """Migrate a flat index to the configured ANN/compressed structure once it passes the threshold."""
+        index_type = self.options["index_type"]
+        if index_type == "flat" and self.options["compression"] == "none":
+            return
+        if _index_kind(self.index) != "flat":
+            return
+        total = self.index.ntotal
+        if total < max(int(self.options["ann_threshold"]), 1):
+            return
+        if self._uses_sidecar() and (self._sidecar_vectors() is None or len(self._sidecar_vectors()) != len(self.metadata)):
+            # Backfill the sidecar (indexed by row id) from the exact flat vectors.
+            inner = _unwrap(self.index)
+            full = np.zeros((len(self.metadata), self.dimension), dtype="float32")
+            if isinstance(self.index, faiss.IndexIDMap2):
+                full[faiss.vector_to_array(self.index.id_map)] = inner.reconstruct_n(0, inner.ntotal)
+            else:
+                full[: self.index.ntotal] = self.index.reconstruct_n(0, self.index.ntotal)
+            if self.vector_path.exists():
+                self.vector_path.unlink()
+            self._append_vectors(full)
+        ids, vectors = self.live_vectors()
+        spec = self._ann_factory_spec(len(ids))
+        self.index = self._build_index(spec, ids, vectors)
+        self._apply_search_params()
+        logger.info("Migrated FAISS index %s to %s with %s vectors.", self.index_path, spec, len(ids))
+
+    def _build_index(self, spec: str, ids: np.ndarray, vectors: np.ndarray) -> Any:
+        index = faiss.index_factory(self.dimension, spec, faiss.METRIC_INNER_PRODUCT)
+        if _index_kind(index) == "hnsw":
+            _unwrap(index).hnsw.efConstruction = int(self.options["hnsw_ef_construction"])
+        if not index.is_trained:
+            index.train(vectors)
+        index.add_with_ids(vectors, ids)
+        return index
+
+    def _apply_search_params(self) -> None:
+        kind = _index_kind(self.index)
+        if kind == "hnsw":
+            _unwrap(self.index).hnsw.efSearch = int(self.options["hnsw_ef_search"])
+        elif kind == "ivf":
+            self.index.nprobe = int(self.options["ivf_nprobe"])
 
     def _reset_index(self, dimension: int) -> None:
         """Drop existing FAISS data on dimension mismatch."""
-        self.index = faiss.IndexFlatIP(dimension)
+        self.index = self._new_flat_index(dimension)
         self.dimension = dimension
+        if isinstance(self.metadata, _LazyMetadata):
+            self.metadata.close()
         self.metadata = []
-        if self.index_path.exists():
-            self.index_path.unlink()
-        if self.meta_path.exists():
-            self.meta_path.unlink()
-        self._save()
+        self.deleted = set()
+        self._vectors = None
+        self._lexical = None
+        self._log_records = 0
+        for path in (
+            self.index_path,
+            self.meta_path,
+            self.offsets_path,
+            self.vector_path,
+            self.deleted_path,
+            self.lexical_path,
+        ):
+            if path.exists():
+                path.unlink()
+        self._save(new_epoch=True)
 
     def count(self, *, base_id: int | None = None, doc_ids: List[str] | None = None) -> int:
         if base_id is None and not doc_ids:
-            return len(self.metadata)
+            return self.live_count()
         doc_id_set = set(doc_ids or [])
         return sum(
             1
-            for item in self.metadata
-            if (base_id is None or str(item.get("base_id")) == str(base_id))
+            for position, item in enumerate(self.metadata)
+            if position not in self.deleted
+            and (base_id is None or str(item.get("base_id")) == str(base_id))
             and (not doc_id_set or item.get("doc_id") in doc_id_set)
         )
 
@@ -117,15 +820,46 @@ class FaissStore:
         base_id: int | None = None,
         doc_ids: List[str] | None = None,
     ) -> List[Tuple[float, Dict[str, Any]]]:
-        if self.index is None or self.index.ntotal == 0:
-            return []
-        vector = np.array([embedding], dtype="float32")
-        faiss.normalize_L2(vector)
-        distances, indices = self.index.search(vector, top_k)
+        return self.search_many([embedding], top_k, base_id=base_id, doc_ids=doc_ids)[0]
+
+    def search_many(
+        self,
+        embeddings: List[List[float]],
+        top_k: int,
+        *,
+        base_id: int | None = None,
+        doc_ids: List[str] | None = None,
+    ) -> List[List[Tuple[float, Dict[str, Any]]]]:
+        """Search every embedding with one matrix ``index.search`` call."""
+        if self.index is None or self.index.ntotal == 0 or not len(embeddings):
+            return [[] for _ in embeddings]
+        vectors = np.array(embeddings, dtype="float32")
+        faiss.normalize_L2(vectors)
+        fetch_k = top_k
+        if self.deleted and not self._removable():
+            # Tombstoned rows are still in the graph until compaction; leave room to skip them.
+            fetch_k += min(len(self.deleted), top_k * 4)
+        if self._rescore_enabled():
+            distances, indices = self.index.search(vectors, fetch_k * max(int(self.options["rescore_factor"]), 1))
+            rows = [self._rescore(vectors[row : row + 1], indices[row : row + 1], fetch_k) for row in range(len(vectors))]
+            hits = [(row_distances[0], row_indices[0]) for row_distances, row_indices in rows]
+        else:
+            distances, indices = self.index.search(vectors, fetch_k)
+            hits = list(zip(distances, indices, strict=False))
         doc_id_set = set(doc_ids or [])
+        return [self._collect(row_distances, row_indices, top_k, base_id, doc_id_set) for row_distances, row_indices in hits]
+
+    def _collect(
+        self,
+        distances: np.ndarray,
+        indices: np.ndarray,
+        top_k: int,
+        base_id: int | None,
+        doc_id_set: Set[str],
+    ) -> List[Tuple[float, Dict[str, Any]]]:
         results: List[Tuple[float, Dict[str, Any]]] = []
-        for score, idx in zip(distances[0], indices[0], strict=False):
-            if idx == -1:
+        for score, idx in zip(distances, indices, strict=False):
+            if idx == -1 or idx in self.deleted:
                 continue
             try:
                 meta = self.metadata[idx]
@@ -136,8 +870,72 @@ class FaissStore:
             if doc_id_set and meta.get("doc_id") not in doc_id_set:
                 continue
             results.append((float(score), meta))
+            if len(results) >= top_k:
+                break
         return results
 
+    def _rescore_enabled(self) -> bool:
+        if not self.options["exact_rescore"] or _index_kind(self.index) == "flat":
+            return False
+        vectors = self._sidecar_vectors()
+        return vectors is not None and len(vectors) >= len(self.metadata)
+
+    def _rescore(self, vector: np.ndarray, indices: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Re-rank approximate candidates with exact inner products from the float16 sidecar."""
+        candidates = indices[0][indices[0] >= 0]
+        if not len(candidates):
+            return np.empty((1, 0), dtype="float32"), np.empty((1, 0), dtype="int64")
+        exact = np.asarray(self._sidecar_vectors()[candidates], dtype="float32") @ vector[0]
+        order = np.argsort(-exact)[:top_k]
+        return exact[order][None, :], candidates[order][None, :]
+
+    def measure_recall(self, *, sample_size: int = 100, top_k: int = 10, seed: int = 0) -> Dict[str, Any]:
+        """Compare index results with exact search over the stored vectors on sampled queries."""
+        if self.index is None or self.index.ntotal == 0:
+            return {"vectors": 0, "sample_size": 0, "top_k": top_k, "recall_at_k": 0.0}
+        if _index_kind(self.index) != "flat" and not self._rescore_enabled() and self._sidecar_vectors() is None:
+            raise VectorStoreError("Recall measurement on a compressed/ANN index requires the float16 sidecar.")
+        corpus_ids, corpus = self.live_vectors()
+        total = len(corpus)
+        k = min(top_k, total)
+        rng = np.random.default_rng(seed)
+        sample = np.sort(rng.choice(total, size=min(sample_size, total), replace=False))
+        queries = np.asarray(corpus[sample], dtype="float32")
+
+        best_scores = np.full((len(queries), k), -np.inf, dtype="float32")
+        best_ids = np.zeros((len(queries), k), dtype="int64")
+        block = 65536
+        for start in range(0, total, block):
+            scores = queries @ corpus[start : start + block].T
+            merged_scores = np.concatenate([best_scores, scores], axis=1)
+            merged_ids = np.concatenate(
+                [best_ids, np.broadcast_to(corpus_ids[start : start + block], scores.shape)], axis=1
+            )
+            keep = np.argpartition(-merged_scores, k - 1, axis=1)[:, :k]
+            best_scores = np.take_along_axis(merged_scores, keep, axis=1)
+            best_ids = np.take_along_axis(merged_ids, keep, axis=1)
+
+        matched = 0
+        for query, expected in zip(queries, best_ids, strict=False):
+            vector = query[None, :].copy()
+            if self._rescore_enabled():
+                _distances, found = self.index.search(vector, k * max(int(self.options["rescore_factor"]), 1))
+                _distances, found = self._rescore(vector, found, k)
+            else:
+                _distances, found = self.index.search(vector, k)
+            matched += len(set(found[0].tolist()) & set(expected.tolist()))
+        return {
+            "vectors": total,
+            "sample_size": len(queries),
+            "top_k": k,
+            "recall_at_k": round(matched / (len(queries) * k), 4),
+            "index": type(_unwrap(self.index)).__name__,
+            "exact_rescore": self._rescore_enabled(),
+            "deleted": len(self.deleted),
+            "index_bytes": self.index_path.stat().st_size if self.index_path.exists() else 0,
+            "sidecar_bytes": self.vector_path.stat().st_size if self.vector_path.exists() else 0,
+        }
+
     def lexical_search(
         self,
         query: str,
@@ -147,34 +945,96 @@ class FaissStore:
         doc_ids: List[str] | None = None,
     ) -> List[Tuple[float, Dict[str, Any]]]:
         doc_id_set = set(doc_ids or [])
-        scored: List[Tuple[float, Dict[str, Any]]] = []
-        for meta in self.metadata:
+        rows, scores = self._lexical_index().search(query, exclude=self.deleted)
+        results: List[Tuple[float, Dict[str, Any]]] = []
+        for row, score in zip(rows.tolist(), scores.tolist(), strict=False):
+            meta = self.metadata[row]
             if base_id is not None and str(meta.get("base_id")) != str(base_id):
                 continue
             if doc_id_set and meta.get("doc_id") not in doc_id_set:
                 continue
-            score = _keyword_overlap_score(query, str(meta.get("text", "")))
-            if score <= 0:
-                continue
-            scored.append((score, meta))
-        scored.sort(key=lambda item: item[0], reverse=True)
-        return scored[:top_k]
+            results.append((float(score), meta))
+            if len(results) >= top_k:
+                break
+        return results
 
-    def _save(self) -> None:
-        self.index_path.parent.mkdir(parents=True, exist_ok=True)
-        self.meta_path.parent.mkdir(parents=True, exist_ok=True)
-        faiss.write_index(self.index, str(self.index_path))
-        with self.meta_path.open("w", encoding="utf-8") as handle:
-            json.dump(self.metadata, handle, ensure_ascii=False, indent=2)
+    def _lexical_index(self) -> BM25Index:
+        """BM25 postings for the committed rows: the persisted snapshot plus any rows it has not seen."""
+        if self._lexical is None:
+            index = BM25Index.read(self.lexical_path)
+            if index is None or len(index) > len(self.metadata):
+                # Missing, or written for a commit that was rolled back: rebuild from the log.
+                index = BM25Index()
+            self._lexical = index
+        if len(self._lexical) < len(self.metadata):
+            self._lexical.add(str(row.get("text", "")) for row in self.metadata[len(self._lexical) :])
+        return self._lexical
+
+    def _write_state(self, *, new_epoch: bool = False) -> None:
+        if new_epoch or self.epoch is None:
+            self.epoch = uuid.uuid4().hex
+        self.generation += 1
+        payload = json.dumps(
+            {
+                "rows": len(self.metadata),
+                "log_bytes": self.meta_path.stat().st_size if self.meta_path.exists() else 0,
+                "tombstones": len(self.deleted),
+                "generation": self.generation,
+                "epoch": self.epoch,
+            }
+        )
+        _atomic_write(self.state_path, lambda temp_name: Path(temp_name).write_text(payload, encoding="utf-8"))
+        self._state_signature = self._state_stat()
+
+    def _save(self, *, new_epoch: bool = False) -> None:
+        if self._lexical is not None and self._lexical.tail_lengths:
+            _atomic_write(self.lexical_path, self._lexical.write)
+        _atomic_write(self.index_path, lambda temp_name: faiss.write_index(self.index, temp_name))
+        self._write_state(new_epoch=new_epoch)
 
     def upsert_embeddings(self, *, embeddings: List[List[float]], metadata: List[Dict[str, Any]]) -> None:
         """Compatibility wrapper used by ingestion pipeline."""
         self.upsert(embeddings, metadata)
 
 
+# Only what a hit payload needs: never the embedding JSON or the vector itself.
+PGVECTOR_RESULT_FIELDS = (
+    "chunk_id",
+    "text",
+    "metadata",
+    "document__doc_id",
+    "document__base_id",
+    "document__title",
+)
+
+
+def _chunk_payload(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "doc_id": row["document__doc_id"],
+        "chunk_id": row["chunk_id"],
+        "text": row["text"],
+        "base_id": row["document__base_id"],
+        "title": row["document__title"],
+        "metadata": row["metadata"] or {},
+    }
+
+
+def _vector_literal(embedding: List[float]) -> str:
+    return "[" + ",".join(repr(float(value)) for value in embedding) + "]"
+
+
+def search_fields(text: str) -> Dict[str, Any]:
+    """Chunk or document ``search_vector`` value for ingest (PostgreSQL only; other databases scan in Python)."""
+    if connection.vendor != "postgresql":
+        return {}
+    return {"search_vector": SearchVector(Value(search_document(text)), config="simple")}
+
+
 class PgVectorStore:
-    def __init__(self) -> None:
+    def __init__(self, options: Dict[str, Any] | None = None) -> None:
         self.vendor = connection.vendor
+        self.options = {**DEFAULT_PGVECTOR_OPTIONS, **(options or {})}
+        self.column, self.opclass = PGVECTOR_STORAGES[self.options["storage"]]
 
     def _ensure_postgres(self) -> None:
         if self.vendor != "postgresql":
@@ -186,7 +1046,7 @@ class PgVectorStore:
             queryset = queryset.filter(document__base_id=base_id)
         if doc_ids:
             queryset = queryset.filter(document__doc_id__in=doc_ids)
-        return queryset.exclude(embedding_vector__isnull=True).count()
+        return queryset.exclude(**{f"{self.column}__isnull": True}).count()
 
     def search(
         self,
@@ -197,32 +1057,89 @@ class PgVectorStore:
         doc_ids: List[str] | None = None,
     ) -> List[Tuple[float, Dict[str, Any]]]:
         self._ensure_postgres()
+        queryset = self._search_queryset(embedding, top_k, base_id=base_id, doc_ids=doc_ids)
+        with self._search_session():
+            rows = list(queryset)
+        return [(1.0 - float(row["distance"] if row["distance"] is not None else 1.0), _chunk_payload(row)) for row in rows]
+
+    def _search_queryset(
+        self,
+        embedding: List[float],
+        top_k: int,
+        *,
+        base_id: int | None = None,
+        doc_ids: List[str] | None = None,
+        fields: Tuple[str, ...] | None = PGVECTOR_RESULT_FIELDS,
+    ) -> Any:
+        """Nearest-neighbour queryset; ``fields=None`` yields full model instances (benchmark baseline)."""
         queryset = KnowledgeChunk.objects.select_related("document")
         if base_id is not None:
             queryset = queryset.filter(document__base_id=base_id)
         if doc_ids:
             queryset = queryset.filter(document__doc_id__in=doc_ids)
-        queryset = queryset.exclude(embedding_vector__isnull=True)
-        queryset = queryset.annotate(distance=CosineDistance("embedding_vector", embedding)).order_by("distance")[:top_k]
+        queryset = queryset.exclude(**{f"{self.column}__isnull": True})
+        if self.column == "embedding_half":
+            embedding = HalfVector(list(embedding))
+        # ORDER BY <=> ... LIMIT k is the shape the HNSW/IVFFlat cosine indexes can serve.
+        queryset = queryset.annotate(distance=CosineDistance(self.column, embedding)).order_by("distance")
+        if fields is not None:
+            queryset = queryset.values(*fields, "distance")
+        return queryset[:top_k]
 
-        results: List[Tuple[float, Dict[str, Any]]] = []
-        for chunk in queryset:
-            distance = float(getattr(chunk, "distance", 1.0) or 1.0)
-            similarity = 1.0 - distance
-            results.append(
-                (
-                    similarity,
-                    {
-                        "doc_id": chunk.document.doc_id,
-                        "chunk_id": chunk.chunk_id,
-                        "text": chunk.text,
-                        "base_id": chunk.document.base_id,
-                        "title": chunk.document.title,
-                        "metadata": chunk.metadata or {},
-                    },
-                )
-            )
-        return results
+    @contextmanager
+    def _search_session(self):
+        """Apply query-time ANN knobs with SET LOCAL so they never leak to pooled connections."""
+        with transaction.atomic(), connection.cursor() as cursor:
+            # SET does not accept bind parameters; the values are validated ints.
+            cursor.execute(f"SET LOCAL hnsw.ef_search = {int(self.options['hnsw_ef_search'])}")
+            cursor.execute(f"SET LOCAL ivfflat.probes = {int(self.options['ivfflat_probes'])}")
+            if self.options["iterative_scan"] != "off":
+                # pgvector >= 0.8: keep scanning the index when base/doc filters drop candidates.
+                cursor.execute(f"SET LOCAL hnsw.iterative_scan = {self.options['iterative_scan']}")
+                cursor.execute(f"SET LOCAL ivfflat.iterative_scan = {self.options['iterative_scan']}")
+            yield
+
+    def ann_index_name(self, method: str) -> str:
+        suffix = "embedding" if self.column == "embedding_vector" else self.column
+        return f"{KnowledgeChunk._meta.db_table}_{suffix}_{method}"
+
+    def ann_index_sql(
+        self,
+        method: str,
+        *,
+        m: int = 16,
+        ef_construction: int = 64,
+        lists: int = 100,
+        concurrently: bool = True,
+    ) -> str:
+        if method not in PGVECTOR_INDEX_METHODS:
+            raise VectorStoreError(f"Unsupported pgvector index method: {method}")
+        params = f"m = {int(m)}, ef_construction = {int(ef_construction)}" if method == "hnsw" else f"lists = {int(lists)}"
+        column = KnowledgeChunk._meta.get_field(self.column).column
+        return (
+            f"CREATE INDEX {'CONCURRENTLY ' if concurrently else ''}IF NOT EXISTS {self.ann_index_name(method)} "
+            f"ON {KnowledgeChunk._meta.db_table} USING {method} ({column} {self.opclass}) WITH ({params})"
+        )
+
+    def create_ann_index(self, method: str, *, concurrently: bool = True, **params: int) -> str:
+        """Build an ANN index on the active storage column; CONCURRENTLY keeps ingest writes flowing meanwhile."""
+        self._ensure_postgres()
+        sql = self.ann_index_sql(method, concurrently=concurrently, **params)
+        with connection.cursor() as cursor:
+            cursor.execute(sql)
+            cursor.execute(f"ANALYZE {KnowledgeChunk._meta.db_table}")
+        return self.ann_index_name(method)
+
+    def drop_ann_index(self, method: str, *, concurrently: bool = True) -> None:
+        self._ensure_postgres()
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP INDEX {'CONCURRENTLY ' if concurrently else ''}IF EXISTS {self.ann_index_name(method)}")
+
+    def explain_search(self, embedding: List[float], top_k: int, *, base_id: int | None = None) -> str:
+        """Return the EXPLAIN plan of the production search query under the configured session knobs."""
+        self._ensure_postgres()
+        with self._search_session():
+            return self._search_queryset(embedding, top_k, base_id=base_id).explain()
 
     def lexical_search(
         self,
@@ -238,26 +1155,206 @@ class PgVectorStore:
         if doc_ids:
             queryset = queryset.filter(document__doc_id__in=doc_ids)
 
+        if self.vendor == "postgresql":
+            expression = search_query(query)
+            if not expression:
+                return []
+            # Ranked in PostgreSQL through the GIN index; only top_k rows cross the wire.
+            ts_query = SearchQuery(expression, search_type="raw", config="simple")
+            rows = (
+                queryset.filter(search_vector=ts_query)
+                .annotate(rank=SearchRank(F("search_vector"), ts_query))
+                .order_by("-rank")
+                .values(*PGVECTOR_RESULT_FIELDS, "rank")[:top_k]
+            )
+            return [(float(row["rank"]), _chunk_payload(row)) for row in rows]
+
         scored: List[Tuple[float, Dict[str, Any]]] = []
-        for chunk in queryset.only("chunk_id", "text", "metadata", "document__doc_id", "document__base_id", "document__title"):
-            score = _keyword_overlap_score(query, chunk.text)
+        query_ids = query_term_ids(query)
+        for row in queryset.values(*PGVECTOR_RESULT_FIELDS).iterator(chunk_size=2000):
+            payload = _chunk_payload(row)
+            score = overlap_ratio(query_ids, chunk_term_ids(payload))
             if score <= 0:
                 continue
-            scored.append(
+            scored.append((score, payload))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return scored[:top_k]
+
+    def _scope_sql(self, *, base_id: int | None, doc_ids: List[str] | None) -> str:
+        """``FROM ... WHERE`` over chunks joined to documents (aliases ``c``/``d``), scoped by base/doc ids."""
+        scope = (
+            f"FROM {KnowledgeChunk._meta.db_table} c "
+            f"JOIN {KnowledgeDocument._meta.db_table} d ON d.id = c.document_id WHERE TRUE"
+        )
+        if base_id is not None:
+            scope += " AND d.base_id = %(base_id)s"
+        if doc_ids:
+            scope += " AND d.doc_id = ANY(%(doc_ids)s)"
+        return scope
+
+    def _fetch_rows(self, sql: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        with self._search_session(), connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            columns = [column.name for column in cursor.description]
+            rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        for row in rows:
+            if isinstance(row["metadata"], str):
+                # Raw cursors hand jsonb back undecoded.
+                row["metadata"] = json.loads(row["metadata"])
+        return rows
+
+    def search_many_sql(self, top_k: int, *, base_id: int | None = None, doc_ids: List[str] | None = None) -> str:
+        """Nearest neighbours of every ``%(embeddings)s`` element via LATERAL, one index scan per query."""
+        column = KnowledgeChunk._meta.get_field(self.column).column
+        vector_type = self.opclass.split("_", 1)[0]
+        return f"""
+SELECT q.ord, hit.*
+FROM unnest(%(embeddings)s::{vector_type}[]) WITH ORDINALITY AS q(embedding, ord)
+CROSS JOIN LATERAL (
+    SELECT
+        c.chunk_id, c.text, c.metadata,
+        d.doc_id AS document__doc_id, d.base_id AS document__base_id, d.title AS document__title,
+        c.{column} <=> q.embedding AS distance
+    {self._scope_sql(base_id=base_id, doc_ids=doc_ids)} AND c.{column} IS NOT NULL
+    ORDER BY distance
+    LIMIT {int(top_k)}
+) AS hit
+ORDER BY q.ord, hit.distance
+"""
+
+    def search_many(
+        self,
+        embeddings: List[List[float]],
+        top_k: int,
+        *,
+        base_id: int | None = None,
+        doc_ids: List[str] | None = None,
+    ) -> List[List[Tuple[float, Dict[str, Any]]]]:
+        """Batch nearest-neighbour search: all embeddings in one statement and round trip."""
+        self._ensure_postgres()
+        results: List[List[Tuple[float, Dict[str, Any]]]] = [[] for _ in embeddings]
+        if not embeddings:
+            return results
+        params = {
+            "embeddings": [_vector_literal(embedding) for embedding in embeddings],
+            "base_id": base_id,
+            "doc_ids": list(doc_ids or []),
+        }
+        for row in self._fetch_rows(self.search_many_sql(top_k, base_id=base_id, doc_ids=doc_ids), params):
+            distance = row["distance"] if row["distance"] is not None else 1.0
+            results[int(row["ord"]) - 1].append((1.0 - float(distance), _chunk_payload(row)))
+        return results
+
+    @property
+    def supports_hybrid_sql(self) -> bool:
+        return self.vendor == "postgresql" and bool(self.options["hybrid_sql"])
+
+    def hybrid_search_sql(
+        self,
+        *,
+        candidate_k: int,
+        base_id: int | None = None,
+        doc_ids: List[str] | None = None,
+        rrf_k: int = 60,
+    ) -> str:
+        """One statement: both candidate legs as CTEs, RRF fusion and the payload join.
+
+        Placeholders: ``%(embedding)s``, ``%(ts_query)s``, ``%(base_id)s``, ``%(doc_ids)s``.
+        """
+        chunks = KnowledgeChunk._meta.db_table
+        documents = KnowledgeDocument._meta.db_table
+        column = KnowledgeChunk._meta.get_field(self.column).column
+        vector_type = self.opclass.split("_", 1)[0]
+        scope = self._scope_sql(base_id=base_id, doc_ids=doc_ids)
+        candidate_k, rrf_k = int(candidate_k), int(rrf_k)
+        # Each leg keeps the ORDER BY ... LIMIT shape its index (HNSW/IVFFlat, GIN) can serve.
+        return f"""
+WITH vector_hits AS (
+    SELECT id, 1 - distance AS score, ROW_NUMBER() OVER (ORDER BY distance) AS rank
+    FROM (
+        SELECT c.id, c.{column} <=> %(embedding)s::{vector_type} AS distance
+        {scope} AND c.{column} IS NOT NULL
+        ORDER BY distance
+        LIMIT {candidate_k}
+    ) AS nearest
+),
+lexical_hits AS (
+    SELECT id, score, ROW_NUMBER() OVER (ORDER BY score DESC, id) AS rank
+    FROM (
+        SELECT c.id, ts_rank(c.search_vector, to_tsquery('simple', %(ts_query)s)) AS score
+        {scope} AND c.search_vector @@ to_tsquery('simple', %(ts_query)s)
+        ORDER BY score DESC
+        LIMIT {candidate_k}
+    ) AS matched
+),
+fused AS (
+    SELECT
+        COALESCE(v.id, l.id) AS id,
+        v.rank AS vector_rank,
+        l.rank AS lexical_rank,
+        v.score AS vector_score,
+        l.score AS lexical_score,
+        COALESCE(1.0 / ({rrf_k} + v.rank), 0) + COALESCE(1.0 / ({rrf_k} + l.rank), 0) AS rrf_score
+    FROM vector_hits v FULL OUTER JOIN lexical_hits l ON l.id = v.id
+)
+SELECT
+    f.rrf_score, f.vector_rank, f.lexical_rank, f.vector_score, f.lexical_score,
+    c.chunk_id, c.text, c.metadata,
+    d.doc_id AS document__doc_id, d.base_id AS document__base_id, d.title AS document__title
+FROM fused f
+JOIN {chunks} c ON c.id = f.id
+JOIN {documents} d ON d.id = c.document_id
+ORDER BY f.rrf_score DESC, f.vector_rank ASC NULLS LAST, f.lexical_rank ASC NULLS LAST
+"""
+
+    def hybrid_search(
+        self,
+        embedding: List[float],
+        query: str,
+        candidate_k: int,
+        *,
+        base_id: int | None = None,
+        doc_ids: List[str] | None = None,
+        rrf_k: int = 60,
+    ) -> Dict[str, Any]:
+        """Vector + lexical retrieval fused with RRF in a single database round trip.
+
+        Returns the fused ``results`` with ``retrieval_sources``/``source_ranks`` and the
+        per-leg ``vector_results`` / ``lexical_results`` in rank order.
+        """
+        self._ensure_postgres()
+        sql = self.hybrid_search_sql(candidate_k=candidate_k, base_id=base_id, doc_ids=doc_ids, rrf_k=rrf_k)
+        params = {
+            "embedding": _vector_literal(embedding),
+            "ts_query": search_query(query),
+            "base_id": base_id,
+            "doc_ids": list(doc_ids or []),
+        }
+        rows = self._fetch_rows(sql, params)
+
+        results: List[Tuple[float, Dict[str, Any]]] = []
+        vector_results: List[Tuple[int, float, Dict[str, Any]]] = []
+        lexical_results: List[Tuple[int, float, Dict[str, Any]]] = []
+        for row in rows:
+            payload = _chunk_payload(row)
+            source_ranks: Dict[str, int] = {}
+            if row["vector_rank"] is not None:
+                source_ranks["vector"] = int(row["vector_rank"])
+                vector_results.append((source_ranks["vector"], float(row["vector_score"]), payload))
+            if row["lexical_rank"] is not None:
+                source_ranks["lexical"] = int(row["lexical_rank"])
+                lexical_results.append((source_ranks["lexical"], float(row["lexical_score"]), payload))
+            results.append(
                 (
-                    score,
-                    {
-                        "doc_id": chunk.document.doc_id,
-                        "chunk_id": chunk.chunk_id,
-                        "text": chunk.text,
-                        "base_id": chunk.document.base_id,
-                        "title": chunk.document.title,
-                        "metadata": chunk.metadata or {},
-                    },
+                    float(row["rrf_score"]),
+                    {**payload, "retrieval_sources": list(source_ranks), "source_ranks": source_ranks},
                 )
             )
-        scored.sort(key=lambda item: item[0], reverse=True)
-        return scored[:top_k]
+        return {
+            "results": results,
+            "vector_results": [(score, payload) for _rank, score, payload in sorted(vector_results, key=lambda item: item[0])],
+            "lexical_results": [(score, payload) for _rank, score, payload in sorted(lexical_results, key=lambda item: item[0])],
+        }
 
     def upsert_embeddings(self, *, embeddings: List[List[float]], metadata: List[Dict[str, Any]]) -> None:
         self._ensure_postgres()
@@ -270,27 +1367,274 @@ class PgVectorStore:
         }
         if not embedding_map:
             return
-        chunks = list(KnowledgeChunk.objects.filter(chunk_id__in=embedding_map.keys()))
+        chunks = list(KnowledgeChunk.objects.filter(chunk_id__in=embedding_map.keys()).only("pk", "chunk_id"))
         for chunk in chunks:
             vector = embedding_map.get(chunk.chunk_id)
             if vector is None:
                 continue
-            chunk.embedding = vector
-            chunk.embedding_vector = vector
+            for field, value in chunk_vector_fields(vector).items():
+                setattr(chunk, field, value)
         if chunks:
-            KnowledgeChunk.objects.bulk_update(chunks, ["embedding", "embedding_vector"])
+            KnowledgeChunk.objects.bulk_update(chunks, ["embedding", "embedding_vector", "embedding_half"])
+
+    def delete_documents(self, *, base_id: Any, doc_ids: List[str]) -> int:
+        # Vectors live on KnowledgeChunk rows and go away with the ORM cascade.
+        return 0
+
+    def drop_partition(self, *, base_id: Any) -> None:
+        return None
+
+
+class PartitionedFaissStore:
+    """FAISS backend with one sub-index per knowledge base, routed by ``base_id``."""
+
+    index_filename = "index.faiss"
+    meta_filename = "chunks.jsonl"
+    partition_prefix = "base-"
+
+    def __init__(self, root: Path, options: Dict[str, Any] | None = None):
+        if faiss is None:
+            raise VectorStoreError("faiss-cpu is required for FAISS backend but is not installed.")
+
+        self.root = root
+        self.options = options or {}
+        self.partitions: Dict[str, FaissStore] = {}
+
+    def _partition_dir(self, base_id: Any) -> Path:
+        return self.root / f"{self.partition_prefix}{base_id}"
+
+    def partition_ids(self) -> List[str]:
+        if not self.root.exists():
+            return []
+        return sorted(
+            path.name[len(self.partition_prefix) :]
+            for path in self.root.iterdir()
+            if path.is_dir() and path.name.startswith(self.partition_prefix)
+        )
+
+    def partition(self, base_id: Any, *, create: bool = False) -> FaissStore | None:
+        key = str(base_id)
+        directory = self._partition_dir(key)
+        cached = self.partitions.get(key)
+        if cached is not None:
+            if directory.exists() or create:
+                # Another process may have committed since we last looked; this is one stat() when it has not.
+                cached.refresh()
+                return cached
+            # The base was dropped elsewhere.
+            self._evict(key)
+        if key not in self.partitions:
+            self._recover_swap(directory)
+            if not create and not directory.exists():
+                return None
+            self.partitions[key] = FaissStore(
+                index_path=directory / self.index_filename,
+                meta_path=directory / self.meta_filename,
+                options=self.options,
+            )
+        return self.partitions[key]
+
+    def _targets(self, base_id: int | None) -> List[FaissStore]:
+        keys = self.partition_ids() if base_id is None else [str(base_id)]
+        return [store for store in (self.partition(key) for key in keys) if store is not None]
+
+    def count(self, *, base_id: int | None = None, doc_ids: List[str] | None = None) -> int:
+        return sum(store.count(doc_ids=doc_ids) for store in self._targets(base_id))
+
+    def search(
+        self,
+        embedding: List[float],
+        top_k: int,
+        *,
+        base_id: int | None = None,
+        doc_ids: List[str] | None = None,
+    ) -> List[Tuple[float, Dict[str, Any]]]:
+        return self.search_many([embedding], top_k, base_id=base_id, doc_ids=doc_ids)[0]
+
+    def search_many(
+        self,
+        embeddings: List[List[float]],
+        top_k: int,
+        *,
+        base_id: int | None = None,
+        doc_ids: List[str] | None = None,
+    ) -> List[List[Tuple[float, Dict[str, Any]]]]:
+        merged: List[List[Tuple[float, Dict[str, Any]]]] = [[] for _ in embeddings]
+        for store in self._targets(base_id):
+            for results, hits in zip(merged, store.search_many(embeddings, top_k, doc_ids=doc_ids), strict=False):
+                results.extend(hits)
+        for results in merged:
+            results.sort(key=lambda item: item[0], reverse=True)
+            del results[top_k:]
+        return merged
+
+    def lexical_search(
+        self,
+        query: str,
+        top_k: int,
+        *,
+        base_id: int | None = None,
+        doc_ids: List[str] | None = None,
+    ) -> List[Tuple[float, Dict[str, Any]]]:
+        results: List[Tuple[float, Dict[str, Any]]] = []
+        for store in self._targets(base_id):
+            results.extend(store.lexical_search(query, top_k, doc_ids=doc_ids))
+        results.sort(key=lambda item: item[0], reverse=True)
+        return results[:top_k]
+
+    def _staging_dir(self, base_id: Any) -> Path:
+        return self.root / f".{self.partition_prefix}{base_id}.compact"
+
+    def _retired_dir(self, base_id: Any) -> Path:
+        return self.root / f".{self.partition_prefix}{base_id}.retired"
+
+    def _swap_lock(self, key: str):
+        return _locked(self.root / f".{self.partition_prefix}{key}.lock")
+
+    def _recover_swap(self, directory: Path) -> None:
+        """Finish or roll back a compaction swap interrupted between its two renames."""
+        key = directory.name[len(self.partition_prefix) :]
+        retired = self._retired_dir(key)
+        if not retired.exists():
+            return
+        with self._swap_lock(key):
+            if not retired.exists():
+                return
+            if directory.exists():
+                shutil.rmtree(retired)
+            else:
+                retired.rename(directory)
+
+    def delete_documents(self, *, base_id: Any, doc_ids: List[str]) -> int:
+        store = self.partition(base_id)
+        if store is None:
+            return 0
+        return store.delete_documents(doc_ids)
+
+    def _evict(self, key: str) -> None:
+        store = self.partitions.pop(key, None)
+        if store is not None and isinstance(store.metadata, _LazyMetadata):
+            store.metadata.close()
+
+    def drop_partition(self, *, base_id: Any) -> None:
+        key = str(base_id)
+        self._evict(key)
+        for directory in (self._partition_dir(key), self._staging_dir(key), self._retired_dir(key)):
+            if directory.exists():
+                shutil.rmtree(directory)
+
+    def needs_compaction(self, *, base_id: Any) -> bool:
+        store = self.partition(base_id)
+        return store is not None and store.needs_compaction()
+
+    def compact_partition(self, *, base_id: Any) -> Dict[str, int]:
+        """Rebuild a partition from its live rows and swap it in place of the old directory."""
+        key = str(base_id)
+        store = self.partition(key)
+        if store is None:
+            return {"live": 0, "removed": 0}
+        # Writers block on the old directory's lock until the swap is done, then re-lock the new one.
+        with store._write_lock(), self._swap_lock(key):
+            removed = len(store.deleted)
+            ids, vectors = store.live_vectors()
+            staging = self._staging_dir(key)
+            if staging.exists():
+                shutil.rmtree(staging)
+            if len(ids):
+                # The fresh store starts flat and re-migrates to the configured ANN index in one upsert.
+                fresh = FaissStore(
+                    index_path=staging / self.index_filename,
+                    meta_path=staging / self.meta_filename,
+                    options={**self.options, "mmap": False},
+                )
+                fresh.upsert(vectors.tolist(), [store.metadata[int(position)] for position in ids])
+                if isinstance(fresh.metadata, _LazyMetadata):
+                    fresh.metadata.close()
+            self._evict(key)
+
+            directory = self._partition_dir(key)
+            retired = self._retired_dir(key)
+            directory.rename(retired)
+            if staging.exists():
+                staging.rename(directory)
+            else:
+                # Nothing survived: keep an empty partition so writers queued on the lock can re-lock it.
+                directory.mkdir()
+            shutil.rmtree(retired)
+        logger.info("Compacted FAISS partition %s: kept %s rows, dropped %s.", key, len(ids), removed)
+        return {"live": len(ids), "removed": removed}
+
+    def upsert_embeddings(self, *, embeddings: List[List[float]], metadata: List[Dict[str, Any]]) -> None:
+        grouped: Dict[str, Tuple[List[List[float]], List[Dict[str, Any]]]] = {}
+        for vector, item in zip(embeddings, metadata, strict=False):
+            if item.get("base_id") is None:
+                raise VectorStoreError("FAISS partitioned store requires base_id on every chunk.")
+            vectors, rows = grouped.setdefault(str(item["base_id"]), ([], []))
+            vectors.append(vector)
+            rows.append(item)
+        for key, (vectors, rows) in grouped.items():
+            self.partition(key, create=True).upsert(vectors, rows)
+
+    def migrate_legacy(self, index_path: Path, meta_path: Path) -> int:
+        """Split a pre-partitioning global index into per-base sub-indexes.
+
+        Runs under a root-level lock so concurrent processes migrate once. A marker written
+        after the copy lets a retry finish the cleanup without copying the rows again.
+        """
+        if not index_path.exists():
+            return 0
+        marker = self.root / ".legacy-migrated"
+        with _locked(self.root / ".legacy-migrate.lock"):
+            # Another process may have migrated while we waited for the lock.
+            if not index_path.exists():
+                return 0
+            legacy = FaissStore(index_path=index_path, meta_path=meta_path)
+            migrated = 0
+            if not marker.exists():
+                ids, vectors = legacy.live_vectors()
+                rows = [
+                    (vector, legacy.metadata[int(position)])
+                    for position, vector in zip(ids, vectors, strict=False)
+                    if legacy.metadata[int(position)].get("base_id") is not None
+                ]
+                if rows:
+                    self.upsert_embeddings(
+                        embeddings=[vector for vector, _meta in rows],
+                        metadata=[meta for _vector, meta in rows],
+                    )
+                migrated = len(rows)
+                _atomic_write(marker, lambda temp_name: Path(temp_name).write_text(str(migrated), encoding="utf-8"))
+            if isinstance(legacy.metadata, _LazyMetadata):
+                legacy.metadata.close()
+            for path in (index_path, meta_path):
+                if path.exists():
+                    path.rename(path.with_name(f"{path.name}.migrated"))
+            for path in (
+                legacy.offsets_path,
+                legacy.vector_path,
+                legacy.deleted_path,
+                legacy.state_path,
+                legacy.lock_path,
+                legacy.lexical_path,
+            ):
+                if path.exists():
+                    path.unlink()
+            marker.unlink()
+        logger.info("Migrated %s legacy FAISS vectors from %s into per-base partitions.", migrated, index_path)
+        return migrated
 
 
 _STORE_CACHE: Dict[str, Any] = {}
 
 
-def _faiss_store() -> FaissStore:
+def _faiss_store() -> PartitionedFaissStore:
     agent_settings = settings.AGENT_SETTINGS
-    index_path = Path(agent_settings["vstore_path"])
-    meta_path = Path(agent_settings["vstore_meta"])
-    cache_key = f"faiss::{index_path}"
+    root = Path(agent_settings["vstore_dir"])
+    cache_key = f"faiss::{root}"
     if cache_key not in _STORE_CACHE:
-        _STORE_CACHE[cache_key] = FaissStore(index_path=index_path, meta_path=meta_path)
+        store = PartitionedFaissStore(root=root, options=_faiss_options(agent_settings))
+        store.migrate_legacy(Path(agent_settings["vstore_path"]), Path(agent_settings["vstore_meta"]))
+        _STORE_CACHE[cache_key] = store
     return _STORE_CACHE[cache_key]
 
 
@@ -299,7 +1643,7 @@ def get_store(backend: str) -> Any:
     if backend == "faiss":
         return _faiss_store()
     if backend == "pgvector":
-        return PgVectorStore()
+        return PgVectorStore(options=_pgvector_options(settings.AGENT_SETTINGS))
     raise VectorStoreError(f"Unsupported vector backend: {backend}")
 
 
@@ -308,19 +1652,42 @@ def upsert_embeddings(*, embeddings: List[List[float]], metadata: List[Dict[str,
     store.upsert_embeddings(embeddings=embeddings, metadata=metadata)
 
 
+def remove_documents(*, base_id: Any, doc_ids: List[str]) -> int:
+    """Remove the vectors of deleted documents; returns the number of rows removed."""
+    store = get_store(settings.AGENT_SETTINGS["vector_backend"])
+    return store.delete_documents(base_id=base_id, doc_ids=doc_ids)
+
+
+def drop_base(*, base_id: Any) -> None:
+    """Remove every vector that belongs to a deleted knowledge base."""
+    store = get_store(settings.AGENT_SETTINGS["vector_backend"])
+    store.drop_partition(base_id=base_id)
+
+
+def compact_base(*, base_id: Any, force: bool = False) -> Dict[str, int] | None:
+    """Rebuild a base's index without tombstoned rows once enough of it is dead (or when forced)."""
+    store = get_store(settings.AGENT_SETTINGS["vector_backend"])
+    if not isinstance(store, PartitionedFaissStore):
+        return None
+    if not force and not store.needs_compaction(base_id=base_id):
+        return None
+    return store.compact_partition(base_id=base_id)
+
+
 def clear_store_cache() -> None:
     """Clear cached vector-store instances (used by management commands/tests)."""
     _STORE_CACHE.clear()
 
 
 def clear_store_files() -> None:
-    """Delete on-disk FAISS index and metadata for a clean rebuild."""
+    """Delete on-disk FAISS partitions (and any legacy global index) for a clean rebuild."""
+    agent_settings = settings.AGENT_SETTINGS
     try:
-        store = _STORE_CACHE.get(f"faiss::{Path(settings.AGENT_SETTINGS['vstore_path'])}")
-        if store:
-            if Path(store.index_path).exists():
-                Path(store.index_path).unlink()
-            if Path(store.meta_path).exists():
-                Path(store.meta_path).unlink()
+        root = Path(agent_settings["vstore_dir"])
+        if root.exists():
+            shutil.rmtree(root)
+        for path in (Path(agent_settings["vstore_path"]), Path(agent_settings["vstore_meta"])):
+            if path.exists():
+                path.unlink()
     finally:
         clear_store_cache()
@@ -0,0 +1,74 @@
+"""Tokenization shared by ingest, lexical search and reranking."""
+
+from __future__ import annotations
+
+import re
+import zlib
+from bisect import bisect_left
+from typing import Any, Dict, List, Sequence
+
+_WORD_RE = re.compile(r"[a-z0-9_]+")
+_CJK_CHAR_RE = re.compile(r"[\u4e00-\u9fff]")
+_CJK_RUN_RE = re.compile(r"[\u4e00-\u9fff]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased latin words plus single CJK characters."""
+    raw = (text or "").lower()
+    return _WORD_RE.findall(raw) + _CJK_CHAR_RE.findall(raw)
+
+
+def search_terms(text: str) -> List[str]:
+    """Full-text terms: latin words, CJK unigrams and CJK bigrams (PostgreSQL has no CJK parser)."""
+    raw = (text or "").lower()
+    terms = _WORD_RE.findall(raw)
+    for run in _CJK_RUN_RE.findall(raw):
+        terms.extend(run)
+        terms.extend(run[index : index + 2] for index in range(len(run) - 1))
+    return terms
+
+
+def search_document(text: str) -> str:
+    """Space-separated terms fed to ``to_tsvector('simple', ...)`` at ingest."""
+    return " ".join(search_terms(text))
+
+
+def search_query(text: str) -> str:
+    """OR-ed ``to_tsquery`` expression over the distinct query terms ("" when there are none)."""
+    return " | ".join(dict.fromkeys(search_terms(text)))
+
+
+def term_id(token: str) -> int:
+    # crc32 is stable across processes (unlike hash()) and cheap enough to run per token.
+    return zlib.crc32(token.encode("utf-8"))
+
+
+def term_ids(text: str) -> List[int]:
+    """Sorted distinct hashed ``tokenize`` terms; stored with each chunk at ingest."""
+    return sorted({term_id(token) for token in tokenize(text)})
+
+
+def query_term_ids(query: str) -> List[int]:
+    """Hashed query tokens, duplicates kept so overlap ratios match the token-level definition."""
+    return [term_id(token) for token in tokenize(query)]
+
+
+def chunk_term_ids(payload: Dict[str, Any]) -> List[int]:
+    """Precomputed term ids of a store payload, falling back to tokenizing chunks ingested before them."""
+    ids = (payload.get("metadata") or {}).get("term_ids")
+    if ids is None:
+        return term_ids(str(payload.get("text", "")))
+    return ids
+
+
+def overlap_ratio(query_ids: Sequence[int], text_ids: Sequence[int]) -> float:
+    """Share of query tokens present in the chunk; ``text_ids`` must be sorted."""
+    if not query_ids or not text_ids:
+        return 0.0
+    size = len(text_ids)
+    matched = 0
+    for value in query_ids:
+        position = bisect_left(text_ids, value)
+        if position < size and text_ids[position] == value:
+            matched += 1
+    return matched / len(query_ids)
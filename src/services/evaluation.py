@@ -122,19 +122,25 @@ class ReviewCaseResult:
 def evaluate_retrieval_cases(
     *,
     cases: Iterable[Dict[str, Any]],
-    retrieve_fn: Callable[[str, int], List[Dict[str, Any]]],
+    retrieve_fn: Callable[[str, int], List[Dict[str, Any]]] | None = None,
     top_k: int = 5,
+    retrieve_many_fn: Callable[[List[str], int], List[List[Dict[str, Any]]]] | None = None,
 ) -> Dict[str, Any]:
     case_results: List[RetrievalCaseResult] = []
 
+    valid_cases = []
     for raw_case in cases:
         query = str(raw_case.get("query", "")).strip()
         expected_refs = raw_case.get("expected_refs") or []
-        if not query or not expected_refs:
-            continue
-
+        if query and expected_refs:
+            valid_cases.append((query, expected_refs))
+    if retrieve_many_fn is not None:
+        batched = retrieve_many_fn([query for query, _expected in valid_cases], top_k)
+    else:
+        batched = [retrieve_fn(query, top_k) for query, _expected in valid_cases]
+
+    for (query, expected_refs), retrieved in zip(valid_cases, batched, strict=False):
         expected_set = {_normalize_ref(ref) for ref in expected_refs}
-        retrieved = retrieve_fn(query, top_k)
         retrieved_pairs = _extract_refs(retrieved)
         matched = [pair for pair in retrieved_pairs if pair in expected_set]
 
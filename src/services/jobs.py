@@ -6,7 +6,7 @@ from django.utils import timezone
 
 from src.core.models import PrestudyJob
 
-from .tasks import run_prestudy_job_task
+from .tasks import compact_vector_store_task, run_prestudy_job_task
 
 logger = logging.getLogger(__name__)
 
@@ -33,3 +33,11 @@ def enqueue_prestudy_job(
     )
     job.task_id = async_result.id or ""
     job.save(update_fields=["task_id"])
+
+
+def enqueue_vector_compaction(*, base_id: int) -> None:
+    """Schedule a background compaction; deletes stay correct without it, so broker errors are only logged."""
+    try:
+        compact_vector_store_task.delay(base_id=base_id)
+    except Exception as exc:  # noqa: BLE001
+        logger.warning("Could not schedule vector compaction for base %s: %s", base_id, exc)
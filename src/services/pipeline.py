@@ -29,11 +29,15 @@ def _collect_rag_context(
     if not job.knowledge_base_id or not job.user_id:
         return {"results": [], "diagnostics": {"enabled": False}}
 
-    payload = retrieve.retrieve_context_with_diagnostics(
-        query=text,
-        top_k=top_k,
-        base=job.knowledge_base,
-    )
+    if settings.AGENT_SETTINGS.get("rag_segmented_retrieval", True):
+        # Long decks are split into bounded segments retrieved in one batch and fused.
+        payload = retrieve.retrieve_segmented_with_diagnostics(text=text, top_k=top_k, base=job.knowledge_base)
+    else:
+        payload = retrieve.retrieve_context_with_diagnostics(
+            query=text,
+            top_k=top_k,
+            base=job.knowledge_base,
+        )
     payload["diagnostics"]["enabled"] = True
     return payload
 
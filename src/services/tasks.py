@@ -10,6 +10,7 @@ from django.utils import timezone
 
 from src.agents.utils import AgentInvocationError
 from src.core.models import PrestudyJob
+from src.kb import store as kb_store
 
 from . import pipeline
 
@@ -50,3 +51,11 @@ def run_prestudy_job_task(self, *, job_id: int, text: str | None = None, ppt_pay
         raise
     finally:
         close_old_connections()
+
+
+@shared_task(ignore_result=True)
+def compact_vector_store_task(*, base_id: int) -> None:
+    """Rebuild a base's FAISS partition once enough of its rows are tombstoned."""
+    result = kb_store.compact_base(base_id=base_id)
+    if result is not None:
+        logger.info("Compacted vector store for base %s: %s", base_id, result)
@@ -3,6 +3,7 @@ import sys
 from pathlib import Path
 
 import django
+import pytest
 
 ROOT_PATH = Path(__file__).resolve().parent.parent
 if str(ROOT_PATH) not in sys.path:
@@ -15,3 +16,15 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 # Force a lightweight DB for tests regardless of any local .env overrides.
 os.environ["DATABASE_URL"] = "sqlite:///:memory:"
 django.setup()
+
+from src.kb.cache import clear_embedding_cache, clear_result_cache  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def _isolate_retrieval_caches():
+    # Bases reuse primary keys across tests, so cached retrievals must not leak between them.
+    clear_embedding_cache()
+    clear_result_cache()
+    yield
+    clear_embedding_cache()
+    clear_result_cache()
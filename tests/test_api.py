@@ -1,6 +1,10 @@
 import pytest
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework.test import APIClient
 
-from src.api.serializers import QuizSubmitRequestSerializer
+from src.api.serializers import KnowledgeBaseSerializer, QuizSubmitRequestSerializer
+from src.core.models import KnowledgeBase
 
 
 def test_quiz_submit_serializer_rejects_duplicate_answers():
@@ -24,3 +28,29 @@ def test_quiz_answer_serializer_normalizes_case(answer):
     assert serializer.is_valid(), serializer.errors
     validated = serializer.validated_data
     assert validated["answers"][0]["answer"] in {"A", "B", "C", "D"}
+
+
+def test_knowledge_base_serializer_validates_retrieval_settings():
+    valid = KnowledgeBaseSerializer(data={"retrieval_settings": {"legs": {"title": {"enabled": True, "weight": 0.5}}}}, partial=True)
+    assert valid.is_valid(), valid.errors
+
+    invalid = KnowledgeBaseSerializer(data={"retrieval_settings": {"legs": {"bogus": {}}}}, partial=True)
+    assert not invalid.is_valid()
+    assert "bogus" in str(invalid.errors["retrieval_settings"])
+
+
+@pytest.mark.django_db
+def test_renaming_a_base_to_an_existing_name_is_rejected():
+    user = get_user_model().objects.create_user(username="lena", password="pw123456")
+    KnowledgeBase.objects.create(user=user, name="biology")
+    base = KnowledgeBase.objects.create(user=user, name="chemistry")
+    client = APIClient()
+    client.force_authenticate(user=user)
+    url = reverse("kb-bases-detail", args=[base.pk])
+
+    response = client.patch(url, {"name": " biology "}, format="json")
+    assert response.status_code == 400
+    base.refresh_from_db()
+    assert base.name == "chemistry"
+
+    assert client.patch(url, {"name": "chemistry", "description": "acids"}, format="json").status_code == 200
@@ -25,3 +25,14 @@ def test_evaluate_retrieval_cases_computes_metrics():
     assert report["summary"]["mrr"] == 0.5
     assert report["cases"][0]["hit"] is True
     assert report["cases"][1]["hit"] is False
+
+    batches = []
+
+    def fake_retrieve_many(queries, top_k):
+        batches.append(queries)
+        return [fake_retrieve(query, top_k) for query in queries]
+
+    batched = evaluate_retrieval_cases(cases=cases, retrieve_many_fn=fake_retrieve_many, top_k=5)
+
+    assert batches == [["q1", "q2"]]
+    assert batched["summary"] == report["summary"]
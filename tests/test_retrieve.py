@@ -1,16 +1,23 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
 from types import SimpleNamespace
 
 import pytest
 from django.contrib.auth import get_user_model
 
-from src.core.models import KnowledgeBase, KnowledgeDocument
+from src.core.models import KnowledgeBase, KnowledgeChunk, KnowledgeDocument
+from src.kb import ingest
 from src.kb import retrieve
+from src.kb import retrievers
+from src.kb.cache import EmbeddingCache, TieredCache
+from src.kb.rerank import merge_adjacent
+from src.kb.tokens import term_ids
 
 
 @pytest.mark.django_db
 def test_retrieve_context_delegates_filtering_to_store(monkeypatch):
     user = get_user_model().objects.create_user(username="bob", password="pw123456")
-    base = KnowledgeBase.objects.create(user=user, name="kb")
+    base = KnowledgeBase.objects.create(user=user, name="kb", chunk_count=1)
     KnowledgeDocument.objects.create(user=user, base=base, doc_id="doc-1", title="Doc 1")
 
     fake_client = SimpleNamespace(embed=lambda **kwargs: [[0.1, 0.2, 0.3]])
@@ -60,15 +67,15 @@ def test_retrieve_context_delegates_filtering_to_store(monkeypatch):
 
     assert result[0]["refs"][0]["doc_id"] == "doc-1"
     assert payload["diagnostics"]["vector_hits"] == 1
-    assert captured["count"]["base_id"] == base.pk
+    assert "count" not in captured
     assert captured["search"]["base_id"] == base.pk
-    assert captured["search"]["doc_ids"] == ["doc-1"]
+    assert captured["search"]["doc_ids"] is None
 
 
 @pytest.mark.django_db
 def test_retrieve_context_fuses_hybrid_results(monkeypatch):
     user = get_user_model().objects.create_user(username="carl", password="pw123456")
-    base = KnowledgeBase.objects.create(user=user, name="kb")
+    base = KnowledgeBase.objects.create(user=user, name="kb", chunk_count=3)
     KnowledgeDocument.objects.create(user=user, base=base, doc_id="doc-1", title="Doc 1")
 
     fake_client = SimpleNamespace(embed=lambda **kwargs: [[0.1, 0.2, 0.3]])
@@ -102,10 +109,56 @@ def test_retrieve_context_fuses_hybrid_results(monkeypatch):
     assert payload["diagnostics"]["lexical_hits"] == 1
 
 
+@pytest.mark.django_db
+def test_retrieve_context_uses_single_statement_hybrid_when_supported(monkeypatch):
+    user = get_user_model().objects.create_user(username="cleo", password="pw123456")
+    base = KnowledgeBase.objects.create(user=user, name="kb", chunk_count=2)
+    KnowledgeDocument.objects.create(user=user, base=base, doc_id="doc-1", title="Doc 1")
+
+    fake_client = SimpleNamespace(embed=lambda **kwargs: [[0.1, 0.2, 0.3]])
+    captured = {}
+    both = {"text": "both hit", "doc_id": "doc-1", "chunk_id": "doc-1-1", "title": "Doc 1", "metadata": {}}
+    lexical = {"text": "lexical hit", "doc_id": "doc-1", "chunk_id": "doc-1-2", "title": "Doc 1", "metadata": {}}
+
+    class FakeStore:
+        supports_hybrid_sql = True
+
+        def count(self, *, base_id=None, doc_ids=None):
+            raise AssertionError("retrieval should read the maintained chunk counter")
+
+        def search(self, embedding, top_k, *, base_id=None, doc_ids=None):
+            raise AssertionError("vector leg should run inside the hybrid statement")
+
+        def hybrid_search(self, embedding, query, candidate_k, *, base_id=None, doc_ids=None, rrf_k=60):
+            captured.update(query=query, candidate_k=candidate_k, base_id=base_id, doc_ids=doc_ids, rrf_k=rrf_k)
+            return {
+                "results": [
+                    (2 / 61, {**both, "retrieval_sources": ["vector", "lexical"], "source_ranks": {"vector": 1, "lexical": 1}}),
+                    (1 / 62, {**lexical, "retrieval_sources": ["lexical"], "source_ranks": {"lexical": 2}}),
+                ],
+                "vector_results": [(0.9, both)],
+                "lexical_results": [(0.5, both), (0.4, lexical)],
+            }
+
+    monkeypatch.setattr(retrieve, "build_client", lambda settings: fake_client)
+    monkeypatch.setattr(retrieve, "get_store", lambda backend: FakeStore())
+    monkeypatch.setitem(retrieve.settings.AGENT_SETTINGS, "hybrid_retrieval", True)
+    monkeypatch.setitem(retrieve.settings.AGENT_SETTINGS, "rerank_enabled", False)
+
+    payload = retrieve.retrieve_context_with_diagnostics(query="question", top_k=5, base=base)
+
+    assert captured == {"query": "question", "candidate_k": 2, "base_id": base.pk, "doc_ids": None, "rrf_k": 60}
+    assert payload["results"][0]["metadata"]["source_ranks"] == {"vector": 1, "lexical": 1}
+    assert payload["diagnostics"]["total_entries"] == 2
+    assert payload["diagnostics"]["vector_hits"] == 1
+    assert payload["diagnostics"]["lexical_hits"] == 2
+    assert payload["diagnostics"]["source_counts"] == {"vector": 1, "lexical": 2}
+
+
 @pytest.mark.django_db
 def test_retrieve_context_applies_rerank(monkeypatch):
     user = get_user_model().objects.create_user(username="dora", password="pw123456")
-    base = KnowledgeBase.objects.create(user=user, name="kb")
+    base = KnowledgeBase.objects.create(user=user, name="kb", chunk_count=2)
     KnowledgeDocument.objects.create(user=user, base=base, doc_id="doc-1", title="Doc 1")
 
     fake_client = SimpleNamespace(embed=lambda **kwargs: [[0.1, 0.2, 0.3]])
@@ -132,3 +185,442 @@ def test_retrieve_context_applies_rerank(monkeypatch):
 
     assert payload["results"][0]["refs"][0]["chunk_id"] == "doc-1-2"
     assert payload["diagnostics"]["rerank_enabled"] is True
+
+
+def test_candidate_budget_grows_slowly_with_base_size_and_is_capped():
+    agent_settings = {"retrieval_candidate_multiplier": 3, "retrieval_max_candidates": 40}
+
+    assert retrieve._candidate_budget(5, 4, agent_settings) == 4
+    assert retrieve._candidate_budget(5, 100, agent_settings) == 25
+    assert retrieve._candidate_budget(5, 10_000, agent_settings) == 35
+    assert retrieve._candidate_budget(5, 10_000_000, agent_settings) == 40
+
+
+@pytest.mark.django_db
+def test_retrieve_context_reuses_cached_query_embeddings(monkeypatch):
+    user = get_user_model().objects.create_user(username="emma", password="pw123456")
+    base = KnowledgeBase.objects.create(user=user, name="kb", chunk_count=1)
+    KnowledgeDocument.objects.create(user=user, base=base, doc_id="doc-1", title="Doc 1")
+    calls = []
+
+    def embed(**kwargs):
+        calls.append(kwargs["texts"])
+        return [[0.1, 0.2, 0.3]]
+
+    class FakeStore:
+        def search(self, embedding, top_k, *, base_id=None, doc_ids=None):
+            return [(0.9, {"text": "chunk", "doc_id": "doc-1", "chunk_id": "doc-1-0", "title": "Doc 1", "metadata": {}})]
+
+    monkeypatch.setattr(retrieve, "build_client", lambda settings: SimpleNamespace(embed=embed))
+    monkeypatch.setattr(retrieve, "get_store", lambda backend: FakeStore())
+    monkeypatch.setitem(retrieve.settings.AGENT_SETTINGS, "hybrid_retrieval", False)
+    monkeypatch.setitem(retrieve.settings.AGENT_SETTINGS, "rerank_enabled", False)
+    monkeypatch.setitem(retrieve.settings.AGENT_SETTINGS, "result_cache_enabled", False)
+
+    first = retrieve.retrieve_context_with_diagnostics(query="光合作用  是什么", top_k=1, base=base)
+    second = retrieve.retrieve_context_with_diagnostics(query=" 光合作用 是什么", top_k=1, base=base)
+
+    assert calls == [["光合作用  是什么"]]
+    assert first["diagnostics"]["embedding_cache"]["tier"] == "miss"
+    assert second["diagnostics"]["embedding_cache"]["tier"] == "local"
+    assert second["diagnostics"]["embedding_cache"]["local_hits"] == 1
+    assert second["diagnostics"]["embedding_cache"]["misses"] == 1
+
+
+def test_embedding_cache_falls_back_to_shared_tier_and_evicts_lru():
+    class SharedTier(dict):
+        def set(self, key, value, ex=None):
+            self[key] = value
+
+    cache = EmbeddingCache(max_entries=1, ttl_seconds=60)
+    cache.redis = SharedTier()
+    cache.set("m", "a", [1.0, 2.0])
+    cache.set("m", "b", [3.0, 4.0])
+
+    assert len(cache.local) == 1
+    assert cache.get("m", "a") == ([1.0, 2.0], "redis")
+    assert cache.get("m", "a") == ([1.0, 2.0], "local")
+    assert cache.get("other-model", "a") == (None, "miss")
+    assert cache.stats() == {"local_hits": 1, "redis_hits": 1, "misses": 1, "local_entries": 1}
+
+
+def test_tiered_cache_counts_concurrent_lookups_and_requires_codecs():
+    cache = EmbeddingCache(max_entries=4, ttl_seconds=60)
+    cache.set("m", "a", [1.0])
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda _index: cache.get("m", "a"), range(400)))
+
+    assert cache.stats()["local_hits"] == 400
+    with pytest.raises(TypeError):
+        TieredCache(max_entries=1, ttl_seconds=60)
+
+
+@pytest.mark.django_db
+def test_retrieve_context_serves_repeat_queries_from_result_cache_until_corpus_changes(monkeypatch):
+    user = get_user_model().objects.create_user(username="finn", password="pw123456")
+    base = KnowledgeBase.objects.create(user=user, name="kb", chunk_count=2)
+    KnowledgeDocument.objects.create(user=user, base=base, doc_id="doc-1", title="Doc 1", chunk_count=1)
+    KnowledgeDocument.objects.create(user=user, base=base, doc_id="doc-2", title="Doc 2", chunk_count=1)
+    searches = []
+
+    class FakeStore:
+        def search(self, embedding, top_k, *, base_id=None, doc_ids=None):
+            searches.append(top_k)
+            return [(0.9, {"text": "chunk", "doc_id": "doc-1", "chunk_id": "doc-1-0", "title": "Doc 1", "metadata": {}})]
+
+    monkeypatch.setattr(retrieve, "build_client", lambda settings: SimpleNamespace(embed=lambda **kwargs: [[0.1, 0.2]]))
+    monkeypatch.setattr(retrieve, "get_store", lambda backend: FakeStore())
+    monkeypatch.setitem(retrieve.settings.AGENT_SETTINGS, "hybrid_retrieval", False)
+    monkeypatch.setitem(retrieve.settings.AGENT_SETTINGS, "rerank_enabled", False)
+
+    first = retrieve.retrieve_context_with_diagnostics(query="question", top_k=1, base=base)
+    second = retrieve.retrieve_context_with_diagnostics(query="question", top_k=1, base=base)
+    assert len(searches) == 1
+    assert first["diagnostics"]["result_cache"] == "miss"
+    assert second["diagnostics"]["result_cache"] == "local"
+    assert second["results"] == first["results"]
+
+    retrieve.retrieve_context_with_diagnostics(query="question", top_k=2, base=base)
+    assert len(searches) == 2
+
+    monkeypatch.setitem(retrieve.settings.AGENT_SETTINGS, "faiss_index_type", "hnsw")
+    assert retrieve.retrieve_context_with_diagnostics(query="question", top_k=2, base=base)["diagnostics"]["result_cache"] == "miss"
+    monkeypatch.setitem(retrieve.settings.AGENT_SETTINGS, "faiss_index_type", "flat")
+
+    ingest.delete_documents(documents=KnowledgeDocument.objects.filter(doc_id="doc-2"))
+    third = retrieve.retrieve_context_with_diagnostics(query="question", top_k=1, base=base)
+    assert len(searches) == 4
+    assert third["diagnostics"]["result_cache"] == "miss"
+
+
+@pytest.mark.django_db
+def test_retrieve_context_degrades_to_vector_results_when_lexical_leg_times_out(monkeypatch):
+    user = get_user_model().objects.create_user(username="gwen", password="pw123456")
+    base = KnowledgeBase.objects.create(user=user, name="kb", chunk_count=2)
+    KnowledgeDocument.objects.create(user=user, base=base, doc_id="doc-1", title="Doc 1")
+
+    class FakeStore:
+        def search(self, embedding, top_k, *, base_id=None, doc_ids=None):
+            return [(0.9, {"text": "vector hit", "doc_id": "doc-1", "chunk_id": "doc-1-0", "title": "Doc 1", "metadata": {}})]
+
+        def lexical_search(self, query, top_k, *, base_id=None, doc_ids=None):
+            time.sleep(0.5)
+            return [(1.0, {"text": "late hit", "doc_id": "doc-1", "chunk_id": "doc-1-1", "title": "Doc 1", "metadata": {}})]
+
+    monkeypatch.setattr(retrieve, "build_client", lambda settings: SimpleNamespace(embed=lambda **kwargs: [[0.1, 0.2]]))
+    monkeypatch.setattr(retrieve, "get_store", lambda backend: FakeStore())
+    monkeypatch.setitem(retrieve.settings.AGENT_SETTINGS, "hybrid_retrieval", True)
+    monkeypatch.setitem(retrieve.settings.AGENT_SETTINGS, "rerank_enabled", False)
+    monkeypatch.setitem(retrieve.settings.AGENT_SETTINGS, "retrieval_lexical_timeout_ms", 50)
+
+    started = time.monotonic()
+    payload = retrieve.retrieve_context_with_diagnostics(query="question", top_k=2, base=base)
+
+    assert time.monotonic() - started < 0.4
+    assert [item["refs"][0]["chunk_id"] for item in payload["results"]] == ["doc-1-0"]
+    assert payload["diagnostics"]["degraded_legs"] == ["lexical"]
+    assert payload["diagnostics"]["lexical_hits"] == 0
+
+
+@pytest.mark.django_db
+def test_retrieve_many_embeds_all_queries_in_one_call_and_batches_search(monkeypatch):
+    user = get_user_model().objects.create_user(username="hana", password="pw123456")
+    base = KnowledgeBase.objects.create(user=user, name="kb", chunk_count=3)
+    embed_calls = []
+    search_calls = []
+
+    def embed(**kwargs):
+        embed_calls.append(kwargs["texts"])
+        return [[float(index), 1.0] for index, _text in enumerate(kwargs["texts"])]
+
+    class FakeStore:
+        def search_many(self, embeddings, top_k, *, base_id=None, doc_ids=None):
+            search_calls.append(embeddings)
+            return [
+                [(0.9, {"text": "t", "doc_id": "doc-1", "chunk_id": f"doc-1-{int(vector[0])}", "title": "Doc 1", "metadata": {}})]
+                for vector in embeddings
+            ]
+
+    monkeypatch.setattr(retrieve, "build_client", lambda settings: SimpleNamespace(embed=embed))
+    monkeypatch.setattr(retrieve, "get_store", lambda backend: FakeStore())
+    monkeypatch.setitem(retrieve.settings.AGENT_SETTINGS, "hybrid_retrieval", False)
+    monkeypatch.setitem(retrieve.settings.AGENT_SETTINGS, "rerank_enabled", False)
+
+    results = retrieve.retrieve_many(queries=["alpha", " ", "beta"], top_k=1, base=base)
+
+    assert embed_calls == [["alpha", "beta"]]
+    assert len(search_calls) == 1
+    assert [[item["refs"][0]["chunk_id"] for item in hits] for hits in results] == [["doc-1-0"], [], ["doc-1-1"]]
+
+    again = retrieve.retrieve_many_with_diagnostics(queries=["beta"], top_k=1, base=base)
+    assert again[0]["diagnostics"]["result_cache"] == "local"
+    assert len(embed_calls) == 1
+
+
+def test_split_query_segments_packs_sentences_and_bounds_count():
+    text = "光合作用需要光。叶绿体吸收光能。\n二氧化碳被固定。" + "长" * 25
+
+    assert retrieve.split_query_segments("short question", max_chars=20) == ["short question"]
+    segments = retrieve.split_query_segments(text, max_chars=17, max_segments=8)
+    assert segments == ["光合作用需要光。 叶绿体吸收光能。", "二氧化碳被固定。", "长" * 17, "长" * 8]
+    assert len(retrieve.split_query_segments("句子。" * 100, max_chars=6, max_segments=4)) == 4
+
+
+@pytest.mark.django_db
+def test_segmented_retrieval_fuses_segments_from_one_batch(monkeypatch):
+    user = get_user_model().objects.create_user(username="ivan", password="pw123456")
+    base = KnowledgeBase.objects.create(user=user, name="kb", chunk_count=3, retrieval_settings={"rrf_k": 10})
+    embed_calls = []
+
+    def embed(**kwargs):
+        embed_calls.append(kwargs["texts"])
+        return [[float(index), 1.0] for index, _text in enumerate(kwargs["texts"])]
+
+    def hit(chunk):
+        return {"text": chunk, "doc_id": "doc-1", "chunk_id": chunk, "title": "Doc 1", "metadata": {}}
+
+    class FakeStore:
+        def search_many(self, embeddings, top_k, *, base_id=None, doc_ids=None):
+            # Every segment finds the shared chunk second; each also finds one chunk of its own first.
+            return [[(0.9, hit(f"own-{int(vector[0])}")), (0.8, hit("shared"))] for vector in embeddings]
+
+    monkeypatch.setattr(retrieve, "build_client", lambda settings: SimpleNamespace(embed=embed))
+    monkeypatch.setattr(retrieve, "get_store", lambda backend: FakeStore())
+    monkeypatch.setitem(retrieve.settings.AGENT_SETTINGS, "hybrid_retrieval", False)
+    monkeypatch.setitem(retrieve.settings.AGENT_SETTINGS, "rerank_enabled", False)
+    monkeypatch.setitem(retrieve.settings.AGENT_SETTINGS, "rag_segment_chars", 10)
+
+    payload = retrieve.retrieve_segmented_with_diagnostics(text="第一段讲光合作用。第二段讲呼吸作用。第三段讲蒸腾作用。", top_k=2, base=base)
+
+    assert len(embed_calls) == 1 and len(embed_calls[0]) == 3
+    assert payload["results"][0]["refs"][0]["chunk_id"] == "shared"
+    assert payload["results"][0]["metadata"]["segment_hits"] == 3
+    assert payload["results"][0]["score"] == pytest.approx(3 / (10 + 2))
+    assert payload["diagnostics"]["segments"] == 3
+    assert payload["diagnostics"]["final_hits"] == 2
+
+
+@pytest.mark.django_db
+def test_segmented_retrieval_merges_adjacent_chunks_once_across_segments(monkeypatch):
+    user = get_user_model().objects.create_user(username="kate", password="pw123456")
+    base = KnowledgeBase.objects.create(user=user, name="kb", chunk_count=3)
+    texts = {3: "aaaa bbbb", 4: "bbbb cccc", 8: "dddd"}
+
+    def hit(index):
+        return {"text": texts[index], "doc_id": "d", "chunk_id": f"d-{index}", "title": "D", "metadata": {"position": index}}
+
+    class FakeStore:
+        def search_many(self, embeddings, top_k, *, base_id=None, doc_ids=None):
+            # Segment A finds d-3 and d-4; segment B finds d-4 on its own next to d-8.
+            pairs = [(3, 4), (4, 8)]
+            return [[(0.9, hit(pairs[int(vector[0])][0])), (0.8, hit(pairs[int(vector[0])][1]))] for vector in embeddings]
+
+    embed = lambda **kwargs: [[float(index), 1.0] for index, _text in enumerate(kwargs["texts"])]
+    monkeypatch.setattr(retrieve, "build_client", lambda settings: SimpleNamespace(embed=embed))
+    monkeypatch.setattr(retrieve, "get_store", lambda backend: FakeStore())
+    monkeypatch.setitem(retrieve.settings.AGENT_SETTINGS, "hybrid_retrieval", False)
+    monkeypatch.setitem(retrieve.settings.AGENT_SETTINGS, "rerank_enabled", False)
+    monkeypatch.setitem(retrieve.settings.AGENT_SETTINGS, "retrieval_mmr_enabled", False)
+    monkeypatch.setitem(retrieve.settings.AGENT_SETTINGS, "rag_segment_chars", 10)
+
+    payload = retrieve.retrieve_segmented_with_diagnostics(text="第一段讲光合作用。第二段讲呼吸作用。", top_k=3, base=base)
+
+    assert [[ref["chunk_id"] for ref in item["refs"]] for item in payload["results"]] == [["d-3", "d-4"], ["d-8"]]
+    assert payload["results"][0]["text"] == "aaaa bbbb cccc"
+    assert payload["diagnostics"]["merged_chunks"] == 1
+
+
+def test_mmr_select_skips_near_duplicates_of_picked_chunks():
+    def hit(chunk, terms):
+        return {"chunk_id": chunk, "metadata": {"term_ids": terms}}
+
+    results = [
+        (0.90, hit("a", [1, 2, 3, 4])),
+        (0.89, hit("a-copy", [1, 2, 3, 4])),
+        (0.80, hit("b", [7, 8, 9])),
+    ]
+
+    assert [meta["chunk_id"] for _score, meta in retrieve.mmr_select(results, 2, diversity=0.3)] == ["a", "b"]
+    assert [meta["chunk_id"] for _score, meta in retrieve.mmr_select(results, 2, diversity=0.0)] == ["a", "a-copy"]
+
+
+@pytest.mark.django_db
+def test_retrieve_context_merges_adjacent_chunks_into_one_block(monkeypatch):
+    user = get_user_model().objects.create_user(username="judy", password="pw123456")
+    base = KnowledgeBase.objects.create(user=user, name="kb", chunk_count=3)
+
+    def hit(index, text):
+        return {
+            "text": text,
+            "doc_id": "doc-1",
+            "chunk_id": f"doc-1-{index}",
+            "title": "Doc 1",
+            "metadata": {"position": index},
+        }
+
+    class FakeStore:
+        def search(self, embedding, top_k, *, base_id=None, doc_ids=None):
+            return [(0.9, hit(1, "绿体吸收光能")), (0.8, hit(0, "光合作用在叶绿体")), (0.7, hit(5, "呼吸作用"))]
+
+    monkeypatch.setattr(retrieve, "build_client", lambda settings: SimpleNamespace(embed=lambda **kwargs: [[0.1, 0.2]]))
+    monkeypatch.setattr(retrieve, "get_store", lambda backend: FakeStore())
+    monkeypatch.setitem(retrieve.settings.AGENT_SETTINGS, "hybrid_retrieval", False)
+    monkeypatch.setitem(retrieve.settings.AGENT_SETTINGS, "rerank_enabled", False)
+    monkeypatch.setitem(retrieve.settings.AGENT_SETTINGS, "retrieval_mmr_enabled", False)
+
+    payload = retrieve.retrieve_context_with_diagnostics(query="光合作用", top_k=3, base=base)
+
+    block, other = payload["results"]
+    assert block["text"] == "光合作用在叶绿体吸收光能"
+    assert [ref["chunk_id"] for ref in block["refs"]] == ["doc-1-0", "doc-1-1"]
+    assert block["metadata"]["positions"] == [0, 1]
+    assert other["refs"][0]["chunk_id"] == "doc-1-5"
+    assert payload["diagnostics"]["merged_chunks"] == 1
+
+
+def test_merge_adjacent_coalesces_blocks_bridged_by_a_later_hit():
+    def item(index, text, source):
+        return {
+            "text": text,
+            "refs": [{"doc_id": "doc-1", "chunk_id": f"doc-1-{index}"}],
+            "metadata": {"position": index, "retrieval_sources": [source]},
+        }
+
+    merged = merge_adjacent(
+        [item(3, "固定二氧化碳", "vector"), item(1, "光合作用在叶绿体", "lexical"), item(2, "叶绿体吸收光能", "vector")]
+    )
+
+    assert len(merged) == 1
+    block = merged[0]
+    assert block["text"] == "光合作用在叶绿体吸收光能固定二氧化碳"
+    assert [ref["chunk_id"] for ref in block["refs"]] == ["doc-1-1", "doc-1-2", "doc-1-3"]
+    assert block["metadata"]["positions"] == [1, 2, 3]
+    assert block["metadata"]["position"] == 1
+    assert block["metadata"]["retrieval_sources"] == ["vector", "lexical"]
+
+
+@pytest.mark.django_db
+def test_retrieve_context_reports_stage_timings_and_cache_flags(monkeypatch):
+    user = get_user_model().objects.create_user(username="kate", password="pw123456")
+    base = KnowledgeBase.objects.create(user=user, name="kb", chunk_count=2)
+
+    def hit(chunk):
+        return {"text": chunk, "doc_id": "doc-1", "chunk_id": chunk, "title": "Doc 1", "metadata": {}}
+
+    class FakeStore:
+        def search(self, embedding, top_k, *, base_id=None, doc_ids=None):
+            time.sleep(0.03)
+            return [(0.9, hit("doc-1-0"))]
+
+        def lexical_search(self, query, top_k, *, base_id=None, doc_ids=None):
+            time.sleep(0.02)
+            return [(1.0, hit("doc-1-1"))]
+
+    monkeypatch.setattr(retrieve, "build_client", lambda settings: SimpleNamespace(embed=lambda **kwargs: [[0.1, 0.2]]))
+    monkeypatch.setattr(retrieve, "get_store", lambda backend: FakeStore())
+    monkeypatch.setitem(retrieve.settings.AGENT_SETTINGS, "hybrid_retrieval", True)
+
+    first = retrieve.retrieve_context_with_diagnostics(query="question", top_k=2, base=base)
+    second = retrieve.retrieve_context_with_diagnostics(query="question", top_k=2, base=base)
+
+    timings = first["diagnostics"]["timings_ms"]
+    assert set(retrieve.RETRIEVAL_STAGES) <= set(timings)
+    assert timings["vector_ms"] >= 30 and timings["lexical_ms"] >= 20
+    assert first["diagnostics"]["cache_hits"] == {"embedding": False, "result": False}
+    assert second["diagnostics"]["cache_hits"]["result"] is True
+    assert second["diagnostics"]["timings_ms"]["vector_ms"] == 0.0
+
+
+@pytest.mark.django_db
+def test_registered_leg_is_fused_with_per_base_weight_and_budget(monkeypatch):
+    user = get_user_model().objects.create_user(username="liam", password="pw123456")
+    base = KnowledgeBase.objects.create(
+        user=user,
+        name="kb",
+        chunk_count=3,
+        retrieval_settings={"legs": {"pinned": {"enabled": True, "weight": 3.0, "budget": 1}}},
+    )
+    budgets = []
+
+    def hit(chunk):
+        return {"text": chunk, "doc_id": "doc-1", "chunk_id": chunk, "title": "Doc 1", "metadata": {}}
+
+    def pinned(request):
+        budgets.append(request.budget)
+        return [(1.0, hit("doc-1-9"))]
+
+    class FakeStore:
+        def search(self, embedding, top_k, *, base_id=None, doc_ids=None):
+            return [(0.9, hit("doc-1-0")), (0.8, hit("doc-1-5"))]
+
+    monkeypatch.setitem(retrievers._RETRIEVERS, "pinned", retrievers.Retriever(name="pinned", search=pinned))
+    monkeypatch.setattr(retrieve, "build_client", lambda settings: SimpleNamespace(embed=lambda **kwargs: [[0.1, 0.2]]))
+    monkeypatch.setattr(retrieve, "get_store", lambda backend: FakeStore())
+    monkeypatch.setitem(retrieve.settings.AGENT_SETTINGS, "hybrid_retrieval", False)
+    monkeypatch.setitem(retrieve.settings.AGENT_SETTINGS, "rerank_enabled", False)
+
+    payload = retrieve.retrieve_context_with_diagnostics(query="question", top_k=3, base=base)
+
+    assert budgets == [1]
+    assert [item["refs"][0]["chunk_id"] for item in payload["results"]] == ["doc-1-9", "doc-1-0", "doc-1-5"]
+    assert payload["results"][0]["metadata"]["retrieval_sources"] == ["pinned"]
+    assert payload["diagnostics"]["leg_hits"] == {"vector": 2, "pinned": 1}
+    assert "pinned_ms" in payload["diagnostics"]["timings_ms"]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_title_and_neighbor_legs_add_chunks_the_vector_leg_missed(monkeypatch):
+    user = get_user_model().objects.create_user(username="mona", password="pw123456")
+    base = KnowledgeBase.objects.create(
+        user=user,
+        name="kb",
+        chunk_count=4,
+        retrieval_settings={"legs": {"title": {"enabled": True}, "neighbors": {"enabled": True}}},
+    )
+    texts = {"photo": ["光合作用的场所", "叶绿体吸收光能", "暗反应固定二氧化碳"], "resp": ["细胞呼吸释放能量"]}
+    titles = {"photo": "光合作用", "resp": "细胞呼吸"}
+    for doc_id, chunks in texts.items():
+        document = KnowledgeDocument.objects.create(user=user, base=base, doc_id=doc_id, title=titles[doc_id])
+        for position, text in enumerate(chunks):
+            KnowledgeChunk.objects.create(
+                document=document,
+                chunk_id=f"{doc_id}-{position}",
+                text=text,
+                metadata={"position": position, "term_ids": term_ids(text)},
+            )
+
+    class FakeStore:
+        def search(self, embedding, top_k, *, base_id=None, doc_ids=None):
+            return [(0.9, {"text": "叶绿体吸收光能", "doc_id": "photo", "chunk_id": "photo-1", "title": "光合作用", "metadata": {"position": 1}})]
+
+    monkeypatch.setattr(retrieve, "build_client", lambda settings: SimpleNamespace(embed=lambda **kwargs: [[0.1, 0.2]]))
+    monkeypatch.setattr(retrieve, "get_store", lambda backend: FakeStore())
+    monkeypatch.setitem(retrieve.settings.AGENT_SETTINGS, "hybrid_retrieval", False)
+    monkeypatch.setitem(retrieve.settings.AGENT_SETTINGS, "retrieval_merge_adjacent", False)
+
+    neighbors = retrieve.retrieve_context_with_diagnostics(query="叶绿体在哪里", top_k=5, base=base)
+    titled = retrieve.retrieve_context_with_diagnostics(query="细胞呼吸的意义", top_k=5, base=base)
+
+    assert {item["refs"][0]["chunk_id"] for item in neighbors["results"]} == {"photo-0", "photo-1", "photo-2"}
+    assert neighbors["diagnostics"]["leg_hits"] == {"vector": 1, "title": 0, "neighbors": 2}
+    assert {item["refs"][0]["chunk_id"] for item in titled["results"]} >= {"photo-1", "resp-0"}
+    assert titled["diagnostics"]["leg_hits"]["title"] == 1
+    assert titled["diagnostics"]["degraded_legs"] == []
+
+
+def test_normalize_retrieval_settings_rejects_unknown_legs_and_bad_values():
+    assert retrievers.normalize_retrieval_settings(None) == {}
+    assert retrievers.normalize_retrieval_settings({"rrf_k": 30, "legs": {"title": {"weight": 0.5}}}) == {
+        "rrf_k": 30,
+        "legs": {"title": {"weight": 0.5}},
+    }
+    for raw in (
+        {"legs": {"bogus": {}}},
+        {"legs": {"vector": {"enabled": False}}},
+        {"legs": {"title": {"weight": -1}}},
+        {"legs": {"title": {"speed": 1}}},
+        {"rrf_k": 0},
+        ["vector"],
+    ):
+        with pytest.raises(ValueError):
+            retrievers.normalize_retrieval_settings(raw)
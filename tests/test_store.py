@@ -0,0 +1,478 @@
+import importlib
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import faiss
+import numpy as np
+import pytest
+from django.contrib.auth import get_user_model
+
+from src.core.models import EMBEDDING_DIMENSIONS, KnowledgeBase, KnowledgeChunk, KnowledgeDocument
+from src.kb import ingest
+from src.kb.bm25 import BM25Index
+from src.kb.ingest import delete_documents, repair_chunk_counts
+from src.kb.store import (
+    FaissStore,
+    PartitionedFaissStore,
+    PgVectorStore,
+    VectorStoreError,
+    _unwrap,
+    chunk_vector_fields,
+)
+
+
+def _chunk(base_id, doc_id, index, text="chunk"):
+    return {
+        "doc_id": doc_id,
+        "chunk_id": f"{doc_id}-{index}",
+        "text": text,
+        "base_id": base_id,
+        "title": doc_id,
+        "metadata": {"position": index},
+    }
+
+
+def test_partitioned_store_routes_by_base(tmp_path):
+    store = PartitionedFaissStore(root=tmp_path / "faiss")
+    store.upsert_embeddings(
+        embeddings=[[1.0, 0.0], [0.9, 0.1], [1.0, 0.0]],
+        metadata=[_chunk(1, "a", 0), _chunk(1, "a", 1), _chunk(2, "b", 0)],
+    )
+
+    assert store.partition_ids() == ["1", "2"]
+    assert store.count(base_id=1) == 2
+    assert store.count(base_id=2) == 1
+    assert store.count() == 3
+
+    hits = store.search([1.0, 0.0], 1, base_id=2)
+    assert [meta["chunk_id"] for _score, meta in hits] == ["b-0"]
+    assert store.search([1.0, 0.0], 5, base_id=3) == []
+
+    reopened = PartitionedFaissStore(root=tmp_path / "faiss")
+    assert reopened.count(base_id=1) == 2
+
+
+def test_search_many_matches_single_query_search(tmp_path):
+    store = PartitionedFaissStore(root=tmp_path / "faiss")
+    rng = np.random.default_rng(3)
+    vectors = rng.normal(size=(40, 8)).astype("float32")
+    store.upsert_embeddings(embeddings=vectors.tolist(), metadata=[_chunk(1, f"d{i}", 0) for i in range(40)])
+
+    queries = vectors[:5].tolist()
+    batched = store.search_many(queries, 3, base_id=1)
+    assert batched == [store.search(query, 3, base_id=1) for query in queries]
+    assert [hits[0][1]["doc_id"] for hits in batched] == ["d0", "d1", "d2", "d3", "d4"]
+    assert store.search_many([], 3, base_id=1) == []
+
+
+def test_partitioned_store_migrates_legacy_index(tmp_path):
+    legacy = FaissStore(index_path=tmp_path / "faiss.index", meta_path=tmp_path / "chunks.jsonl")
+    legacy.upsert([[1.0, 0.0], [0.0, 1.0]], [_chunk(1, "a", 0), _chunk(2, "b", 0)])
+
+    store = PartitionedFaissStore(root=tmp_path / "faiss")
+    migrated = store.migrate_legacy(tmp_path / "faiss.index", tmp_path / "chunks.jsonl")
+
+    assert migrated == 2
+    assert not (tmp_path / "faiss.index").exists()
+    assert store.search([0.0, 1.0], 1, base_id=2)[0][1]["chunk_id"] == "b-0"
+    assert not (tmp_path / "faiss" / ".legacy-migrated").exists()
+    assert PartitionedFaissStore(root=tmp_path / "faiss").migrate_legacy(tmp_path / "faiss.index", tmp_path / "chunks.jsonl") == 0
+
+
+def test_partitioned_store_finishes_interrupted_legacy_migration(tmp_path):
+    legacy = FaissStore(index_path=tmp_path / "faiss.index", meta_path=tmp_path / "chunks.jsonl")
+    legacy.upsert([[1.0, 0.0]], [_chunk(1, "a", 0)])
+    store = PartitionedFaissStore(root=tmp_path / "faiss")
+    store.upsert_embeddings(embeddings=[[1.0, 0.0]], metadata=[_chunk(1, "a", 0)])
+    # The rows were copied but the process died before the legacy files were retired.
+    (tmp_path / "faiss" / ".legacy-migrated").write_text("1", encoding="utf-8")
+
+    assert store.migrate_legacy(tmp_path / "faiss.index", tmp_path / "chunks.jsonl") == 0
+    assert not (tmp_path / "faiss.index").exists()
+    assert store.count(base_id=1) == 1
+
+
+def test_faiss_store_migrates_to_ann_after_threshold(tmp_path):
+    rng = np.random.default_rng(7)
+    vectors = rng.normal(size=(120, 8)).astype("float32")
+    rows = [_chunk(1, "a", index) for index in range(len(vectors))]
+
+    for index_type, expected in (("hnsw", faiss.IndexHNSW), ("ivf_flat", faiss.IndexIVF)):
+        store = FaissStore(
+            index_path=tmp_path / index_type / "index.faiss",
+            meta_path=tmp_path / index_type / "chunks.jsonl",
+            options={"index_type": index_type, "ann_threshold": 100, "ivf_nprobe": 4},
+        )
+        store.upsert(vectors[:60].tolist(), rows[:60])
+        assert isinstance(_unwrap(store.index), faiss.IndexFlat)
+
+        store.upsert(vectors[60:].tolist(), rows[60:])
+        assert isinstance(_unwrap(store.index), expected)
+
+        reopened = FaissStore(
+            index_path=tmp_path / index_type / "index.faiss",
+            meta_path=tmp_path / index_type / "chunks.jsonl",
+            options={"index_type": index_type, "ivf_nprobe": 4},
+        )
+        hits = reopened.search(vectors[75].tolist(), 1)
+        assert hits[0][1]["chunk_id"] == "a-75"
+
+
+def test_faiss_store_compressed_mode_rescores_from_sidecar(tmp_path):
+    rng = np.random.default_rng(11)
+    vectors = rng.normal(size=(200, 16)).astype("float32")
+    rows = [_chunk(1, "a", index) for index in range(len(vectors))]
+    store = FaissStore(
+        index_path=tmp_path / "index.faiss",
+        meta_path=tmp_path / "chunks.jsonl",
+        options={"compression": "sq8", "ann_threshold": 100, "exact_rescore": True},
+    )
+    store.upsert(vectors.tolist(), rows)
+
+    assert isinstance(_unwrap(store.index), faiss.IndexScalarQuantizer)
+    assert store.vector_path.stat().st_size == 200 * 16 * 2
+
+    hits = store.search(vectors[42].tolist(), 3)
+    assert hits[0][1]["chunk_id"] == "a-42"
+    assert abs(hits[0][0] - 1.0) < 1e-2
+
+    stats = store.measure_recall(sample_size=20, top_k=5)
+    assert stats["exact_rescore"] is True
+    assert stats["recall_at_k"] >= 0.9
+
+
+def test_faiss_store_appends_jsonl_and_recovers_from_partial_writes(tmp_path):
+    index_path = tmp_path / "index.faiss"
+    meta_path = tmp_path / "chunks.jsonl"
+    store = FaissStore(index_path=index_path, meta_path=meta_path)
+    store.upsert([[1.0, 0.0]], [_chunk(1, "a", 0)])
+    store.upsert([[0.0, 1.0]], [_chunk(1, "a", 1)])
+
+    lines = meta_path.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["chunk_id"] for line in lines] == ["a-0", "a-1"]
+
+    # Simulate a crash after the metadata append but before the index rename.
+    with meta_path.open("a", encoding="utf-8") as handle:
+        handle.write(json.dumps(_chunk(1, "a", 2)) + "\n")
+        handle.write('{"doc_id": "a", "chunk')
+
+    reopened = FaissStore(index_path=index_path, meta_path=meta_path)
+    assert [row["chunk_id"] for row in reopened.metadata] == ["a-0", "a-1"]
+    assert len(meta_path.read_text(encoding="utf-8").splitlines()) == 2
+
+
+def test_faiss_store_converts_legacy_json_metadata(tmp_path):
+    index_path = tmp_path / "index.faiss"
+    meta_path = tmp_path / "chunks.jsonl"
+    FaissStore(index_path=index_path, meta_path=meta_path).upsert([[1.0, 0.0]], [_chunk(1, "a", 0)])
+    meta_path.write_text(json.dumps([_chunk(1, "a", 0)], indent=2), encoding="utf-8")
+
+    reopened = FaissStore(index_path=index_path, meta_path=meta_path)
+
+    assert reopened.metadata[0]["chunk_id"] == "a-0"
+    assert meta_path.read_text(encoding="utf-8").count("\n") == 1
+
+
+def test_faiss_store_mmap_mode_loads_metadata_lazily(tmp_path):
+    index_path = tmp_path / "index.faiss"
+    meta_path = tmp_path / "chunks.jsonl"
+    writer = FaissStore(index_path=index_path, meta_path=meta_path)
+    writer.upsert([[1.0, 0.0], [0.0, 1.0]], [_chunk(1, "a", 0, text="第一段"), _chunk(1, "a", 1, text="second")])
+
+    reader = FaissStore(index_path=index_path, meta_path=meta_path, options={"mmap": True})
+    assert len(reader.metadata) == 2
+    assert reader.metadata._cache == {}
+    assert reader.search([0.0, 1.0], 1)[0][1]["chunk_id"] == "a-1"
+
+    reader.upsert([[0.7, 0.7]], [_chunk(1, "a", 2)])
+    reopened = FaissStore(index_path=index_path, meta_path=meta_path, options={"mmap": True})
+    assert [row["text"] for row in reopened.metadata] == ["第一段", "second", "chunk"]
+    assert reopened.search([0.7, 0.7], 1)[0][1]["chunk_id"] == "a-2"
+
+
+def test_faiss_store_deletes_documents_and_compacts(tmp_path):
+    store = PartitionedFaissStore(root=tmp_path / "faiss", options={"compact_ratio": 0.3})
+    store.upsert_embeddings(
+        embeddings=[[1.0, 0.0], [0.9, 0.1], [0.0, 1.0]],
+        metadata=[_chunk(1, "a", 0), _chunk(1, "a", 1), _chunk(1, "b", 0)],
+    )
+
+    assert store.delete_documents(base_id=1, doc_ids=["a"]) == 2
+    assert store.count(base_id=1) == 1
+    assert [meta["doc_id"] for _score, meta in store.search([1.0, 0.0], 3, base_id=1)] == ["b"]
+    assert store.lexical_search("chunk", 3, base_id=1)[0][1]["doc_id"] == "b"
+
+    reopened = PartitionedFaissStore(root=tmp_path / "faiss", options={"compact_ratio": 0.3})
+    assert reopened.count(base_id=1) == 1
+    assert reopened.needs_compaction(base_id=1)
+
+    assert reopened.compact_partition(base_id=1) == {"live": 1, "removed": 2}
+    compacted = reopened.partition(1)
+    assert len(compacted.metadata) == 1
+    assert not compacted.deleted
+    assert compacted.search([0.0, 1.0], 1)[0][1]["chunk_id"] == "b-0"
+
+    reopened.drop_partition(base_id=1)
+    assert reopened.partition_ids() == []
+
+
+def test_writer_waiting_on_a_compaction_that_empties_the_partition(tmp_path, monkeypatch):
+    store = PartitionedFaissStore(root=tmp_path / "faiss", options={"compact_ratio": 0.3})
+    store.upsert_embeddings(embeddings=[[1.0, 0.0]], metadata=[_chunk(1, "a", 0)])
+    store.delete_documents(base_id=1, doc_ids=["a"])
+    partition = store.partition(1)
+    live_vectors = partition.live_vectors
+    writer = {}
+
+    def live_vectors_with_waiting_writer():
+        # The writer queues on the partition lock while the compaction holds it.
+        writer["thread"] = threading.Thread(target=lambda: partition.upsert([[0.0, 1.0]], [_chunk(1, "b", 0)]))
+        writer["thread"].start()
+        time.sleep(0.2)
+        return live_vectors()
+
+    monkeypatch.setattr(partition, "live_vectors", live_vectors_with_waiting_writer)
+    errors = []
+    monkeypatch.setattr(threading, "excepthook", lambda args: errors.append(args.exc_value))
+
+    assert store.compact_partition(base_id=1) == {"live": 0, "removed": 1}
+    writer["thread"].join(timeout=10)
+
+    assert errors == []
+    reopened = PartitionedFaissStore(root=tmp_path / "faiss")
+    assert [meta["chunk_id"] for _score, meta in reopened.search([0.0, 1.0], 3, base_id=1)] == ["b-0"]
+
+
+def test_ivf_partition_deletes_documents_and_compacts(tmp_path):
+    rng = np.random.default_rng(5)
+    vectors = rng.normal(size=(240, 8)).astype("float32")
+    rows = [_chunk(1, "a" if index < 100 else "b", index) for index in range(len(vectors))]
+    options = {"index_type": "ivf_flat", "ann_threshold": 200, "ivf_nprobe": 16, "compact_ratio": 0.3}
+    store = PartitionedFaissStore(root=tmp_path / "faiss", options=options)
+    store.upsert_embeddings(embeddings=vectors.tolist(), metadata=rows)
+    assert isinstance(_unwrap(store.partition(1).index), faiss.IndexIVF)
+
+    assert store.delete_documents(base_id=1, doc_ids=["a"]) == 100
+    assert store.count(base_id=1) == 140
+    assert store.needs_compaction(base_id=1)
+
+    assert store.compact_partition(base_id=1) == {"live": 140, "removed": 100}
+    compacted = store.partition(1)
+    assert len(compacted.metadata) == 140
+    assert not compacted.deleted
+    assert compacted.search(vectors[150].tolist(), 1)[0][1]["chunk_id"] == "b-150"
+
+
+def test_hnsw_partition_tombstones_deleted_rows(tmp_path):
+    rng = np.random.default_rng(3)
+    vectors = rng.normal(size=(40, 8)).astype("float32")
+    rows = [_chunk(1, "a" if index < 20 else "b", index) for index in range(len(vectors))]
+    store = FaissStore(
+        index_path=tmp_path / "index.faiss",
+        meta_path=tmp_path / "chunks.jsonl",
+        options={"index_type": "hnsw", "ann_threshold": 10},
+    )
+    store.upsert(vectors.tolist(), rows)
+    assert isinstance(_unwrap(store.index), faiss.IndexHNSW)
+
+    assert store.delete_documents(["a"]) == 20
+    hits = store.search(vectors[5].tolist(), 5)
+    assert hits and all(meta["doc_id"] == "b" for _score, meta in hits)
+    ids, _vectors = store.live_vectors()
+    assert ids.tolist() == list(range(20, 40))
+
+
+def test_faiss_store_picks_up_commits_from_other_processes(tmp_path):
+    root = tmp_path / "faiss"
+    writer = PartitionedFaissStore(root=root)
+    writer.upsert_embeddings(embeddings=[[1.0, 0.0]], metadata=[_chunk(1, "a", 0)])
+    reader = PartitionedFaissStore(root=root, options={"mmap": True})
+    assert reader.count(base_id=1) == 1
+    generation = reader.partition(1).generation
+
+    writer.upsert_embeddings(embeddings=[[0.0, 1.0]], metadata=[_chunk(1, "b", 0)])
+    assert reader.search([0.0, 1.0], 1, base_id=1)[0][1]["chunk_id"] == "b-0"
+    assert reader.partition(1).generation > generation
+    assert reader.partition(1).refresh() is False
+
+    writer.delete_documents(base_id=1, doc_ids=["a"])
+    writer.compact_partition(base_id=1)
+    assert reader.count(base_id=1) == 1
+    assert [meta["doc_id"] for _score, meta in reader.search([1.0, 0.0], 2, base_id=1)] == ["b"]
+
+    writer.drop_partition(base_id=1)
+    assert reader.count(base_id=1) == 0
+
+
+def test_faiss_writer_discards_orphaned_tail_left_by_crashed_writer(tmp_path):
+    index_path = tmp_path / "index.faiss"
+    meta_path = tmp_path / "chunks.jsonl"
+    store = FaissStore(index_path=index_path, meta_path=meta_path)
+    store.upsert([[1.0, 0.0]], [_chunk(1, "a", 0)])
+    with meta_path.open("a", encoding="utf-8") as handle:
+        handle.write(json.dumps(_chunk(1, "x", 0)) + "\n")
+
+    store.upsert([[0.0, 1.0]], [_chunk(1, "a", 1)])
+
+    reopened = FaissStore(index_path=index_path, meta_path=meta_path)
+    assert [row["chunk_id"] for row in reopened.metadata] == ["a-0", "a-1"]
+    assert reopened.search([0.0, 1.0], 1)[0][1]["chunk_id"] == "a-1"
+
+
+def test_pgvector_ann_index_sql_targets_cosine_ops():
+    store = PgVectorStore()
+    hnsw = store.ann_index_sql("hnsw", m=24, ef_construction=100)
+    assert hnsw.startswith("CREATE INDEX CONCURRENTLY IF NOT EXISTS core_knowledgechunk_embedding_hnsw")
+    assert "USING hnsw (embedding_vector vector_cosine_ops) WITH (m = 24, ef_construction = 100)" in hnsw
+
+    ivfflat = store.ann_index_sql("ivfflat", lists=50, concurrently=False)
+    assert ivfflat.startswith("CREATE INDEX IF NOT EXISTS core_knowledgechunk_embedding_ivfflat")
+    assert ivfflat.endswith("WITH (lists = 50)")
+
+    half = PgVectorStore(options={"storage": "halfvec"}).ann_index_sql("hnsw")
+    assert "core_knowledgechunk_embedding_half_hnsw" in half
+    assert "(embedding_half halfvec_cosine_ops)" in half
+
+    with pytest.raises(VectorStoreError):
+        store.ann_index_sql("diskann")
+
+
+def test_pgvector_hybrid_search_sql_fuses_both_legs_in_one_statement():
+    sql = PgVectorStore().hybrid_search_sql(candidate_k=15, base_id=7, doc_ids=["doc-1"], rrf_k=60)
+    assert sql.count("WITH ") == 1
+    assert "embedding_vector <=> %(embedding)s::vector" in sql
+    assert "search_vector @@ to_tsquery('simple', %(ts_query)s)" in sql
+    assert "FULL OUTER JOIN lexical_hits" in sql
+    assert "1.0 / (60 + v.rank)" in sql
+    assert sql.count("LIMIT 15") == 2
+    assert "d.doc_id = ANY(%(doc_ids)s)" in sql
+
+    half = PgVectorStore(options={"storage": "halfvec"}).hybrid_search_sql(candidate_k=5, base_id=7)
+    assert "embedding_half <=> %(embedding)s::halfvec" in half
+    assert "doc_ids" not in half
+    assert PgVectorStore().supports_hybrid_sql is False
+
+
+def test_pgvector_search_many_sql_runs_one_lateral_scan_per_query():
+    sql = PgVectorStore().search_many_sql(8, base_id=3)
+    assert "unnest(%(embeddings)s::vector[]) WITH ORDINALITY AS q(embedding, ord)" in sql
+    assert "CROSS JOIN LATERAL" in sql
+    assert "ORDER BY distance\n    LIMIT 8" in sql
+    assert "d.base_id = %(base_id)s" in sql
+
+
+def test_chunk_vector_fields_store_each_vector_once():
+    vector = [0.5] * EMBEDDING_DIMENSIONS
+
+    fields = chunk_vector_fields(vector, {"pgvector_storage": "vector"})
+    assert fields == {"embedding": [], "embedding_vector": vector, "embedding_half": None}
+
+    half = chunk_vector_fields(vector, {"pgvector_storage": "halfvec", "store_embedding_json": True})
+    assert half == {"embedding": vector, "embedding_vector": None, "embedding_half": vector}
+
+    assert chunk_vector_fields([0.1, 0.2], {})["embedding_vector"] is None
+
+
+@pytest.mark.django_db
+def test_pgvector_store_projects_only_payload_columns():
+    user = get_user_model().objects.create_user(username="projection", password="x")
+    base = KnowledgeBase.objects.create(user=user, name="base")
+    document = KnowledgeDocument.objects.create(user=user, base=base, doc_id="doc", title="Doc")
+    KnowledgeChunk.objects.create(document=document, chunk_id="doc-0", text="光合作用 chlorophyll")
+
+    store = PgVectorStore()
+    sql = str(store._search_queryset([0.0] * 1024, 5, base_id=base.pk).query)
+    assert '"embedding"' not in sql and '"embedding_vector",' not in sql
+
+    hits = store.lexical_search("光合作用", 3, base_id=base.pk)
+    assert hits[0][1] == {
+        "doc_id": "doc",
+        "chunk_id": "doc-0",
+        "text": "光合作用 chlorophyll",
+        "base_id": base.pk,
+        "title": "Doc",
+        "metadata": {},
+    }
+
+
+@pytest.mark.django_db
+def test_chunk_counters_follow_deletes_and_repair_drift():
+    user = get_user_model().objects.create_user(username="counters", password="x")
+    base = KnowledgeBase.objects.create(user=user, name="base", chunk_count=7)
+    for doc_id, chunks in (("a", 2), ("b", 1)):
+        document = KnowledgeDocument.objects.create(user=user, base=base, doc_id=doc_id, title=doc_id, chunk_count=chunks)
+        for index in range(chunks):
+            KnowledgeChunk.objects.create(document=document, chunk_id=f"{doc_id}-{index}", text="chunk")
+
+    assert repair_chunk_counts(base_id=base.pk) == [{"base_id": base.pk, "before": 7, "after": 3}]
+    assert repair_chunk_counts() == []
+
+    delete_documents(documents=KnowledgeDocument.objects.filter(base=base, doc_id="a"))
+    base.refresh_from_db()
+    assert base.chunk_count == 1
+
+
+@pytest.mark.django_db
+def test_delete_documents_bumps_generation_again_after_vectors_are_removed(monkeypatch, django_capture_on_commit_callbacks):
+    user = get_user_model().objects.create_user(username="generation", password="x")
+    base = KnowledgeBase.objects.create(user=user, name="base", chunk_count=1)
+    KnowledgeDocument.objects.create(user=user, base=base, doc_id="a", title="a", chunk_count=1)
+    monkeypatch.setattr(ingest.kb_store, "remove_documents", lambda *, base_id, doc_ids: len(doc_ids))
+    monkeypatch.setattr(ingest, "enqueue_vector_compaction", lambda *, base_id: None)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        delete_documents(documents=KnowledgeDocument.objects.filter(base=base))
+        base.refresh_from_db()
+        assert base.corpus_generation == 1
+
+    base.refresh_from_db()
+    assert base.corpus_generation == 2
+
+
+def test_faiss_lexical_search_uses_persisted_bm25_postings(tmp_path):
+    index_path = tmp_path / "index.faiss"
+    meta_path = tmp_path / "chunks.jsonl"
+    store = FaissStore(index_path=index_path, meta_path=meta_path)
+    store.upsert(
+        [[1.0, 0.0], [0.0, 1.0], [0.7, 0.7]],
+        [
+            _chunk(1, "a", 0, text="光合作用发生在叶绿体中"),
+            _chunk(1, "b", 0, text="细胞呼吸释放能量"),
+            _chunk(1, "c", 0, text="光合作用 光合作用 需要光照"),
+        ],
+    )
+    assert store.lexical_path.exists()
+    assert [meta["doc_id"] for _score, meta in store.lexical_search("光合作用", 5)] == ["c", "a"]
+
+    store.upsert([[0.5, 0.5]], [_chunk(1, "d", 0, text="呼吸作用")])
+    reopened = FaissStore(index_path=index_path, meta_path=meta_path)
+    assert len(BM25Index.read(reopened.lexical_path)) == 4
+    assert reopened.lexical_search("呼吸", 1)[0][1]["doc_id"] in {"b", "d"}
+    assert reopened.lexical_search("呼吸", 5, doc_ids=["d"])[0][1]["doc_id"] == "d"
+
+    reopened.delete_documents(["b"])
+    assert [meta["doc_id"] for _score, meta in reopened.lexical_search("呼吸", 5)] == ["d"]
+    assert reopened.lexical_search("量子", 5) == []
+
+
+@pytest.mark.django_db
+def test_embedding_half_migration_keeps_json_vectors_it_could_not_backfill():
+    from django.apps import apps
+    from django.db import connection
+
+    migration = importlib.import_module("src.core.migrations.0010_knowledgechunk_embedding_half")
+    user = get_user_model().objects.create_user(username="json-migration", password="x")
+    base = KnowledgeBase.objects.create(user=user, name="base")
+    document = KnowledgeDocument.objects.create(user=user, base=base, doc_id="doc", title="Doc")
+    full = [0.25] * EMBEDDING_DIMENSIONS
+    KnowledgeChunk.objects.create(document=document, chunk_id="doc-0", text="a", embedding=full)
+    KnowledgeChunk.objects.create(document=document, chunk_id="doc-1", text="b", embedding=[0.1, 0.2, 0.3])
+
+    migration.move_json_embeddings(apps, SimpleNamespace(connection=connection))
+
+    backfilled = KnowledgeChunk.objects.get(chunk_id="doc-0")
+    assert backfilled.embedding == [] and list(backfilled.embedding_vector) == full
+    kept = KnowledgeChunk.objects.get(chunk_id="doc-1")
+    assert kept.embedding == [0.1, 0.2, 0.3] and kept.embedding_vector is None
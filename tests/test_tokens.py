@@ -0,0 +1,62 @@
+from src.core.management.commands.benchmark_rerank import _rerank_scalar
+from src.kb.rerank import rerank_results
+from src.kb.tokens import (
+    chunk_term_ids,
+    overlap_ratio,
+    query_term_ids,
+    search_document,
+    search_query,
+    search_terms,
+    term_ids,
+    tokenize,
+)
+
+
+def _overlap_ratio(query: str, text: str) -> float:
+    """Reference overlap computed from raw text (re-tokenizes the chunk on every call)."""
+    query_tokens = tokenize(query)
+    text_tokens = set(tokenize(text))
+    if not query_tokens or not text_tokens:
+        return 0.0
+    matched = sum(1 for token in query_tokens if token in text_tokens)
+    return matched / len(query_tokens)
+
+
+def test_tokenize_keeps_words_and_cjk_characters():
+    assert tokenize("ATP 合成酶") == ["atp", "合", "成", "酶"]
+
+
+def test_search_terms_add_cjk_bigrams_per_run():
+    assert search_terms("光合作用 and 呼吸") == ["and", "光", "合", "作", "用", "光合", "合作", "作用", "呼", "吸", "呼吸"]
+    assert search_document("DNA复制") == "dna 复 制 复制"
+
+
+def test_search_query_ors_distinct_terms():
+    assert search_query("作用作用") == "作 | 用 | 作用 | 用作"
+    assert search_query("？！") == ""
+
+
+def test_precomputed_overlap_matches_text_overlap():
+    text = "光合作用 converts light energy; chlorophyll absorbs light."
+    query = "光合 light light enzyme"
+
+    assert overlap_ratio(query_term_ids(query), term_ids(text)) == _overlap_ratio(query, text)
+    assert chunk_term_ids({"text": text, "metadata": {}}) == term_ids(text)
+    assert chunk_term_ids({"text": "ignored", "metadata": {"term_ids": [1, 2]}}) == [1, 2]
+
+
+def test_vectorized_rerank_matches_scalar_reference_including_ties():
+    texts = ["光合作用 light", "light energy", "enzyme", "光合 light light", "", "chlorophyll 光"]
+    results = [
+        (score, {"chunk_id": f"c{index}", "text": text, "metadata": {"term_ids": term_ids(text)}, "retrieval_sources": sources})
+        for index, (score, text, sources) in enumerate(
+            zip([0.5, 0.5, 0.7, 0.2, 0.5, 0.5], texts, [["vector"], ["vector", "lexical"], ["lexical"], ["vector"], ["vector"], ["vector"]])
+        )
+    ]
+
+    for top_k in (0, 1, 3, 6, 10):
+        for query in ("光合 light enzyme", "？"):
+            assert rerank_results(query=query, results=results, top_k=top_k) == _rerank_scalar(
+                query=query, results=results, top_k=top_k
+            )
+    assert rerank_results(query="light", results=[], top_k=3) == []